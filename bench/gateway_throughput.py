@@ -0,0 +1,174 @@
+"""Throughput comparison: asyncio gateway engine vs the legacy threaded server.
+
+Starts a fixed-latency mock upstream, then for each engine starts server.py
+against it and drives /v1/chat/completions with N concurrent clients for a
+fixed duration.
+
+Admission control is switched off so the engines themselves are compared.
+`--workers N` also runs the asyncio engine as N pre-forked processes.
+`--keep-alive` also runs every client over one persistent connection.
+
+Usage:
+    python -m bench.gateway_throughput [--concurrency 1 8 64] [--duration 5] [--latency-ms 200] [--workers 4]
+                                       [--keep-alive]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+ROOT = Path(__file__).resolve().parent.parent
+
+REQUEST_BODY = json.dumps({
+    "model": "llama3.1:8b",
+    "messages": [
+        {"role": "system", "content": "You are a restaurant assistant."},
+        {"role": "user", "content": "What are your opening hours?"},
+    ],
+}).encode()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+@contextmanager
+def spawn(args: list[str], port: int, env: dict[str, str] | None = None) -> Iterator[subprocess.Popen]:
+    proc = subprocess.Popen(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        yield proc
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def warm_up(port: int, requests: int = 3) -> None:
+    """The first request pays for lazy SDK initialisation; keep it out of the numbers."""
+    for _ in range(requests):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request("POST", "/v1/chat/completions", REQUEST_BODY, {"Content-Type": "application/json"})
+        conn.getresponse().read()
+        conn.close()
+
+
+def drive(port: int, concurrency: int, duration: float, keep_alive: bool = False) -> dict[str, float]:
+    """Run `concurrency` closed-loop clients for `duration` seconds.
+
+    With `keep_alive` each client reuses one connection instead of opening one per request.
+    """
+    latencies: list[float] = []
+    errors: list[int] = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker() -> None:
+        conn: http.client.HTTPConnection | None = None
+        while time.monotonic() < stop_at:
+            start = time.monotonic()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                conn.request("POST", "/v1/chat/completions", REQUEST_BODY, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+                if not keep_alive or resp.will_close:
+                    conn.close()
+                    conn = None
+                ok = resp.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                if conn is not None:
+                    conn.close()
+                    conn = None
+            elapsed = time.monotonic() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - started
+
+    return {
+        "connection": "keep-alive" if keep_alive else "close",
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": len(latencies) / wall,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--engines", nargs="+", default=["threaded", "asyncio"])
+    parser.add_argument("--workers", type=int, default=1, help="Also run the asyncio engine with N workers")
+    parser.add_argument("--keep-alive", action="store_true", help="Also run each client over one persistent connection")
+    args = parser.parse_args()
+
+    runs: list[tuple[str, list[str]]] = [(engine, ["--engine", engine]) for engine in args.engines]
+    if args.workers > 1:
+        runs.append((f"asyncio×{args.workers}", ["--engine", "asyncio", "--workers", str(args.workers)]))
+
+    upstream_port = free_port()
+    upstream_env = {"OLLAMA_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1"}
+
+    rows: list[tuple[str, dict[str, float]]] = []
+    with spawn(["-m", "bench.mock_upstream", "--port", str(upstream_port), "--latency-ms", str(args.latency_ms)], upstream_port):
+        for engine, flags in runs:
+            port = free_port()
+            server_args = ["server.py", *flags, "--max-concurrency", "0", "--port", str(port), "--host", "127.0.0.1"]
+            with spawn(server_args, port, upstream_env):
+                warm_up(port)
+                for concurrency in args.concurrency:
+                    rows.append((engine, drive(port, concurrency, args.duration)))
+                    if args.keep_alive:
+                        rows.append((engine, drive(port, concurrency, args.duration, keep_alive=True)))
+
+    print(f"\nUpstream latency: {args.latency_ms:.0f}ms, {args.duration:.0f}s per run\n")
+    print(f"{'engine':<11} {'connection':<10} {'clients':>7} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8}")
+    for engine, r in rows:
+        print(f"{engine:<11} {r['connection']:<10} {r['concurrency']:>7} {r['requests']:>9} {r['errors']:>7} "
+              f"{r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Load generator for server.py against the mock upstream, with JSON results.
+
+Starts bench/mock_upstream.py and server.py (any extra flags after `--` go
+to server.py), then for each concurrency level runs that many closed-loop
+clients against /v1/chat/completions for a fixed duration. A share of the
+requests is streamed (`--stream-ratio`); for those the time to the first
+content delta (TTFT) is recorded too.
+
+Every request is the same and the mock's latency is seeded, so two runs on
+the same machine give comparable numbers. Save a run with `--output` and
+pass it to `--compare` after a change to see the difference per level.
+
+Usage:
+    python -m bench.loadgen [--concurrency 1 8 32] [--duration 10] [--stream-ratio 0.5]
+                            [--latency-ms 200] [--token-ms 20] [--jitter-ms 100] [--fail-every N]
+                            [--keep-alive] [--output results.json] [--compare baseline.json]
+                            [-- --max-concurrency 0 --workers 2]
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from bench.gateway_throughput import ROOT, free_port, spawn, warm_up
+
+# Sample statuses besides the HTTP status code
+CONNECTION_ERROR = "connection"
+STREAM_ERROR = "stream_error"  # 200 whose SSE stream carried an error event
+
+REQUEST_PAYLOAD: dict[str, Any] = {
+    "model": "llama3.1:8b",
+    "messages": [
+        {"role": "system", "content": "You are a restaurant assistant."},
+        {"role": "user", "content": "What are your opening hours?"},
+    ],
+}
+
+
+@dataclass
+class Sample:
+    stream: bool
+    status: str  # HTTP status, CONNECTION_ERROR or STREAM_ERROR
+    latency: float
+    ttft: float | None = None
+
+
+@dataclass
+class _Client:
+    reader: asyncio.StreamReader | None = None
+    writer: asyncio.StreamWriter | None = None
+    samples: list[Sample] = field(default_factory=list)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered: list[float] = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def _distribution_ms(values: list[float]) -> dict[str, float]:
+    return {
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p95": round(percentile(values, 95) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "mean": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        "max": round(max(values, default=0.0) * 1000, 2),
+    }
+
+
+def summarize(samples: list[Sample], concurrency: int, wall: float) -> dict[str, Any]:
+    """One JSON result row for a run."""
+    ok: list[Sample] = [s for s in samples if s.status == "200"]
+    errors: dict[str, int] = {}
+    for s in samples:
+        if s.status != "200":
+            errors[s.status] = errors.get(s.status, 0) + 1
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(wall, 3),
+        "requests": len(samples),
+        "ok": len(ok),
+        "streamed": sum(1 for s in samples if s.stream),
+        "errors": errors,
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(ok) / wall, 2) if wall else 0.0,
+        "latency_ms": _distribution_ms([s.latency for s in ok]),
+        "ttft_ms": _distribution_ms([s.ttft for s in ok if s.ttft is not None]),
+    }
+
+
+class _SSEScanner:
+    """Watches an SSE body as it arrives for the first chunk with content, and for error events."""
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.first_token: float | None = None
+        self.error: bool = False
+        self._buffer: bytes = b""
+
+    def feed(self, data: bytes) -> None:
+        self._buffer += data
+        *events, self._buffer = self._buffer.split(b"\n\n")
+        for event in events:
+            if not event.startswith(b"data: {"):
+                continue
+            try:
+                payload: dict[str, Any] = json.loads(event[6:])
+            except ValueError:
+                continue
+            if "error" in payload:
+                self.error = True
+            elif self.first_token is None and _delta_content(payload):
+                self.first_token = time.monotonic() - self.start
+
+
+def _delta_content(chunk: dict[str, Any]) -> str:
+    try:
+        return chunk["choices"][0]["delta"].get("content") or ""
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+async def _read_response(reader: asyncio.StreamReader, start: float) -> tuple[str, dict[str, str], float | None]:
+    """Read one response; returns (status, headers, seconds to the first content delta).
+
+    A streamed 200 that carried an error event comes back as STREAM_ERROR.
+    """
+    status_line: bytes = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed before a response")
+    status: str = status_line.split()[1].decode()
+    headers: dict[str, str] = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    sse = _SSEScanner(start)
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            sse.feed((await reader.readexactly(size + 2))[:-2])
+        await reader.readuntil(b"\r\n")
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        while data := await reader.read(65536):
+            sse.feed(data)
+        headers["connection"] = "close"
+    return (STREAM_ERROR if sse.error else status), headers, sse.first_token
+
+
+async def _request(client: _Client, port: int, body: bytes, stream: bool, keep_alive: bool) -> Sample:
+    start: float = time.monotonic()
+    try:
+        if client.writer is None:
+            client.reader, client.writer = await asyncio.open_connection("127.0.0.1", port)
+        connection: str = "keep-alive" if keep_alive else "close"
+        client.writer.write(
+            f"POST /v1/chat/completions HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {connection}\r\n\r\n".encode() + body
+        )
+        await client.writer.drain()
+        status, headers, ttft = await _read_response(client.reader, start)
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+        client.close()
+        return Sample(stream, CONNECTION_ERROR, time.monotonic() - start)
+    if not keep_alive or headers.get("connection", "").lower() == "close":
+        client.close()
+    return Sample(stream, status, time.monotonic() - start, ttft)
+
+
+async def drive(
+    port: int, concurrency: int, duration: float, stream_ratio: float = 0.5, keep_alive: bool = False
+) -> dict[str, Any]:
+    """Run `concurrency` closed-loop clients for `duration` seconds and summarize.
+
+    Request i is streamed when floor((i + 1) * ratio) > floor(i * ratio), so
+    the mix is the same on every run.
+    """
+    bodies: dict[bool, bytes] = {
+        False: json.dumps(REQUEST_PAYLOAD).encode(),
+        True: json.dumps({**REQUEST_PAYLOAD, "stream": True}).encode(),
+    }
+    counter: list[int] = [0]
+    stop_at: float = time.monotonic() + duration
+
+    async def worker(client: _Client) -> None:
+        while time.monotonic() < stop_at:
+            i: int = counter[0]
+            counter[0] += 1
+            stream: bool = math.floor((i + 1) * stream_ratio) > math.floor(i * stream_ratio)
+            client.samples.append(await _request(client, port, bodies[stream], stream, keep_alive))
+        client.close()
+
+    clients: list[_Client] = [_Client() for _ in range(concurrency)]
+    started: float = time.monotonic()
+    await asyncio.gather(*(worker(c) for c in clients))
+    wall: float = time.monotonic() - started
+    return summarize([s for c in clients for s in c.samples], concurrency, wall)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> str:
+    """Per-concurrency table of current vs baseline throughput, latency and TTFT."""
+    before: dict[int, dict[str, Any]] = {run["concurrency"]: run for run in baseline["runs"]}
+    lines: list[str] = [
+        f"vs {baseline['meta'].get('commit') or 'baseline'}:",
+        f"{'clients':>7} {'req/s':>16} {'p50 ms':>18} {'p99 ms':>18} {'ttft p50 ms':>18} {'errors':>15}",
+    ]
+
+    def cell(old: float, new: float, width: int) -> str:
+        change: str = f"{(new - old) / old:+.0%}" if old else "n/a"
+        return f"{new:.1f} ({change})".rjust(width)
+
+    for run in current["runs"]:
+        old: dict[str, Any] | None = before.get(run["concurrency"])
+        if old is None:
+            continue
+        lines.append(
+            f"{run['concurrency']:>7} "
+            f"{cell(old['throughput_rps'], run['throughput_rps'], 16)} "
+            f"{cell(old['latency_ms']['p50'], run['latency_ms']['p50'], 18)} "
+            f"{cell(old['latency_ms']['p99'], run['latency_ms']['p99'], 18)} "
+            f"{cell(old['ttft_ms']['p50'], run['ttft_ms']['p50'], 18)} "
+            + f"{old['error_rate']:.1%} -> {run['error_rate']:.1%}".rjust(15)
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="Share of requests sent with stream: true")
+    parser.add_argument("--keep-alive", action="store_true", help="Reuse one connection per client")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Mock upstream time to first token")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="Mock upstream time between streamed tokens")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Up to this much extra (seeded) upstream latency")
+    parser.add_argument("--fail-every", type=int, default=0, help="Mock upstream answers every Nth request with a 500 (the gateway's clients retry "
+                             "these, so they mostly show up as tail latency)")
+    parser.add_argument("--output", default=None, help="Write the JSON results here as well as to stdout")
+    parser.add_argument("--compare", default=None, help="Earlier --output file to compare against")
+    parser.add_argument("server_args", nargs="*", help="Extra server.py flags, after --")
+    args = parser.parse_args()
+
+    upstream_port, port = free_port(), free_port()
+    mock_args: list[str] = [
+        "-m", "bench.mock_upstream", "--port", str(upstream_port), "--latency-ms", str(args.latency_ms),
+        "--token-ms", str(args.token_ms), "--jitter-ms", str(args.jitter_ms), "--fail-every", str(args.fail_every),
+    ]
+    server_args: list[str] = ["server.py", "--port", str(port), "--host", "127.0.0.1", *args.server_args]
+    upstream_env: dict[str, str] = {"OLLAMA_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1"}
+
+    runs: list[dict[str, Any]] = []
+    with spawn(mock_args, upstream_port), spawn(server_args, port, upstream_env):
+        warm_up(port)
+        for concurrency in args.concurrency:
+            runs.append(asyncio.run(drive(port, concurrency, args.duration, args.stream_ratio, args.keep_alive)))
+            print(f"   {concurrency} clients: {runs[-1]['throughput_rps']} req/s, "
+                  f"p50 {runs[-1]['latency_ms']['p50']}ms, {runs[-1]['error_rate']:.1%} errors", file=sys.stderr)
+
+    result: dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "server_args": args.server_args,
+            "upstream": {
+                "latency_ms": args.latency_ms, "token_ms": args.token_ms,
+                "jitter_ms": args.jitter_ms, "fail_every": args.fail_every,
+            },
+            "duration_s": args.duration,
+            "stream_ratio": args.stream_ratio,
+            "keep_alive": args.keep_alive,
+        },
+        "runs": runs,
+    }
+    text: str = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n" + compare(json.load(f), result), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Deterministic mock of an OpenAI-compatible upstream (Responses API).
+
+Point the gateway at it with OLLAMA_BASE_URL=http://127.0.0.1:<port>/v1 to
+benchmark without a real model. Every request sleeps for a fixed latency and
+returns the same reply, so numbers are comparable across runs. Streamed
+requests ("stream": true) send the first token after the latency and each
+following token `token_ms` later.
+
+`jitter_ms` adds up to that much extra latency per request, drawn from a
+generator seeded with `seed`, so a tail is there to measure and is the same
+on every run. `fail_every=N` answers every Nth request with a 500.
+
+A `previous_response_id` the mock didn't hand out (or has forgotten, see
+`response_ids`) is rejected with a 400, as OpenAI does for expired ones.
+
+Usage:
+    python -m bench.mock_upstream --port 11500 --latency-ms 200 [--token-ms 20]
+                                  [--jitter-ms 100] [--seed 0] [--fail-every N]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from contextlib import suppress
+from typing import Any
+
+from gateway.protocol import (
+    LAST_CHUNK,
+    MAX_HEADER_BYTES,
+    SSE_HEADERS,
+    ProtocolError,
+    encode_chunk,
+    encode_head,
+    error_payload,
+    json_response,
+    read_request,
+    sse_event,
+)
+
+DEFAULT_REPLY = "Namaste! We are open from 12pm to 10pm every day."
+
+
+class MockUpstream:
+    """Fixed-latency, fixed-reply OpenAI-compatible server."""
+
+    def __init__(
+        self,
+        latency_ms: float = 100.0,
+        reply: str = DEFAULT_REPLY,
+        token_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        seed: int = 0,
+        fail_every: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.reply = reply
+        self.token_ms = token_ms
+        self.jitter_ms = jitter_ms
+        self.fail_every = fail_every
+        self._rng = random.Random(seed)
+        self._received = itertools.count(1)
+        self.requests_served = 0
+        self.requests_failed = 0
+        self.connections_opened = 0
+        self.last_request: dict[str, Any] | None = None
+        self._ids = itertools.count(1)
+        # Ids of the responses returned so far
+        self.response_ids: set[str] = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        return await asyncio.start_server(self._handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections_opened += 1
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ProtocolError as e:
+                    writer.write(json_response(e.status, error_payload(str(e))))
+                    break
+                if request is None:
+                    break
+
+                if request.method == "POST" and request.path.endswith("/responses"):
+                    body: dict[str, Any] = request.json()
+                    self.last_request = body
+                    number: int = next(self._received)
+                    await asyncio.sleep((self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000)
+                    previous: str | None = body.get("previous_response_id")
+                    if self.fail_every and number % self.fail_every == 0:
+                        self.requests_failed += 1
+                        writer.write(json_response(500, error_payload("Injected failure", "server_error"), keep_alive=request.keep_alive))
+                    elif previous is not None and previous not in self.response_ids:
+                        message: str = f"Previous response with id '{previous}' not found."
+                        writer.write(json_response(400, error_payload(message), keep_alive=request.keep_alive))
+                    elif body.get("stream"):
+                        await self._stream_response(body.get("model", ""), writer, request.keep_alive)
+                    else:
+                        writer.write(json_response(200, self.response_payload(body.get("model", "")), keep_alive=request.keep_alive))
+                    self.requests_served += 1
+                else:
+                    writer.write(json_response(404, error_payload(f"Unknown path: {request.path}"), keep_alive=request.keep_alive))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+
+    def tokens(self) -> list[str]:
+        """The reply split into word-sized deltas (whitespace kept)."""
+        words: list[str] = self.reply.split(" ")
+        return [w + " " for w in words[:-1]] + words[-1:]
+
+    async def _stream_response(self, model: str, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        writer.write(encode_head(200, {**SSE_HEADERS, "Transfer-Encoding": "chunked"}, keep_alive))
+        payload: dict[str, Any] = self.response_payload(model)
+        seq = itertools.count()
+        for i, token in enumerate(self.tokens()):
+            if i and self.token_ms:
+                await asyncio.sleep(self.token_ms / 1000)
+            writer.write(encode_chunk(sse_event({
+                "type": "response.output_text.delta",
+                "item_id": payload["output"][0]["id"],
+                "output_index": 0,
+                "content_index": 0,
+                "delta": token,
+                "logprobs": [],
+                "sequence_number": next(seq),
+            }, event="response.output_text.delta")))
+            await writer.drain()
+        writer.write(encode_chunk(sse_event(
+            {"type": "response.completed", "response": payload, "sequence_number": next(seq)},
+            event="response.completed",
+        )))
+        writer.write(LAST_CHUNK)
+
+    def response_payload(self, model: str) -> dict[str, Any]:
+        n: int = next(self._ids)
+        self.response_ids.add(f"resp_mock_{n}")
+        return {
+            "id": f"resp_mock_{n}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": model,
+            "status": "completed",
+            "output": [
+                {
+                    "type": "message",
+                    "id": f"msg_mock_{n}",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": self.reply, "annotations": []}],
+                }
+            ],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": 50,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": len(self.reply.split()),
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": 50 + len(self.reply.split()),
+            },
+        }
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    upstream = MockUpstream(
+        latency_ms=args.latency_ms, token_ms=args.token_ms,
+        jitter_ms=args.jitter_ms, seed=args.seed, fail_every=args.fail_every,
+    )
+    server = await upstream.start(args.host, args.port)
+    print(f"   mock upstream on http://{args.host}:{args.port}/v1 (latency {args.latency_ms}ms)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--token-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Up to this much extra latency per request")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the jitter, so runs are repeatable")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with a 500")
+    with suppress(KeyboardInterrupt):
+        asyncio.run(_serve(parser.parse_args()))
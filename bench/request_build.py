@@ -0,0 +1,65 @@
+"""Micro-benchmark: cost of building one request's kwargs as history grows.
+
+Each round of the tool loop calls _build_request_kwargs(). Serializing the
+whole history every time (the old `[c.model_dump() for c in history]`) makes
+that O(history); with the client's cached payloads only the messages added
+since the last round are serialized.
+
+No network: the clients are built with a dummy SDK client.
+
+Usage:
+    python -m bench.request_build [--sizes 10 100 1000 5000] [--rounds 200]
+"""
+import argparse
+import time
+from typing import Any
+
+from providers.AnthropicClient import AsyncAnthropicClient
+from providers.OllamaClient import AsyncOllamaClient
+from providers.base import AsyncBaseLLMClient
+from providers.models import Conversation
+from tools.tools import ToolRegistry
+
+
+def make_history(size: int) -> list[Conversation]:
+    return [
+        Conversation(role="user" if i % 2 == 0 else "assistant", content=f"Message {i}: " + "lorem ipsum " * 20)
+        for i in range(size)
+    ]
+
+
+def per_round_us(client: AsyncBaseLLMClient, rounds: int, cached: bool) -> float:
+    """Average µs per round, appending one message and rebuilding the request each round."""
+    def build() -> Any:
+        if cached:
+            return client._build_request_kwargs(client.context)
+        return [c.model_dump() for c in client.conversation_history]
+
+    build()
+    start: float = time.perf_counter()
+    for i in range(rounds):
+        client.conversation_history.append(Conversation(role="user", content=f"[Tool result: {i}]"))
+        build()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'client':<10} {'history':>8} {'model_dump µs':>14} {'cached µs':>10}")
+    for client_class in (AsyncOllamaClient, AsyncAnthropicClient):
+        for size in args.sizes:
+            row: list[float] = []
+            for cached in (False, True):
+                client = client_class(model="bench", instructions="", tool_registry=ToolRegistry(), client=object())
+                client.conversation_history.extend(make_history(size))
+                row.append(per_round_us(client, args.rounds, cached))
+            name: str = client_class.__name__.removeprefix("Async").removesuffix("Client")
+            print(f"{name:<10} {size:>8} {row[0]:>14.1f} {row[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+from typing import Optional
+from sqlalchemy import String, Integer, Float
+from sqlalchemy.orm import mapped_column, Mapped
+from database.Base import Base
+
+
+class ResponseCacheRecord(Base):
+    __tablename__ = "response_cache"
+    cache_key: Mapped[str] = mapped_column(String, primary_key=True)
+    model: Mapped[str] = mapped_column(String, nullable=False)
+    restaurant: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    restaurant_version: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    reply: Mapped[str] = mapped_column(String, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[float] = mapped_column(Float, nullable=False)
+    expires_at: Mapped[float] = mapped_column(Float, nullable=False, index=True)
@@ -3,17 +3,35 @@ from sqlalchemy.orm import sessionmaker
 
 from database.Base import Base
 
+# How long a connection waits for another process's write lock before failing
+SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
 
 def _set_sqlite_pragma(dbapi_conn, connection_record):
     """Enable foreign key enforcement for SQLite connections."""
     cursor = dbapi_conn.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _set_wal(dbapi_conn, connection_record):
+    """Readers don't block the writer (or each other) in WAL mode."""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
     cursor.close()
 
 
-def create_db(db_path: str = ":memory:"):
+def create_db(db_path: str = ":memory:", wal: bool = False):
+    """Session factory for a SQLite file (or an in-memory database).
+
+    Pass `wal` for a file several processes write to, e.g. the gateway's
+    --cache-db shared by its --workers.
+    """
     url = "sqlite://" if db_path == ":memory:" else f"sqlite:///{db_path}"
     engine = create_engine(url)
     event.listen(engine, "connect", _set_sqlite_pragma)
+    if wal and db_path != ":memory:":
+        event.listen(engine, "connect", _set_wal)
     Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine)
\ No newline at end of file
+    return sessionmaker(bind=engine)
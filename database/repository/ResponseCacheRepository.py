@@ -0,0 +1,51 @@
+from sqlalchemy.orm import Session
+
+from database.ResponseCacheRecord import ResponseCacheRecord
+
+
+class ResponseCacheRepository:
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def upsert(self, record: ResponseCacheRecord) -> ResponseCacheRecord:
+        self.session.merge(record)
+        self.session.commit()
+        return record
+
+    def get(self, cache_key: str) -> ResponseCacheRecord | None:
+        return self.session.get(ResponseCacheRecord, cache_key)
+
+    def delete(self, cache_key: str) -> int:
+        count = (
+            self.session.query(ResponseCacheRecord)
+            .filter(ResponseCacheRecord.cache_key == cache_key)
+            .delete()
+        )
+        self.session.commit()
+        return count
+
+    def delete_expired(self, now: float) -> int:
+        count = (
+            self.session.query(ResponseCacheRecord)
+            .filter(ResponseCacheRecord.expires_at <= now)
+            .delete()
+        )
+        self.session.commit()
+        return count
+
+    def delete_stale_restaurant(self, restaurant: str, version: str) -> int:
+        """Delete a restaurant's entries built from any other knowledge version."""
+        count = (
+            self.session.query(ResponseCacheRecord)
+            .filter(
+                ResponseCacheRecord.restaurant == restaurant,
+                ResponseCacheRecord.restaurant_version != version,
+            )
+            .delete()
+        )
+        self.session.commit()
+        return count
+
+    def count(self) -> int:
+        return self.session.query(ResponseCacheRecord).count()
@@ -0,0 +1,142 @@
+"""Admission control: per-model upstream concurrency limits with a fair wait queue.
+
+A local Ollama serves only a few generations at a time; anything beyond that
+just queues inside Ollama until the client times out. The gateway instead
+lets at most `limit` requests per model reach the upstream. Extra requests
+wait in a bounded queue for at most `queue_timeout` seconds, and are
+rejected straight away (429 + Retry-After) when the queue is full.
+
+Waiters are queued per restaurant and a freed slot goes to the next
+restaurant in round-robin order, so one busy restaurant cannot starve the
+others.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+DEFAULT_MAX_CONCURRENCY: int = 4
+DEFAULT_MAX_QUEUE: int = 64
+DEFAULT_QUEUE_TIMEOUT: float = 30.0
+
+# Weight of the latest request in the moving average of upstream service time
+SERVICE_TIME_ALPHA: float = 0.2
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; `retry_after` is in whole seconds."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class _ModelState:
+    limit: int
+    active: int = 0
+    waiting: int = 0
+    # restaurant -> its waiters, in round-robin order
+    queues: OrderedDict[str, deque[asyncio.Future]] = field(default_factory=OrderedDict)
+    service_time: float = 1.0
+
+
+class AdmissionController:
+    """Per-model concurrency limiter with a bounded, restaurant-fair wait queue."""
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+        model_limits: dict[str, int] | None = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.model_limits = model_limits or {}
+        self._models: dict[str, _ModelState] = {}
+        self.rejected: int = 0
+
+    def _state(self, model: str) -> _ModelState:
+        state: _ModelState | None = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelState(limit=self.model_limits.get(model, self.max_concurrency))
+        return state
+
+    def in_flight(self, model: str) -> int:
+        return self._state(model).active
+
+    def queued(self, model: str) -> int:
+        return self._state(model).waiting
+
+    def models(self) -> list[str]:
+        return list(self._models)
+
+    def retry_after(self, model: str) -> int:
+        """Seconds until a slot is likely free, from queue length and recent service time."""
+        state: _ModelState = self._state(model)
+        return max(1, math.ceil(state.service_time * (state.waiting + 1) / state.limit))
+
+    @asynccontextmanager
+    async def admit(self, model: str, restaurant: str | None = None) -> AsyncIterator[None]:
+        """Hold one of the model's upstream slots for the body of the block.
+
+        Raises Overloaded if the queue is full or the wait exceeds the deadline.
+        """
+        state: _ModelState = self._state(model)
+        await self._acquire(state, model, restaurant or "")
+        start: float = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed: float = time.monotonic() - start
+            state.service_time += SERVICE_TIME_ALPHA * (elapsed - state.service_time)
+            self._release(state)
+
+    async def _acquire(self, state: _ModelState, model: str, restaurant: str) -> None:
+        if state.active < state.limit and not state.waiting:
+            state.active += 1
+            return
+        if state.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"Model {model} is at capacity and its queue is full", self.retry_after(model))
+
+        waiter: asyncio.Future = asyncio.get_running_loop().create_future()
+        state.queues.setdefault(restaurant, deque()).append(waiter)
+        state.waiting += 1
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up — pass it on
+                self._release(state)
+            else:
+                waiter.cancel()
+                state.waiting -= 1
+            if isinstance(e, TimeoutError):
+                self.rejected += 1
+                raise Overloaded(
+                    f"Timed out after {self.queue_timeout:g}s waiting for model {model}", self.retry_after(model)
+                ) from None
+            raise
+
+    def _release(self, state: _ModelState) -> None:
+        """Hand the slot to the next restaurant's oldest waiter, or free it."""
+        while state.queues:
+            restaurant, waiters = next(iter(state.queues.items()))
+            waiter: asyncio.Future = waiters.popleft()
+            if waiters:
+                state.queues.move_to_end(restaurant)
+            else:
+                del state.queues[restaurant]
+            if waiter.cancelled():
+                continue
+            state.waiting -= 1
+            waiter.set_result(None)
+            return
+        state.active -= 1
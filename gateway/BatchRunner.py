@@ -0,0 +1,286 @@
+"""Offline batch completions for the gateway (POST /v1/batches).
+
+A batch is a JSONL file with one chat completion per line, in the OpenAI
+batch input format:
+
+    {"custom_id": "q-1", "body": {"model": "llama3.1:8b", "messages": [...]}}
+
+The runner answers at most `concurrency` lines at a time (across all
+batches) and appends each result to the batch's output.jsonl as soon as it
+arrives:
+
+    {"id": "...", "custom_id": "q-1", "response": {"status_code": 200, "body": {...}}, "error": null}
+
+Everything lives under data/batches/<id>/: input.jsonl, output.jsonl and
+batch.json. The output doubles as the checkpoint, so after a restart an
+unfinished batch is resumed and only lines without a result are run again.
+A batch whose input can no longer be read is marked failed instead.
+Each running batch holds a lock on its directory, so with --workers only one
+worker runs it.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Iterator
+
+DEFAULT_ROOT: str = "data/batches"
+DEFAULT_CONCURRENCY: int = 4
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+IN_PROGRESS, COMPLETED, FAILED = "in_progress", "completed", "failed"
+
+_BATCH_ID = re.compile(r"^batch_[0-9a-f]{16}$")
+
+# (batch id, request body, default restaurant) -> (HTTP status, response body)
+Execute = Callable[[str, dict[str, Any], str | None], Awaitable[tuple[int, dict[str, Any]]]]
+
+
+class BatchError(ValueError):
+    """The submitted batch file is malformed."""
+
+
+@dataclass
+class _Job:
+    id: str
+    directory: Path
+    restaurant: str | None
+    total: int
+    completed: int = 0
+    failed: int = 0
+    lock: IO | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+
+def parse_batch(data: bytes) -> list[tuple[str, dict[str, Any]]]:
+    """(custom_id, body) for every line of a batch input file."""
+    items: list[tuple[str, dict[str, Any]]] = []
+    seen: set[str] = set()
+    try:
+        text: str = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise BatchError(f"Batch file is not UTF-8: {e}")
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item: Any = json.loads(line)
+        except ValueError as e:
+            raise BatchError(f"Line {number}: invalid JSON: {e}")
+        if not isinstance(item, dict) or not isinstance(item.get("body"), dict):
+            raise BatchError(f"Line {number}: expected an object with a \"body\" object")
+        custom_id: Any = item.get("custom_id")
+        if not isinstance(custom_id, str) or not custom_id:
+            raise BatchError(f"Line {number}: \"custom_id\" must be a non-empty string")
+        if custom_id in seen:
+            raise BatchError(f"Line {number}: duplicate custom_id {custom_id!r}")
+        if item.get("url", CHAT_COMPLETIONS_URL) != CHAT_COMPLETIONS_URL:
+            raise BatchError(f"Line {number}: only {CHAT_COMPLETIONS_URL} is supported")
+        seen.add(custom_id)
+        items.append((custom_id, item["body"]))
+    if not items:
+        raise BatchError("Batch file has no requests")
+    return items
+
+
+class BatchRunner:
+    """Runs batch files through `execute` with bounded concurrency, checkpointing to disk."""
+
+    def __init__(self, root: str = DEFAULT_ROOT, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        self.root = Path(root)
+        self.concurrency = concurrency
+        # Set by the GatewayServer that owns this runner
+        self.execute: Execute | None = None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._jobs: dict[str, _Job] = {}
+
+    def submit(self, data: bytes, restaurant: str | None = None) -> dict[str, Any]:
+        """Store a new batch and start running it. Raises BatchError for a bad file."""
+        items: list[tuple[str, dict[str, Any]]] = parse_batch(data)
+        batch_id: str = f"batch_{uuid.uuid4().hex[:16]}"
+        directory: Path = self.root / batch_id
+        directory.mkdir(parents=True)
+        (directory / "input.jsonl").write_bytes(data)
+        (directory / "output.jsonl").touch()
+        _write_json(directory / "batch.json", {
+            "id": batch_id,
+            "status": IN_PROGRESS,
+            "restaurant": restaurant,
+            "total": len(items),
+            "created_at": int(time.time()),
+            "completed_at": None,
+        })
+        self._start(batch_id, items)
+        return self.status(batch_id)
+
+    def resume(self) -> list[str]:
+        """Restart every unfinished batch on disk that no other process is running.
+
+        A batch whose input.jsonl is missing or malformed is marked failed and skipped.
+        """
+        resumed: list[str] = []
+        if not self.root.is_dir():
+            return resumed
+        for directory in sorted(self.root.iterdir()):
+            meta: dict[str, Any] | None = self._meta(directory.name)
+            if meta is None or meta["status"] != IN_PROGRESS or directory.name in self._jobs:
+                continue
+            try:
+                items = parse_batch((directory / "input.jsonl").read_bytes())
+            except (OSError, BatchError) as e:
+                _write_json(directory / "batch.json", {
+                    **meta, "status": FAILED, "completed_at": int(time.time()), "error": f"Cannot resume: {e}",
+                })
+                print(f"[chat-client-toy] batch {directory.name} failed: cannot resume: {e}", flush=True)
+                continue
+            if self._start(directory.name, items):
+                resumed.append(directory.name)
+        return resumed
+
+    def status(self, batch_id: str) -> dict[str, Any] | None:
+        """The OpenAI-style batch object, or None for an unknown id."""
+        meta: dict[str, Any] | None = self._meta(batch_id)
+        if meta is None:
+            return None
+        job: _Job | None = self._jobs.get(batch_id)
+        if job is not None:
+            completed, failed = job.completed, job.failed
+        else:
+            completed, failed = _count_results(self.root / batch_id / "output.jsonl")
+        return {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": CHAT_COMPLETIONS_URL,
+            "status": meta["status"],
+            "created_at": meta["created_at"],
+            "completed_at": meta["completed_at"],
+            "request_counts": {"total": meta["total"], "completed": completed, "failed": failed},
+            "output_url": f"/v1/batches/{batch_id}/output",
+            "errors": {"data": [{"message": meta["error"]}]} if meta.get("error") else None,
+        }
+
+    def output(self, batch_id: str) -> bytes | None:
+        """The results written so far, or None for an unknown id."""
+        if self._meta(batch_id) is None:
+            return None
+        return (self.root / batch_id / "output.jsonl").read_bytes()
+
+    async def close(self) -> None:
+        """Stop running batches; they resume from their checkpoint next time."""
+        tasks: list[asyncio.Task] = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # A task cancelled before it started never ran its own cleanup
+        for job in self._jobs.values():
+            if job.lock is not None:
+                job.lock.close()
+        self._jobs.clear()
+
+    def _meta(self, batch_id: str) -> dict[str, Any] | None:
+        if not _BATCH_ID.match(batch_id):
+            return None
+        try:
+            return json.loads((self.root / batch_id / "batch.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _start(self, batch_id: str, items: list[tuple[str, dict[str, Any]]]) -> bool:
+        directory: Path = self.root / batch_id
+        lock: IO = open(directory / "lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return False
+        meta: dict[str, Any] = json.loads((directory / "batch.json").read_text())
+        job = _Job(id=batch_id, directory=directory, restaurant=meta["restaurant"], total=len(items), lock=lock)
+        self._jobs[batch_id] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, items))
+        return True
+
+    async def _run(self, job: _Job, items: list[tuple[str, dict[str, Any]]]) -> None:
+        try:
+            done: set[str] = _checkpoint(job)
+            pending: Iterator[tuple[str, dict[str, Any]]] = iter(
+                (custom_id, body) for custom_id, body in items if custom_id not in done
+            )
+            with open(job.directory / "output.jsonl", "a", encoding="utf-8") as out:
+                workers = [self._work(job, pending, out) for _ in range(min(self.concurrency, job.total))]
+                await asyncio.gather(*workers)
+
+            meta: dict[str, Any] = json.loads((job.directory / "batch.json").read_text())
+            _write_json(job.directory / "batch.json", {**meta, "status": COMPLETED, "completed_at": int(time.time())})
+            print(f"[chat-client-toy] batch {job.id} completed: {job.completed} ok, {job.failed} failed")
+        finally:
+            self._jobs.pop(job.id, None)
+            if job.lock is not None:
+                job.lock.close()
+
+    async def _work(self, job: _Job, pending: Iterator[tuple[str, dict[str, Any]]], out: IO) -> None:
+        for custom_id, body in pending:
+            async with self._slots:
+                try:
+                    status, payload = await self.execute(job.id, body, job.restaurant)
+                except Exception as e:
+                    status, payload = 500, {"error": {"message": str(e), "type": "server_error"}}
+            ok: bool = status == 200
+            out.write(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:8]}",
+                "custom_id": custom_id,
+                "response": {"status_code": status, "body": payload},
+                "error": None if ok else payload.get("error"),
+            }) + "\n")
+            out.flush()
+            if ok:
+                job.completed += 1
+            else:
+                job.failed += 1
+
+
+def _checkpoint(job: _Job) -> set[str]:
+    """custom_ids already answered; drops a line torn by a crash mid-write."""
+    path: Path = job.directory / "output.jsonl"
+    text: str = path.read_text(encoding="utf-8")
+    results: list[dict[str, Any]] = []
+    torn: bool = bool(text) and not text.endswith("\n")
+    for line in text.splitlines():
+        try:
+            results.append(json.loads(line))
+        except ValueError:
+            torn = True
+    if torn:
+        path.write_text("".join(json.dumps(r) + "\n" for r in results), encoding="utf-8")
+    job.completed = sum(1 for r in results if r.get("error") is None)
+    job.failed = len(results) - job.completed
+    return {r["custom_id"] for r in results}
+
+
+def _count_results(path: Path) -> tuple[int, int]:
+    completed = failed = 0
+    try:
+        lines: list[str] = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return 0, 0
+    for line in lines:
+        try:
+            result: dict[str, Any] = json.loads(line)
+        except ValueError:
+            continue
+        if result.get("error") is None:
+            completed += 1
+        else:
+            failed += 1
+    return completed, failed
+
+
+def _write_json(path: Path, payload: dict[str, Any]) -> None:
+    """Replace `path` atomically so a crash never leaves half a file."""
+    tmp: Path = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload))
+    os.replace(tmp, path)
@@ -0,0 +1,104 @@
+"""Reusable provider clients for the gateway, one per model.
+
+Building an AsyncOllamaClient per request creates a new AsyncOpenAI
+instance, a new httpx connection pool (so a fresh TCP/TLS handshake to the
+upstream) and a new ToolRegistry. The pool instead keeps one client per
+model and serves every request on it: a lease hands out that client with a
+fresh CallContext (providers/context.py) carrying the request's system
+prompt, history and tools, so concurrent conversations share the client's
+keep-alive connections without sharing any state.
+
+warm_up() sends one short request per model at startup, so the upstream has
+the model loaded (Ollama otherwise loads it on the first real request) and
+the pool already holds a client with an open connection.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from providers.OllamaClient import AsyncOllamaClient
+from providers.base import AsyncBaseLLMClient
+from providers.context import CallContext
+from providers.models import Conversation
+from providers.retry import RetryPolicy
+from tools.tools import ToolRegistry
+
+WARMUP_PROMPT: str = "Reply with OK."
+
+
+class ClientPool:
+    """One LLM client per model, shared by every conversation through per-call contexts."""
+
+    def __init__(
+        self,
+        tool_registry: ToolRegistry,
+        client_class: type[AsyncBaseLLMClient] = AsyncOllamaClient,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        self.tool_registry = tool_registry
+        self.client_class = client_class
+        # Models served by a different provider than `client_class` (e.g. a hedge target)
+        self.client_classes: dict[str, type[AsyncBaseLLMClient]] = {}
+        # Used by clients created from now on; None means the client class's default
+        self.retry_policy = retry_policy
+        self._sdk_clients: dict[str, Any] = {}
+        self._clients: dict[str, AsyncBaseLLMClient] = {}
+        self.created: int = 0
+        self.leased: int = 0
+
+    def client(self, model: str) -> AsyncBaseLLMClient:
+        """The shared client for `model`, created on first use."""
+        client: AsyncBaseLLMClient | None = self._clients.get(model)
+        if client is None:
+            self.created += 1
+            client_class: type[AsyncBaseLLMClient] = self.client_classes.get(model, self.client_class)
+            client = client_class(
+                model=model,
+                instructions="",
+                tool_registry=self.tool_registry,
+                client=self._sdk_clients.get(model),
+                retry_policy=self.retry_policy,
+            )
+            self._sdk_clients.setdefault(model, client.client)
+            self._clients[model] = client
+        return client
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        model: str,
+        instructions: str,
+        history: list[Conversation] | None = None,
+        tool_registry: ToolRegistry | None = None,
+    ) -> AsyncIterator[tuple[AsyncBaseLLMClient, CallContext]]:
+        """The model's client and a new context for one call, primed with this request's prompt and history.
+
+        `tool_registry` overrides the pool's default tools for this call only.
+        """
+        client: AsyncBaseLLMClient = self.client(model)
+        self.leased += 1
+        yield client, client.new_context(list(history or []), instructions, tool_registry)
+
+    async def warm_up(self, models: list[str], timeout: float) -> dict[str, float | BaseException]:
+        """Send WARMUP_PROMPT to every model at once, without tools.
+
+        Returns model -> seconds taken, or the error it failed with; never raises.
+        """
+        async def one(model: str) -> float:
+            start: float = time.monotonic()
+            async with self.lease(model, "", tool_registry=ToolRegistry()) as (client, context):
+                await asyncio.wait_for(client.generate_response(WARMUP_PROMPT, context), timeout)
+            return time.monotonic() - start
+
+        results: list[float | BaseException] = await asyncio.gather(
+            *(one(model) for model in models), return_exceptions=True
+        )
+        return dict(zip(models, results))
+
+    async def close(self) -> None:
+        """Close every upstream connection pool."""
+        for sdk_client in self._sdk_clients.values():
+            await sdk_client.close()
+        self._sdk_clients.clear()
+        self._clients.clear()
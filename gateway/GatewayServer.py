@@ -0,0 +1,702 @@
+"""Asyncio gateway engine for the OpenAI-compatible /v1/chat/completions endpoint.
+
+One persistent event loop serves every connection, so a slow upstream
+completion only occupies a coroutine instead of the whole server.
+
+Every restaurant under restaurants/ is served by the same process. A request
+picks its tenant (first match wins) by:
+  - path prefix:   POST /restaurants/<slug>/v1/chat/completions
+  - header:        X-Restaurant: <slug>
+  - model suffix:  "model": "llama3.1:8b@<slug>"
+and otherwise falls back to the server's default restaurant, if any.
+
+Completions for restaurant requests are cached (gateway/ResponseCache.py)
+when a cache is configured; every response says HIT, MISS or BYPASS in its
+X-Cache header. Send "Cache-Control: no-cache" to skip the cache.
+
+Requests that reach the upstream go through the AdmissionController, if
+one is configured: per-model concurrency limits, a bounded restaurant-fair
+wait queue, and 429 + Retry-After when the model is saturated.
+
+With a SessionStore the conversation can live server-side: send
+"session": true to open a session, then "session_id" (or an X-Session-Id
+header) with only the new user turn. The id comes back in the response body
+and X-Session-Id header; an expired id gets a 404, so resend the full history.
+
+With a HedgePolicy, requests the primary model is slow to answer (past the
+p95 of its recent latencies) are duplicated to a secondary model from another
+provider, and connection errors fail over to it (gateway/HedgePolicy.py).
+
+POST /v1/batches takes a JSONL file of chat requests and runs it in the
+background (gateway/BatchRunner.py); poll GET /v1/batches/<id> and fetch
+results from GET /v1/batches/<id>/output.
+
+GET /metrics serves Prometheus text-format metrics (gateway/Metrics.py).
+
+warm_up() loads the configured models upstream before the server starts
+taking traffic. drain() is the graceful half of shutdown: stop listening,
+close idle connections, let in-flight requests finish up to a deadline.
+
+With context="sections" only the knowledge sections relevant to the latest
+user turns are put in the system prompt (services/SectionIndex.py) instead
+of every markdown file the restaurant has.
+"""
+import asyncio
+import socket
+import time
+from contextlib import aclosing, nullcontext, suppress
+from functools import partial
+from typing import Any, AsyncIterator, Callable
+
+from gateway.AdmissionController import AdmissionController, Overloaded
+from gateway.BatchRunner import BatchError, BatchRunner
+from gateway.ClientPool import ClientPool
+from gateway.HedgePolicy import HedgePolicy
+from gateway.Metrics import CONTENT_TYPE, Counter, Gauge, Metrics
+from gateway.ResponseCache import BYPASS, CACHE_HEADER, HIT, MISS, ResponseCache, cache_key
+from gateway.RestaurantRegistry import RestaurantRegistry
+from gateway.SessionStore import Session, SessionStore
+from gateway.completions import (
+    ChatRequest,
+    completion_chunk,
+    completion_id,
+    completion_response,
+    parse_chat_request,
+)
+from gateway.protocol import (
+    MAX_BODY_BYTES,
+    MAX_HEADER_BYTES,
+    SSE_HEADERS,
+    ProtocolError,
+    Request,
+    ResponseWriter,
+    error_payload,
+    read_request,
+    sse_event,
+)
+from providers.ProviderFactory import ProviderFactory
+from providers.base import DEFAULT_API_TIMEOUT
+from providers.errors.ProviderError import ProviderError
+from providers.models import Conversation, Usage
+from providers.retry import NO_RETRY
+from tools.tools import ToolRegistry, registry
+
+CHAT_COMPLETIONS_PATH = "/v1/chat/completions"
+BATCHES_PATH = "/v1/batches"
+METRICS_PATH = "/metrics"
+RESTAURANT_PATH_PREFIX = "/restaurants/"
+RESTAURANT_HEADER = "x-restaurant"
+SESSION_HEADER = "X-Session-Id"
+CONTEXT_MODES = ("full", "sections")
+
+# Seconds a keep-alive connection may sit idle before it is closed
+DEFAULT_KEEP_ALIVE_TIMEOUT: float = 5.0
+# Idle keep-alive connections held at once; responses beyond it say Connection: close
+DEFAULT_MAX_IDLE_CONNECTIONS: int = 256
+# Seconds a startup warmup request may take (a cold Ollama model load included)
+DEFAULT_WARMUP_TIMEOUT: float = 120.0
+# Seconds in-flight requests get to finish on shutdown before they are cut off
+DEFAULT_DRAIN_TIMEOUT: float = 10.0
+
+
+def split_restaurant_path(path: str) -> tuple[str | None, str]:
+    """Split "/restaurants/<slug>/v1/..." into ("<slug>", "/v1/...")."""
+    if not path.startswith(RESTAURANT_PATH_PREFIX):
+        return None, path
+    slug, _, rest = path[len(RESTAURANT_PATH_PREFIX):].partition("/")
+    return slug, "/" + rest
+
+
+class GatewayServer:
+    """Serves /v1/chat/completions for many concurrent clients on one event loop."""
+
+    def __init__(
+        self,
+        model: str,
+        default_restaurant: str | None = None,
+        restaurants: RestaurantRegistry | None = None,
+        context: str = "full",
+        cache: ResponseCache | None = None,
+        admission: AdmissionController | None = None,
+        sessions: SessionStore | None = None,
+        batches: BatchRunner | None = None,
+        hedge: HedgePolicy | None = None,
+        max_body_bytes: int = MAX_BODY_BYTES,
+        keep_alive_timeout: float = DEFAULT_KEEP_ALIVE_TIMEOUT,
+        max_idle_connections: int = DEFAULT_MAX_IDLE_CONNECTIONS,
+    ) -> None:
+        if context not in CONTEXT_MODES:
+            raise ValueError(f"context must be one of {CONTEXT_MODES}, got {context!r}")
+        self.model = model
+        self.context = context
+        self.default_restaurant = default_restaurant
+        self.restaurants = restaurants if restaurants is not None else RestaurantRegistry()
+        self.cache = cache
+        self.admission = admission
+        self.sessions = sessions
+        self.batches = batches
+        if batches is not None:
+            batches.execute = self._batch_item
+        if cache is not None:
+            self.restaurants.on_load.append(cache.invalidate_restaurant)
+        self.hedge = hedge
+        self.max_body_bytes = max_body_bytes
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_idle_connections = max_idle_connections
+        self._idle_connections: int = 0
+        # Connection handler tasks, and the subset waiting for their next request
+        self._connections: set[asyncio.Task] = set()
+        self._waiting: set[asyncio.Task] = set()
+        # Writers of connections with a request in flight
+        self._busy: set[ResponseWriter] = set()
+        self._draining: bool = False
+        self.pool = ClientPool(tool_registry=registry)
+        self.metrics = Metrics()
+        if hedge is not None:
+            # A failing primary fails over to the secondary instead of being retried
+            self.pool.retry_policy = NO_RETRY
+            self.pool.client_classes[hedge.secondary] = ProviderFactory.provider_class(hedge.secondary)
+            hedge.on_hedge.append(self.metrics.hedged_requests.inc)
+        self._register_gauges()
+        # Disable tools in restaurant mode — menu is in the system prompt
+        self._restaurant_tools = ToolRegistry()
+        self._server: asyncio.Server | None = None
+        self._session_sweep: asyncio.Task | None = None
+
+    def _register_gauges(self) -> None:
+        """Expose state other components already track, read at scrape time."""
+        admission: AdmissionController | None = self.admission
+        if admission is not None:
+            self.metrics.queue_depth.collect = lambda: {(m,): admission.queued(m) for m in admission.models()}
+        self.metrics.extra.append(Gauge(
+            "gateway_restaurants_loaded_bytes", "Knowledge bytes of restaurants held in memory.",
+            collect=lambda: {(): self.restaurants.loaded_bytes},
+        ))
+        cache: ResponseCache | None = self.cache
+        if cache is not None:
+            self.metrics.extra.append(Gauge(
+                "gateway_cache_bytes", "Reply bytes held in the in-memory response cache.",
+                collect=lambda: {(): cache.size_bytes},
+            ))
+        sessions: SessionStore | None = self.sessions
+        if sessions is not None:
+            self.metrics.extra.append(Gauge(
+                "gateway_sessions", "Conversation sessions held server-side.",
+                collect=lambda: {(): len(sessions)},
+            ))
+            self.metrics.extra.append(Counter(
+                "gateway_sessions_created_total", "Sessions opened.",
+                collect=lambda: {(): sessions.created},
+            ))
+            self.metrics.extra.append(Counter(
+                "gateway_sessions_closed_total", "Sessions dropped, by reason (expired, evicted).", ("reason",),
+                collect=lambda: {("expired",): sessions.expired, ("evicted",): sessions.evicted},
+            ))
+
+    async def start(
+        self, host: str = "0.0.0.0", port: int = 8100, sock: socket.socket | None = None
+    ) -> asyncio.Server:
+        """Bind the listening socket (or serve an inherited `sock`). Call serve_forever() to run."""
+        if sock is not None:
+            self._server = await asyncio.start_server(self._handle_connection, sock=sock, limit=MAX_HEADER_BYTES)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection, host, port, limit=MAX_HEADER_BYTES
+            )
+        if self.batches is not None:
+            for batch_id in self.batches.resume():
+                print(f"[chat-client-toy] resuming batch {batch_id}")
+        if self.sessions is not None:
+            self._session_sweep = asyncio.create_task(self.sessions.sweep())
+        return self._server
+
+    async def warm_up(self, timeout: float = DEFAULT_WARMUP_TIMEOUT) -> None:
+        """Load the model (and hedge model) upstream and prime the client pool. Failures are logged, not raised."""
+        models: list[str] = [self.model]
+        if self.hedge is not None:
+            models.append(self.hedge.secondary)
+        for model, result in (await self.pool.warm_up(models, timeout)).items():
+            if isinstance(result, BaseException):
+                reason: str = str(result) or f"no reply within {timeout:g}s"
+                print(f"[chat-client-toy] warmup of {model} failed: {reason}", flush=True)
+            else:
+                print(f"[chat-client-toy] warmed up {model} in {result:.1f}s", flush=True)
+
+    async def drain(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> bool:
+        """Stop accepting work and wait up to `timeout` for in-flight requests.
+
+        Idle connections are closed at once; busy ones get Connection: close on
+        their last response (unless its head has already been sent). Returns
+        False if requests had to be cut off.
+        """
+        self._draining = True
+        if self._server is not None:
+            self._server.close()
+        for task in self._waiting:
+            task.cancel()
+        for writer in self._busy:
+            writer.close_after_response()
+        if not self._connections:
+            return True
+        _, unfinished = await asyncio.wait(self._connections, timeout=timeout)
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        return not unfinished
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            raise RuntimeError("GatewayServer.start() must be called first")
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        if self._session_sweep is not None:
+            self._session_sweep.cancel()
+            await asyncio.gather(self._session_sweep, return_exceptions=True)
+        if self.batches is not None:
+            await self.batches.close()
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.close)
+        await self.pool.close()
+
+    # ─────────────────────────────────────────
+    # Connection handling
+    # ─────────────────────────────────────────
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, stream_writer: asyncio.StreamWriter) -> None:
+        """Serve requests on one connection until either side closes it.
+
+        Pipelined requests are answered in order: the next one is only read
+        once the previous response has been written.
+        """
+        writer = ResponseWriter(stream_writer)
+        first: bool = True
+        task: asyncio.Task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while not self._draining:
+                try:
+                    request: Request | None = await self._next_request(reader, first)
+                except ProtocolError as e:
+                    writer.keep_alive = False
+                    await writer.send_json(e.status, error_payload(str(e)))
+                    return
+                if request is None:
+                    return
+                first = False
+
+                writer.begin(
+                    request.keep_alive and not self._draining and self._idle_connections < self.max_idle_connections
+                )
+                self._busy.add(writer)
+                try:
+                    status: int = await self._dispatch(request, writer)
+                finally:
+                    self._busy.discard(writer)
+                self.log_request(request, status)
+                if not writer.keep_alive:
+                    return
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        except asyncio.CancelledError:
+            # drain() cut the connection off; finishing normally keeps asyncio
+            # from logging the cancellation as an unhandled error
+            pass
+        finally:
+            self._connections.discard(task)
+            stream_writer.close()
+            with suppress(Exception):
+                await stream_writer.wait_closed()
+
+    async def _next_request(self, reader: asyncio.StreamReader, first: bool) -> Request | None:
+        task: asyncio.Task = asyncio.current_task()
+        self._waiting.add(task)
+        try:
+            if first:
+                return await read_request(reader, self.max_body_bytes)
+            self._idle_connections += 1
+            try:
+                return await read_request(reader, self.max_body_bytes, idle_timeout=self.keep_alive_timeout)
+            finally:
+                self._idle_connections -= 1
+        finally:
+            self._waiting.discard(task)
+
+    async def _dispatch(self, request: Request, writer: ResponseWriter) -> int:
+        """Handle one request, write the response and return its status code."""
+        if request.path == METRICS_PATH and request.method == "GET":
+            await writer.send(200, self.metrics.render().encode(), {"Content-Type": CONTENT_TYPE})
+            return 200
+
+        path_slug, path = split_restaurant_path(request.path)
+        if path == BATCHES_PATH or path.startswith(BATCHES_PATH + "/"):
+            return await self._serve_batches(request, path, path_slug, writer)
+        if path != CHAT_COMPLETIONS_PATH:
+            return await self._reject(writer, 404, f"Unknown path: {request.path}")
+        if request.method != "POST":
+            return await self._reject(writer, 405, f"Method {request.method} not allowed")
+
+        try:
+            body: Any = request.json()
+            if not isinstance(body, dict):
+                raise ProtocolError(400, "Request body must be a JSON object")
+            body, restaurant = await self._resolve_restaurant(body, path_slug or request.headers.get(RESTAURANT_HEADER))
+            session: Session | None = self._resolve_session(request, body, restaurant)
+        except LookupError as e:
+            return await self._reject(writer, 404, str(e))
+        except ProtocolError as e:
+            return await self._reject(writer, e.status, str(e))
+
+        # Turns on one session run one at a time, each seeing the last one's reply
+        async with session.lock if session is not None else nullcontext():
+            try:
+                chat: ChatRequest = self._parse_chat(body, restaurant, session)
+            except (KeyError, TypeError, ValueError) as e:
+                return await self._reject(writer, 400, f"Malformed chat request: {e}")
+
+            on_reply: Callable[[str], None] | None = None
+            if session is None and body.get("session") is True and self.sessions is not None:
+                session = self.sessions.create(chat.model, chat.restaurant, chat.instructions)
+            if session is not None:
+                chat.session_id = session.id
+                new_turns: list[Conversation] = chat.history[len(session.history):]
+                new_turns.append(Conversation(role="user", content=chat.query))
+                on_reply = partial(self.sessions.record_turn, session, new_turns)
+
+            start: float = time.monotonic()
+            status: int = await self._serve_chat(request, chat, restaurant, writer, start, on_reply)
+        labels: tuple[str, str] = (chat.restaurant or "", chat.model)
+        self.metrics.requests.inc(*labels, str(status))
+        self.metrics.request_duration.observe(time.monotonic() - start, *labels)
+        return status
+
+    def _parse_chat(self, body: dict[str, Any], restaurant: dict | None, session: Session | None) -> ChatRequest:
+        retrieve = self.restaurants.retriever(restaurant["slug"]) if restaurant and self.context == "sections" else None
+        if session is None:
+            return parse_chat_request(body, self.model, restaurant, retrieve)
+        return parse_chat_request(
+            body, session.model, restaurant, retrieve, prior_history=session.history, default_system=session.system
+        )
+
+    def _resolve_session(self, request: Request, body: dict[str, Any], restaurant: dict | None) -> Session | None:
+        """The session this request continues, if it names one."""
+        session_id: Any = body.get("session_id") or request.headers.get(SESSION_HEADER.lower())
+        if not session_id:
+            return None
+        if self.sessions is None:
+            raise ProtocolError(400, "Sessions are not enabled on this gateway")
+        if not isinstance(session_id, str):
+            raise ProtocolError(400, "session_id must be a string")
+        session: Session | None = self.sessions.get(session_id)
+        if session is None:
+            raise LookupError(f"Unknown or expired session: {session_id}; resend the full conversation")
+        slug: str | None = restaurant.get("slug") if restaurant else None
+        if session.restaurant != slug:
+            raise ProtocolError(400, f"Session {session_id} belongs to restaurant {session.restaurant or '(none)'}")
+        return session
+
+    async def _reject(self, writer: ResponseWriter, status: int, message: str) -> int:
+        """Answer a request that never got as far as a model."""
+        self.metrics.requests.inc("", "", str(status))
+        return await self._send_json(writer, status, error_payload(message))
+
+    async def _serve_chat(
+        self,
+        request: Request,
+        chat: ChatRequest,
+        restaurant: dict | None,
+        writer: ResponseWriter,
+        start: float,
+        on_reply: Callable[[str], None] | None = None,
+    ) -> int:
+        """Answer from the cache or, once admitted, from the upstream.
+
+        `on_reply` gets the reply text once it has been produced successfully.
+        """
+        session_headers: dict[str, str] = {SESSION_HEADER: chat.session_id} if chat.session_id else {}
+        version: str | None = restaurant.get("version") if restaurant else None
+        key: str | None = cache_key(chat, version) if self._cacheable(request, chat) else None
+        if key is not None:
+            cached: str | None = await self.cache.aget(key)
+            if cached is not None:
+                self.metrics.cache_lookups.inc(HIT)
+                headers: dict[str, str] = {CACHE_HEADER: HIT, **session_headers}
+                if chat.stream:
+                    return await self._stream_completion(chat, writer, _replay(cached), headers, on_reply)
+                if on_reply is not None:
+                    on_reply(cached)
+                return await self._send_json(writer, 200, self._completion_payload(chat, cached), headers)
+
+        headers = {CACHE_HEADER: MISS if key is not None else BYPASS, **session_headers}
+        self.metrics.cache_lookups.inc(headers[CACHE_HEADER])
+        store: Callable[[str], None] | None = on_reply
+        if key is not None:
+            store = _chain(partial(self.cache.put, key, chat, restaurant_version=version), on_reply)
+
+        admission = self.admission.admit(chat.model, chat.restaurant) if self.admission else nullcontext()
+        try:
+            async with admission:
+                return await self._respond(chat, writer, headers, store, start)
+        except Overloaded as e:
+            return await self._send_json(
+                writer, 429, error_payload(str(e), error_type="rate_limit_error"),
+                {**headers, "Retry-After": str(e.retry_after)},
+            )
+
+    async def _respond(
+        self,
+        chat: ChatRequest,
+        writer: ResponseWriter,
+        headers: dict[str, str],
+        store: Callable[[str], None] | None,
+        start: float,
+    ) -> int:
+        """Run the completion upstream and write it back, streamed or whole."""
+        if chat.stream:
+            return await self._stream_completion(chat, writer, self.stream(chat), headers, store, start)
+
+        try:
+            reply: str = await self.complete(chat)
+        except ProviderError as e:
+            return await self._send_json(writer, 502, error_payload(str(e), error_type="upstream_error"), headers)
+        # Timeouts come back as an "[Error: ...]" reply rather than an exception
+        if store is not None and not reply.startswith("[Error:"):
+            store(reply)
+        return await self._send_json(writer, 200, self._completion_payload(chat, reply), headers)
+
+    @staticmethod
+    def _completion_payload(chat: ChatRequest, reply: str) -> dict[str, Any]:
+        payload: dict[str, Any] = completion_response(chat.model, reply)
+        if chat.session_id:
+            payload["session_id"] = chat.session_id
+        return payload
+
+    def _cacheable(self, request: Request, chat: ChatRequest) -> bool:
+        """Only tool-free (restaurant) requests are cached — tool results can be live data."""
+        if self.cache is None or not chat.restaurant:
+            return False
+        cache_control: str = request.headers.get("cache-control", "").lower()
+        return "no-cache" not in cache_control and "no-store" not in cache_control
+
+    async def _resolve_restaurant(
+        self, body: dict[str, Any], requested: str | None
+    ) -> tuple[dict[str, Any], dict | None]:
+        """Pick the tenant for this request; strips a "@<slug>" model suffix from the body.
+
+        `requested` is the slug named by the path or X-Restaurant header, which wins.
+        """
+        model: Any = body.get("model")
+        model_slug: str | None = None
+        if isinstance(model, str) and "@" in model:
+            model, _, model_slug = model.rpartition("@")
+            body = {**body, "model": model}
+
+        slug: str | None = requested or model_slug or self.default_restaurant
+        if not slug:
+            return body, None
+        restaurant: dict | None = await self.restaurants.aget(slug)
+        if restaurant is None:
+            raise LookupError(f"Unknown restaurant: {slug}")
+        return body, restaurant
+
+    # ─────────────────────────────────────────
+    # Batches
+    # ─────────────────────────────────────────
+
+    async def _serve_batches(
+        self, request: Request, path: str, path_slug: str | None, writer: ResponseWriter
+    ) -> int:
+        """POST /v1/batches, GET /v1/batches/<id> and GET /v1/batches/<id>/output."""
+        if self.batches is None:
+            return await self._reject(writer, 404, "Batches are not enabled on this gateway")
+        parts: list[str] = path[len(BATCHES_PATH):].strip("/").split("/")
+        if parts == [""]:
+            if request.method != "POST":
+                return await self._reject(writer, 405, f"Method {request.method} not allowed")
+            slug: str | None = path_slug or request.headers.get(RESTAURANT_HEADER)
+            if slug and not self.restaurants.exists(slug):
+                return await self._reject(writer, 404, f"Unknown restaurant: {slug}")
+            try:
+                batch: dict[str, Any] = self.batches.submit(request.body, slug)
+            except (BatchError, UnicodeDecodeError) as e:
+                return await self._reject(writer, 400, f"Malformed batch file: {e}")
+            return await self._send_json(writer, 200, batch)
+
+        if request.method != "GET" or len(parts) > 2 or parts[1:] not in ([], ["output"]):
+            return await self._reject(writer, 404, f"Unknown path: {request.path}")
+        if parts[1:] == ["output"]:
+            output: bytes | None = self.batches.output(parts[0])
+            if output is not None:
+                await writer.send(200, output, {"Content-Type": "application/jsonl"})
+                return 200
+        else:
+            status: dict[str, Any] | None = self.batches.status(parts[0])
+            if status is not None:
+                return await self._send_json(writer, 200, status)
+        return await self._reject(writer, 404, f"Unknown batch: {parts[0]}")
+
+    async def _batch_item(
+        self, batch_id: str, body: dict[str, Any], restaurant_slug: str | None
+    ) -> tuple[int, dict[str, Any]]:
+        """Answer one line of a batch; returns (status, response body) instead of writing it."""
+        try:
+            body, restaurant = await self._resolve_restaurant(body, restaurant_slug)
+            chat: ChatRequest = self._parse_chat({**body, "stream": False}, restaurant, None)
+        except LookupError as e:
+            return 404, error_payload(str(e))
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, error_payload(f"Malformed chat request: {e}")
+
+        version: str | None = restaurant.get("version") if restaurant else None
+        key: str | None = cache_key(chat, version) if self.cache is not None and chat.restaurant else None
+        if key is not None:
+            cached: str | None = await self.cache.aget(key)
+            if cached is not None:
+                return 200, completion_response(chat.model, cached)
+
+        while True:
+            # The whole batch is one tenant in the admission queue, so it can't crowd out live traffic
+            admission = self.admission.admit(chat.model, batch_id) if self.admission else nullcontext()
+            try:
+                async with admission:
+                    reply: str = await self.complete(chat)
+                break
+            except Overloaded as e:
+                await asyncio.sleep(e.retry_after)
+            except ProviderError as e:
+                return 502, error_payload(str(e), error_type="upstream_error")
+        if reply.startswith("[Error:"):
+            return 504, error_payload(reply, error_type="upstream_error")
+        if key is not None:
+            self.cache.put(key, chat, reply, restaurant_version=version)
+        return 200, completion_response(chat.model, reply)
+
+    async def _send_json(
+        self, writer: ResponseWriter, status: int, payload: dict[str, Any], headers: dict[str, str] | None = None
+    ) -> int:
+        await writer.send_json(status, payload, headers)
+        return status
+
+    async def _stream_completion(
+        self,
+        chat: ChatRequest,
+        writer: ResponseWriter,
+        source: AsyncIterator[str],
+        headers: dict[str, str] | None = None,
+        on_complete: Callable[[str], None] | None = None,
+        started_at: float | None = None,
+    ) -> int:
+        """Relay deltas as OpenAI chat.completion.chunk server-sent events.
+
+        `on_complete` gets the full reply text if the stream finished cleanly.
+        Pass the request's `started_at` to record time-to-first-token.
+        """
+        chunk_id: str = completion_id()
+        writer.start_stream(200, {**SSE_HEADERS, **(headers or {})})
+        writer.write(sse_event(completion_chunk(chunk_id, chat.model, {"role": "assistant", "content": ""})))
+        await writer.drain()
+
+        parts: list[str] = []
+        try:
+            async with aclosing(source) as deltas:
+                async for delta in deltas:
+                    if started_at is not None and not parts:
+                        self.metrics.time_to_first_token.observe(time.monotonic() - started_at, chat.model)
+                    parts.append(delta)
+                    writer.write(sse_event(completion_chunk(chunk_id, chat.model, {"content": delta})))
+                    await writer.drain()
+        except ProviderError as e:
+            writer.write(sse_event(error_payload(str(e), error_type="upstream_error")))
+        except asyncio.TimeoutError:
+            writer.write(sse_event(error_payload(
+                f"Upstream streaming response timed out after {DEFAULT_API_TIMEOUT}s", error_type="upstream_error"
+            )))
+        else:
+            writer.write(sse_event(completion_chunk(chunk_id, chat.model, {}, finish_reason="stop")))
+            if on_complete is not None:
+                on_complete("".join(parts))
+        writer.write(sse_event("[DONE]"))
+        writer.end_stream()
+        await writer.drain()
+        return 200
+
+    # ─────────────────────────────────────────
+    # Completions
+    # ─────────────────────────────────────────
+
+    def _tools_for(self, chat: ChatRequest) -> ToolRegistry | None:
+        return self._restaurant_tools if chat.restaurant else None
+
+    async def complete(self, chat: ChatRequest) -> str:
+        if self.hedge is None or not self.hedge.applies_to(chat.model):
+            return await self._complete_on(chat, chat.model)
+        return await self.hedge.run(chat.model, partial(self._complete_on, chat))
+
+    def stream(self, chat: ChatRequest) -> AsyncIterator[str]:
+        """Yield reply text deltas as the upstream produces them."""
+        if self.hedge is None or not self.hedge.applies_to(chat.model):
+            return self._stream_on(chat, chat.model)
+        return self.hedge.stream(chat.model, partial(self._stream_on, chat))
+
+    async def _complete_on(self, chat: ChatRequest, model: str) -> str:
+        async with self.pool.lease(model, chat.system, chat.history, self._tools_for(chat)) as (client, context):
+            start: float = self._upstream_started(model)
+            try:
+                reply: str = await client.generate_response(chat.query, context)
+            except ProviderError as e:
+                self.metrics.upstream_errors.inc(model, type(e).__name__)
+                raise
+            finally:
+                self._upstream_finished(model, start, context.usage)
+            if reply.startswith("[Error:"):
+                self.metrics.upstream_errors.inc(model, "TimeoutError")
+            return reply
+
+    async def _stream_on(self, chat: ChatRequest, model: str) -> AsyncIterator[str]:
+        async with self.pool.lease(model, chat.system, chat.history, self._tools_for(chat)) as (client, context):
+            start: float = self._upstream_started(model)
+            try:
+                async with aclosing(client.stream_response(chat.query, context)) as deltas:
+                    async for delta in deltas:
+                        yield delta
+            except (ProviderError, asyncio.TimeoutError) as e:
+                self.metrics.upstream_errors.inc(model, type(e).__name__)
+                raise
+            finally:
+                self._upstream_finished(model, start, context.usage)
+
+    def _upstream_started(self, model: str) -> float:
+        self.metrics.upstream_in_flight.inc(model)
+        return time.monotonic()
+
+    def _upstream_finished(self, model: str, start: float, usage: Usage) -> None:
+        elapsed: float = time.monotonic() - start
+        self.metrics.upstream_in_flight.dec(model)
+        self.metrics.upstream_duration.observe(elapsed, model)
+        if usage.output_tokens:
+            self.metrics.input_tokens.inc(model, amount=usage.input_tokens)
+            self.metrics.output_tokens.inc(model, amount=usage.output_tokens)
+            self.metrics.tokens_per_second.observe(usage.output_tokens / max(elapsed, 1e-6), model)
+
+    def log_request(self, request: Request, status: int) -> None:
+        print(f"[chat-client-toy] {request.method} {request.path} {request.version} {status}")
+
+
+def _chain(*callbacks: Callable[[str], None] | None) -> Callable[[str], None]:
+    """One callback that calls each of `callbacks` (skipping None) in turn."""
+    def call(reply: str) -> None:
+        for callback in callbacks:
+            if callback is not None:
+                callback(reply)
+    return call
+
+
+async def _replay(reply: str) -> AsyncIterator[str]:
+    """A cached reply as a one-delta stream."""
+    yield reply
@@ -0,0 +1,186 @@
+"""Hedged and failover upstream requests.
+
+A stalled or saturated local Ollama otherwise holds a request until
+DEFAULT_API_TIMEOUT (120s). With a HedgePolicy the gateway starts the
+request on the primary model and, if it has not answered within the hedge
+delay, sends a duplicate to the secondary model (any provider
+ProviderFactory resolves, e.g. a Groq-hosted llama). Whichever answers
+first wins and the other request is cancelled. If the primary fails with a
+ConnectionError the request fails over to the secondary straight away.
+
+The delay defaults to the p95 of the primary's recent latencies, so about
+one request in twenty is hedged. For streams the race is to the first
+delta: once a stream has produced text, the gateway is committed to it.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import suppress
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from providers.errors.ProviderError import ConnectionError
+
+T = TypeVar("T")
+
+DEFAULT_QUANTILE: float = 0.95
+# Delay used until a model has MIN_SAMPLES latencies to take the quantile of
+DEFAULT_INITIAL_DELAY: float = 2.0
+DEFAULT_MIN_DELAY: float = 0.05
+MIN_SAMPLES: int = 20
+WINDOW: int = 200
+
+# Primary failures that go straight to the secondary instead of waiting for the delay
+FAILOVER_ERRORS: tuple[type[BaseException], ...] = (ConnectionError,)
+
+# Outcome labels, as recorded by `on_hedge`
+DELAY, FAILOVER = "delay", "failover"
+PRIMARY, SECONDARY, NONE = "primary", "secondary", "none"
+
+
+class HedgePolicy:
+    """Races the primary model against `secondary` once the primary is slow or unreachable."""
+
+    def __init__(
+        self,
+        secondary: str,
+        delay: float | None = None,
+        quantile: float = DEFAULT_QUANTILE,
+        initial_delay: float = DEFAULT_INITIAL_DELAY,
+        min_delay: float = DEFAULT_MIN_DELAY,
+    ) -> None:
+        self.secondary = secondary
+        self.fixed_delay = delay
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        # (model, stream) -> recent primary latencies (time to first delta for streams)
+        self._latencies: dict[tuple[str, bool], deque[float]] = {}
+        # Called with (primary model, reason, winner) whenever a second request is sent
+        self.on_hedge: list[Callable[[str, str, str], None]] = []
+
+    def applies_to(self, model: str) -> bool:
+        return model != self.secondary
+
+    def delay(self, model: str, stream: bool = False) -> float:
+        """Seconds to wait for the primary before hedging."""
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        samples: deque[float] | None = self._latencies.get((model, stream))
+        if samples is None or len(samples) < MIN_SAMPLES:
+            return self.initial_delay
+        ordered: list[float] = sorted(samples)
+        return max(ordered[min(int(len(ordered) * self.quantile), len(ordered) - 1)], self.min_delay)
+
+    def observe(self, model: str, latency: float, stream: bool = False) -> None:
+        key: tuple[str, bool] = (model, stream)
+        samples: deque[float] | None = self._latencies.get(key)
+        if samples is None:
+            samples = self._latencies[key] = deque(maxlen=WINDOW)
+        samples.append(latency)
+
+    def _hedged(self, model: str, reason: str, winner: str) -> None:
+        for callback in self.on_hedge:
+            callback(model, reason, winner)
+
+    async def run(self, model: str, call: Callable[[str], Awaitable[T]]) -> T:
+        """`call(model)` on the primary, hedged to the secondary; returns the first success."""
+        start: float = time.monotonic()
+        tasks: dict[str, asyncio.Task] = {PRIMARY: asyncio.ensure_future(call(model))}
+        tasks[PRIMARY].add_done_callback(lambda task: self._observe_task(model, start, task))
+        try:
+            reason: str | None = await self._maybe_hedge(model, tasks, lambda: call(self.secondary), stream=False)
+            winner: str = NONE
+            try:
+                winner = await _first_success(tasks)
+                return tasks[winner].result()
+            finally:
+                if reason:
+                    self._hedged(model, reason, winner)
+        finally:
+            await _cancel(*tasks.values())
+
+    async def stream(self, model: str, open_stream: Callable[[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Relay whichever of the primary and secondary streams produces text first."""
+        start: float = time.monotonic()
+        sources: dict[str, AsyncIterator[str]] = {PRIMARY: open_stream(model)}
+        tasks: dict[str, asyncio.Task] = {PRIMARY: asyncio.ensure_future(anext(sources[PRIMARY]))}
+
+        def open_secondary() -> Awaitable[str]:
+            sources[SECONDARY] = open_stream(self.secondary)
+            return anext(sources[SECONDARY])
+
+        try:
+            reason: str | None = await self._maybe_hedge(model, tasks, open_secondary, stream=True)
+            winner: str = NONE
+            try:
+                winner = await _first_success(tasks)
+            finally:
+                if reason:
+                    self._hedged(model, reason, winner)
+            if winner == PRIMARY:
+                self.observe(model, time.monotonic() - start, stream=True)
+            # Close the losing stream now rather than when the winner's ends, so it stops holding an upstream
+            await _close_losers(winner, tasks, sources)
+            if tasks[winner].exception() is None:  # else the stream was empty
+                yield tasks[winner].result()
+                async for delta in sources[winner]:
+                    yield delta
+        finally:
+            await _cancel(*tasks.values())
+            for source in sources.values():
+                with suppress(Exception):
+                    await source.aclose()
+
+    async def _maybe_hedge(
+        self, model: str, tasks: dict[str, asyncio.Task], start_secondary: Callable[[], Awaitable], stream: bool
+    ) -> str | None:
+        """Wait up to the hedge delay for the primary; start the secondary if it is late or unreachable."""
+        done, _ = await asyncio.wait(tasks.values(), timeout=self.delay(model, stream))
+        if done and not _fails_over(tasks[PRIMARY]):
+            return None
+        tasks[SECONDARY] = asyncio.ensure_future(start_secondary())
+        return FAILOVER if done else DELAY
+
+    def _observe_task(self, model: str, start: float, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is None:
+            self.observe(model, time.monotonic() - start)
+
+
+async def _first_success(tasks: dict[str, asyncio.Task]) -> str:
+    """Name of the first task to finish without an error; raises the last error if none does.
+
+    StopAsyncIteration counts as success: the stream finished, just without text.
+    """
+    pending: set[asyncio.Task] = set(tasks.values())
+    error: BaseException | None = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for name, task in tasks.items():
+            if task in done:
+                exc: BaseException | None = task.exception()
+                if exc is None or isinstance(exc, StopAsyncIteration):
+                    return name
+                error = exc
+    raise error
+
+
+async def _close_losers(winner: str, tasks: dict[str, asyncio.Task], sources: dict[str, AsyncIterator[str]]) -> None:
+    """Cancel every task but `winner`'s and close its stream."""
+    losers: list[str] = [name for name in tasks if name != winner]
+    await _cancel(*(tasks[name] for name in losers))
+    for name in losers:
+        with suppress(Exception):
+            await sources.pop(name).aclose()
+
+
+def _fails_over(task: asyncio.Task) -> bool:
+    return not task.cancelled() and isinstance(task.exception(), FAILOVER_ERRORS)
+
+
+async def _cancel(*tasks: asyncio.Task) -> None:
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+    for task in tasks:
+        with suppress(BaseException):
+            await task
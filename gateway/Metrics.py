@@ -0,0 +1,196 @@
+"""Prometheus text-format metrics for the gateway (GET /metrics).
+
+Hand-rolled instead of depending on prometheus_client: a counter is one dict
+update and a histogram observation one bisect plus two additions, so the
+metrics stay on in production. Gauges that already live elsewhere (queue
+depth, cache size) are read when /metrics is scraped, not tracked per request.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds — from a cache hit to a slow local model with tool rounds
+LATENCY_BUCKETS: tuple[float, ...] = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKENS_PER_SECOND_BUCKETS: tuple[float, ...] = (1, 5, 10, 20, 40, 80, 160, 320)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs: list[str] = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """A counter incremented directly, or read from `collect()` at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        collect: Callable[[], dict[LabelValues, float]] | None = None,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.collect = collect
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        values: dict[LabelValues, float] = self.collect() if self.collect else self.values
+        lines: list[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """A gauge set directly, or read from `collect()` at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        collect: Callable[[], dict[LabelValues, float]] | None = None,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.collect = collect
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> list[str]:
+        values: dict[LabelValues, float] = self.collect() if self.collect else self.values
+        lines: list[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (non-cumulative, last is +Inf), sum]
+        self.values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def render(self) -> list[str]:
+        lines: list[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bucket_names: tuple[str, ...] = (*self.labelnames, "le")
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_names, (*labels, _format_value(bound)))} {cumulative}"
+                )
+            label_str: str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Every metric the gateway exports."""
+
+    def __init__(self) -> None:
+        self.started_at: float = time.time()
+        self.requests = Counter(
+            "gateway_requests_total", "Requests by restaurant, model and HTTP status.",
+            ("restaurant", "model", "status"),
+        )
+        self.request_duration = Histogram(
+            "gateway_request_duration_seconds", "End-to-end request latency.", ("restaurant", "model"),
+        )
+        self.time_to_first_token = Histogram(
+            "gateway_time_to_first_token_seconds", "Time to the first streamed content delta.", ("model",),
+        )
+        self.upstream_duration = Histogram(
+            "gateway_upstream_duration_seconds", "Time spent waiting on the upstream model.", ("model",),
+        )
+        self.upstream_in_flight = Gauge(
+            "gateway_upstream_in_flight", "Requests currently being served by the upstream.", ("model",),
+        )
+        self.queue_depth = Gauge(
+            "gateway_queue_depth", "Requests waiting for an upstream slot.", ("model",),
+        )
+        self.upstream_errors = Counter(
+            "gateway_upstream_errors_total", "Upstream failures by ProviderError subclass.", ("model", "error"),
+        )
+        self.output_tokens = Counter(
+            "gateway_output_tokens_total", "Tokens generated by the upstream.", ("model",),
+        )
+        self.input_tokens = Counter(
+            "gateway_input_tokens_total", "Prompt tokens sent to the upstream.", ("model",),
+        )
+        self.tokens_per_second = Histogram(
+            "gateway_output_tokens_per_second", "Generation speed per upstream call.", ("model",),
+            buckets=TOKENS_PER_SECOND_BUCKETS,
+        )
+        self.cache_lookups = Counter(
+            "gateway_cache_lookups_total", "Response cache results (HIT, MISS, BYPASS).", ("result",),
+        )
+        self.hedged_requests = Counter(
+            "gateway_hedged_requests_total",
+            "Requests duplicated to the secondary model, by reason (delay, failover) and winner.",
+            ("model", "reason", "winner"),
+        )
+        self.extra: list[Counter | Gauge | Histogram] = []
+
+    def render(self) -> str:
+        metrics: list[Counter | Gauge | Histogram] = [
+            self.requests,
+            self.request_duration,
+            self.time_to_first_token,
+            self.upstream_duration,
+            self.upstream_in_flight,
+            self.queue_depth,
+            self.upstream_errors,
+            self.input_tokens,
+            self.output_tokens,
+            self.tokens_per_second,
+            self.cache_lookups,
+            self.hedged_requests,
+            *self.extra,
+        ]
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.append("# HELP gateway_uptime_seconds Seconds since the gateway started.")
+        lines.append("# TYPE gateway_uptime_seconds gauge")
+        lines.append(f"gateway_uptime_seconds {time.time() - self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
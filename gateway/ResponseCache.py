@@ -0,0 +1,228 @@
+"""Completion cache for the gateway, keyed on normalized request content.
+
+Customers ask the same questions word-for-word ("are you open today?",
+"is the dal vegan?"), so the gateway keeps recent replies in memory: an LRU
+bounded by entry TTL and total reply bytes. An optional SQLite tier (see
+database/ResponseCacheRecord.py) keeps replies across restarts; memory misses
+fall through to it and hits are promoted back into memory.
+
+Entries remember the restaurant knowledge version they were built from.
+When RestaurantRegistry (re)loads a tenant, the tenant's entries from any
+other version are dropped from both tiers.
+
+SQLite work runs on one store thread that owns the repository's session,
+never on the event loop: writes are queued there without waiting for them
+(flush() waits), and the gateway reads the store through aget().
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from database.ResponseCacheRecord import ResponseCacheRecord
+from database.repository.ResponseCacheRepository import ResponseCacheRepository
+from gateway.completions import ChatRequest
+
+DEFAULT_TTL: float = 300.0
+DEFAULT_MAX_BYTES: int = 16 * 1024 * 1024
+
+# Value of the X-Cache response header
+CACHE_HEADER = "X-Cache"
+HIT, MISS, BYPASS = "HIT", "MISS", "BYPASS"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive form of a message."""
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def _normalize_content(content: Any) -> str:
+    """normalize() for text; content-part lists and other JSON are keyed on their canonical JSON."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return normalize(content)
+    return json.dumps(content, sort_keys=True, separators=(",", ":"))
+
+
+def cache_key(chat: ChatRequest, restaurant_version: str | None = None) -> str:
+    """sha256 over model, system prompt, restaurant and normalized messages."""
+    material = json.dumps([
+        chat.model,
+        chat.system,
+        chat.restaurant,
+        restaurant_version,
+        [[c.role, _normalize_content(c.content)] for c in chat.history],
+        _normalize_content(chat.query),
+    ])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+@dataclass
+class _Entry:
+    reply: str
+    restaurant: str | None
+    restaurant_version: str | None
+    expires_at: float
+    size: int
+
+
+class ResponseCache:
+    """TTL + LRU + byte-capped reply cache with an optional persistent tier."""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        store: ResponseCacheRepository | None = None,
+    ) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.store = store
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        # The only thread that touches `store`, so its session is never used concurrently
+        self._store_thread: ThreadPoolExecutor | None = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache") if store is not None else None
+        )
+
+    def get(self, key: str) -> str | None:
+        """The cached reply, blocking on the SQLite tier on a memory miss. From async code, use `aget`."""
+        now: float = time.time()
+        entry: _Entry | None = self._memory_get(key, now)
+        if entry is None and self.store is not None:
+            entry = self._load(key, self._store_call(self._fetch, key).result(), now)
+        return self._count(key, entry)
+
+    async def aget(self, key: str) -> str | None:
+        """Like `get`, but awaits the SQLite tier instead of blocking the event loop."""
+        now: float = time.time()
+        entry: _Entry | None = self._memory_get(key, now)
+        if entry is None and self.store is not None:
+            stored: _Entry | None = await asyncio.wrap_future(self._store_call(self._fetch, key))
+            entry = self._load(key, stored, now)
+        return self._count(key, entry)
+
+    def put(self, key: str, chat: ChatRequest, reply: str, restaurant_version: str | None = None) -> None:
+        now: float = time.time()
+        entry = _Entry(reply, chat.restaurant, restaurant_version, now + self.ttl, len(reply.encode()))
+        if entry.size > self.max_bytes:
+            return
+        self._insert(key, entry)
+        if self.store is not None:
+            self._store_write(self.store.upsert, ResponseCacheRecord(
+                cache_key=key,
+                model=chat.model,
+                restaurant=chat.restaurant,
+                restaurant_version=restaurant_version,
+                reply=reply,
+                size=entry.size,
+                created_at=now,
+                expires_at=entry.expires_at,
+            ))
+
+    def invalidate_restaurant(self, restaurant: str, version: str) -> int:
+        """Drop a restaurant's entries built from any knowledge version other than `version`."""
+        stale: list[str] = [
+            key for key, entry in self._entries.items()
+            if entry.restaurant == restaurant and entry.restaurant_version != version
+        ]
+        for key in stale:
+            self._drop(key)
+        if self.store is not None:
+            self._store_write(self.store.delete_stale_restaurant, restaurant, version)
+        return len(stale)
+
+    def purge_expired(self) -> None:
+        now: float = time.time()
+        for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            self._drop(key)
+        if self.store is not None:
+            self._store_write(self.store.delete_expired, now)
+
+    def flush(self) -> None:
+        """Wait for queued SQLite writes to finish."""
+        if self._store_thread is not None:
+            self._store_call(lambda: None).result()
+
+    def close(self) -> None:
+        """Finish queued SQLite writes and stop the store thread."""
+        if self._store_thread is not None:
+            self._store_thread.shutdown(wait=True)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _memory_get(self, key: str, now: float) -> _Entry | None:
+        entry: _Entry | None = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            self._drop(key)
+            entry = None
+        return entry
+
+    def _count(self, key: str, entry: _Entry | None) -> str | None:
+        """Record a hit or miss for a lookup's result and return its reply."""
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.reply
+
+    def _fetch(self, key: str) -> _Entry | None:
+        """Read an entry from the store. Runs on the store thread, so no ORM object leaves it."""
+        record: ResponseCacheRecord | None = self.store.get(key)
+        if record is None:
+            return None
+        return _Entry(record.reply, record.restaurant, record.restaurant_version, record.expires_at, record.size)
+
+    def _load(self, key: str, entry: _Entry | None, now: float) -> _Entry | None:
+        """Promote an entry read from the store into memory, or drop it if it has expired."""
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._store_write(self.store.delete, key)
+            return None
+        self._insert(key, entry)
+        return entry
+
+    def _store_call(self, fn: Callable[..., Any], *args: Any) -> Future:
+        return self._store_thread.submit(fn, *args)
+
+    def _store_write(self, fn: Callable[..., Any], *args: Any) -> None:
+        """Queue a write on the store thread without waiting for it."""
+        self._store_call(fn, *args).add_done_callback(_report_store_error)
+
+    def _insert(self, key: str, entry: _Entry) -> None:
+        self._drop(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            oldest: str = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        entry: _Entry | None = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+
+def _report_store_error(future: Future) -> None:
+    error: BaseException | None = future.exception()
+    if error is not None:
+        print(f"[chat-client-toy] response cache write failed: {error}", flush=True)
@@ -0,0 +1,248 @@
+"""Lazy, memory-capped registry of restaurant tenants under restaurants/<slug>/.
+
+A single gateway process serves every restaurant. A tenant's config and
+knowledge are read from disk the first time it is requested, then kept in
+an LRU bounded by total knowledge size, so dozens of mostly idle tenants
+cost nothing until a customer talks to them. Files are re-checked every few
+seconds and a tenant is reloaded when its config or markdown changes.
+
+With retrieval enabled, a tenant's SectionIndex is built on first use and
+lives (and is evicted) with the tenant's entry.
+
+The gateway looks tenants up through aget(), which does the stat() calls and
+file reads in a thread so they never block the event loop; concurrent
+lookups of a tenant that needs (re)loading share one load.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from services.SectionIndex import SectionIndex
+
+RESTAURANTS_DIR: Path = Path(__file__).resolve().parent.parent / "restaurants"
+
+# Total knowledge bytes kept in memory across all loaded tenants.
+DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024
+
+# Seconds between mtime checks of a loaded tenant's files.
+DEFAULT_CHECK_INTERVAL: float = 2.0
+
+# Sections put in the prompt per request in retrieval mode.
+DEFAULT_TOP_K: int = 6
+
+SLUG_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+
+
+def restaurant_files(restaurant_dir: Path) -> list[Path]:
+    """The files a tenant is built from: config.json plus every .md file."""
+    files: list[Path] = sorted(restaurant_dir.glob("*.md"))
+    config_path: Path = restaurant_dir / "config.json"
+    if config_path.exists():
+        files.insert(0, config_path)
+    return files
+
+
+def fingerprint(restaurant_dir: Path) -> tuple[tuple[str, int, int], ...]:
+    """(name, mtime_ns, size) of each tenant file — changes whenever the knowledge does."""
+    out: list[tuple[str, int, int]] = []
+    for path in restaurant_files(restaurant_dir):
+        st = path.stat()
+        out.append((path.name, st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def load_restaurant(slug: str, root: Path = RESTAURANTS_DIR) -> dict:
+    """Load restaurant config and all .md files from restaurants/<slug>/"""
+    restaurant_dir: Path = root / slug
+    if not restaurant_dir.exists():
+        return {}
+    config_path: Path = restaurant_dir / "config.json"
+    config: dict = json.loads(config_path.read_text()) if config_path.exists() else {}
+    config.setdefault("name", slug.replace("-", " ").title())
+    config["slug"] = slug
+    # Load all markdown files as knowledge
+    docs: list[str] = []
+    for md_file in sorted(restaurant_dir.glob("*.md")):
+        docs.append(md_file.read_text())
+    config["knowledge"] = "\n\n---\n\n".join(docs)
+    return config
+
+
+@dataclass
+class _Entry:
+    restaurant: dict
+    size: int
+    fingerprint: tuple[tuple[str, int, int], ...]
+    checked_at: float
+    index: SectionIndex | None = None
+
+
+class RestaurantRegistry:
+    """Loads tenants on first use and keeps them in a size-bounded LRU."""
+
+    def __init__(
+        self,
+        root: Path = RESTAURANTS_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        check_interval: float = DEFAULT_CHECK_INTERVAL,
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes: int = 0
+        self.loads: int = 0
+        self.evictions: int = 0
+        # Called with (slug, version) every time a tenant is (re)loaded from disk
+        self.on_load: list[Callable[[str, str], None]] = []
+        # Disk checks in flight for aget(), one per tenant
+        self._refreshing: dict[str, asyncio.Future] = {}
+
+    def slugs(self) -> list[str]:
+        """Every tenant directory under the root (loaded or not)."""
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and SLUG_PATTERN.match(p.name))
+
+    def exists(self, slug: str) -> bool:
+        return bool(SLUG_PATTERN.match(slug)) and (self.root / slug).is_dir()
+
+    def get(self, slug: str) -> dict | None:
+        """Return the tenant's restaurant dict, loading or refreshing it as needed.
+
+        Returns None if there is no such tenant. From async code, use `aget`.
+        """
+        restaurant: dict | None = self._fresh(slug)
+        if restaurant is not None:
+            return restaurant
+        known: _Entry | None = self._entries.get(slug)
+        return self._apply(slug, known, self._scan(slug, known))
+
+    async def aget(self, slug: str) -> dict | None:
+        """Like `get`, but checks and reads the tenant's files in a thread instead of on the event loop."""
+        restaurant: dict | None = self._fresh(slug)
+        if restaurant is not None:
+            return restaurant
+        refresh: asyncio.Future | None = self._refreshing.get(slug)
+        if refresh is None:
+            refresh = self._refreshing[slug] = asyncio.ensure_future(self._refresh(slug))
+            refresh.add_done_callback(lambda _: self._refreshing.pop(slug, None))
+        # A cancelled caller must not cancel the load other callers are waiting on
+        return await asyncio.shield(refresh)
+
+    async def _refresh(self, slug: str) -> dict | None:
+        known: _Entry | None = self._entries.get(slug)
+        scanned = await asyncio.to_thread(self._scan, slug, known)
+        return self._apply(slug, known, scanned)
+
+    def _fresh(self, slug: str) -> dict | None:
+        """The loaded tenant if its files were checked within check_interval; no disk access."""
+        entry: _Entry | None = self._entries.get(slug)
+        if entry is None or time.monotonic() - entry.checked_at >= self.check_interval:
+            return None
+        self._entries.move_to_end(slug)
+        return entry.restaurant
+
+    def _scan(
+        self, slug: str, known: _Entry | None
+    ) -> tuple[tuple[tuple[str, int, int], ...], dict | None] | None:
+        """The disk side of a lookup: None if there is no such tenant, else its
+        fingerprint and, unless that matches `known`, the freshly loaded tenant.
+
+        Only reads the filesystem, so it can run in a thread.
+        """
+        if not self.exists(slug):
+            return None
+        current = fingerprint(self.root / slug)
+        if known is not None and known.fingerprint == current:
+            return current, None
+        return current, load_restaurant(slug, self.root)
+
+    def _apply(
+        self,
+        slug: str,
+        known: _Entry | None,
+        scanned: tuple[tuple[tuple[str, int, int], ...], dict | None] | None,
+    ) -> dict | None:
+        """Update the LRU with what _scan found."""
+        now: float = time.monotonic()
+        if scanned is None:
+            self._drop(slug)
+            return None
+        current, restaurant = scanned
+        if restaurant is None:
+            # Unchanged on disk; put `known` back if it was evicted meanwhile
+            if self._entries.get(slug) is not known:
+                self._insert(slug, known)
+            known.checked_at = now
+            self._entries.move_to_end(slug)
+            return known.restaurant
+
+        self.loads += 1
+        restaurant["version"] = hashlib.sha1(repr(current).encode()).hexdigest()[:12]
+        self._insert(slug, _Entry(restaurant, self._entry_size(restaurant), current, now))
+        for callback in self.on_load:
+            callback(slug, restaurant["version"])
+        return restaurant
+
+    def section_index(self, slug: str) -> SectionIndex | None:
+        """The tenant's heading index, built on first use. None if there is no such tenant.
+
+        Uses the tenant as last loaded, so after aget() it touches no files.
+        """
+        if slug not in self._entries and self.get(slug) is None:
+            return None
+        entry: _Entry = self._entries[slug]
+        restaurant: dict = entry.restaurant
+        if entry.index is None:
+            entry.index = SectionIndex.from_markdown(restaurant.get("knowledge", ""))
+            # The index holds its own copy of every section's text
+            entry.size += len(restaurant.get("knowledge", "").encode())
+            self._bytes += len(restaurant.get("knowledge", "").encode())
+            self._evict(keep=slug)
+        return entry.index
+
+    def retriever(self, slug: str, top_k: int = DEFAULT_TOP_K) -> Callable[[str], str] | None:
+        """A query -> knowledge callable for parse_chat_request, or None if there is no such tenant."""
+        index: SectionIndex | None = self.section_index(slug)
+        if index is None:
+            return None
+        return lambda query: index.render(index.search(query, top_k=top_k))
+
+    @property
+    def loaded_bytes(self) -> int:
+        return self._bytes
+
+    def loaded(self) -> list[str]:
+        """Loaded tenants, least recently used first."""
+        return list(self._entries)
+
+    def _entry_size(self, restaurant: dict) -> int:
+        return len(restaurant.get("knowledge", "").encode()) + len(json.dumps(
+            {k: v for k, v in restaurant.items() if k != "knowledge"}, default=str
+        ))
+
+    def _insert(self, slug: str, entry: _Entry) -> None:
+        self._drop(slug)
+        self._entries[slug] = entry
+        self._bytes += entry.size
+        self._evict(keep=slug)
+
+    def _drop(self, slug: str) -> None:
+        entry: _Entry | None = self._entries.pop(slug, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self, keep: str) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            slug: str = next(iter(self._entries))
+            if slug == keep:
+                break
+            self._drop(slug)
+            self.evictions += 1
@@ -0,0 +1,117 @@
+"""Server-side conversation sessions for the gateway.
+
+Without sessions every request carries the whole conversation, which the
+gateway re-parses into Conversation objects and validates on every turn.
+A session keeps the already-built history in memory, so a client sends only
+the new user turn:
+
+    {"session": true, "messages": [{"role": "user", "content": "Hi"}]}
+        -> response has "session_id" (and an X-Session-Id header)
+    {"session_id": "<id>", "messages": [{"role": "user", "content": "Vegan options?"}]}
+
+Sessions expire after `ttl` idle seconds and the store keeps at most
+`max_sessions` (least recently used go first). Each session keeps its last
+`max_messages` messages. Turns on one session are serialized.
+
+Expired sessions are dropped when looked up, and by sweep(), which the
+gateway runs every `sweep_interval` seconds so abandoned sessions don't sit
+in memory until the cap pushes them out.
+"""
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from providers.models import Conversation
+
+DEFAULT_TTL: float = 1800.0
+DEFAULT_MAX_SESSIONS: int = 10_000
+DEFAULT_MAX_MESSAGES: int = 40
+DEFAULT_SWEEP_INTERVAL: float = 60.0
+
+
+@dataclass
+class Session:
+    id: str
+    model: str
+    restaurant: str | None
+    # The client's own system prompt, reused on turns that don't resend it
+    system: str = ""
+    history: list[Conversation] = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class SessionStore:
+    """Bounded, TTL-expiring map of session id -> Session."""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        sweep_interval: float = DEFAULT_SWEEP_INTERVAL,
+    ) -> None:
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.sweep_interval = sweep_interval
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self.created: int = 0
+        self.expired: int = 0
+        # Dropped by the max_sessions cap while still live
+        self.evicted: int = 0
+
+    def create(self, model: str, restaurant: str | None, system: str = "") -> Session:
+        session = Session(id=secrets.token_urlsafe(16), model=model, restaurant=restaurant, system=system)
+        self._sessions[session.id] = session
+        self.created += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        return session
+
+    def get(self, session_id: str) -> Session | None:
+        """The live session, or None if it never existed or has expired."""
+        session: Session | None = self._sessions.get(session_id)
+        if session is None:
+            return None
+        now: float = time.monotonic()
+        if now - session.last_used > self.ttl:
+            del self._sessions[session_id]
+            self.expired += 1
+            return None
+        session.last_used = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def record_turn(self, session: Session, turns: list[Conversation], reply: str) -> None:
+        """Append this request's new messages and the assistant reply, then trim."""
+        session.history.extend(turns)
+        session.history.append(Conversation(role="assistant", content=reply))
+        excess: int = len(session.history) - self.max_messages
+        if excess > 0:
+            del session.history[:excess]
+            # Never start the history on an assistant turn
+            while session.history and session.history[0].role != "user":
+                del session.history[0]
+        session.last_used = time.monotonic()
+
+    def purge_expired(self) -> int:
+        """Drop every expired session; returns how many were dropped."""
+        now: float = time.monotonic()
+        stale: list[str] = [sid for sid, s in self._sessions.items() if now - s.last_used > self.ttl]
+        for sid in stale:
+            del self._sessions[sid]
+        self.expired += len(stale)
+        return len(stale)
+
+    async def sweep(self) -> None:
+        """purge_expired() every `sweep_interval` seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.purge_expired()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
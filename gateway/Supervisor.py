@@ -0,0 +1,162 @@
+"""Pre-fork supervisor: N gateway worker processes sharing one listening socket.
+
+The parent binds the port once and forks workers that inherit the socket;
+the kernel spreads incoming connections across them, so JSON handling and
+prompt assembly use every core instead of one GIL. The parent only
+supervises: it restarts workers that die (backing off if they crash right
+after starting) and forwards SIGTERM/SIGINT so `stop.sh` stops the lot.
+Workers that have not drained within `shutdown_timeout` are killed.
+
+Workers exit on their own if the supervisor disappears (e.g. SIGKILL), so
+no orphans keep the port open.
+"""
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from contextlib import suppress
+from typing import Callable
+
+# A worker that dies sooner than this after starting counts as a crash loop.
+MIN_UPTIME: float = 1.0
+MAX_RESTART_DELAY: float = 10.0
+
+# How long workers get to exit after SIGTERM before they are killed.
+SHUTDOWN_TIMEOUT: float = 10.0
+
+POLL_INTERVAL: float = 0.2
+
+
+def bind_socket(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    """The listening socket every worker inherits."""
+    sock: socket.socket = socket.create_server((host, port), backlog=backlog, reuse_port=False)
+    sock.setblocking(False)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Forks `workers` processes running `target()` and keeps them alive."""
+
+    def __init__(self, workers: int, target: Callable[[], None], shutdown_timeout: float = SHUTDOWN_TIMEOUT) -> None:
+        self.workers = workers
+        self.target = target
+        self.shutdown_timeout = shutdown_timeout
+        self.pids: dict[int, int] = {}  # pid -> worker slot
+        self.started_at: dict[int, float] = {}
+        self.restart_delay: dict[int, float] = {}
+        self.restarts: int = 0
+        self._stopping: bool = False
+
+    def run(self) -> int:
+        """Start the workers and supervise them until SIGTERM/SIGINT. Returns the exit code."""
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+        pending: dict[int, float] = {}  # slot -> time to respawn
+        while not self._stopping:
+            self._reap(pending)
+            now: float = time.monotonic()
+            for slot, when in list(pending.items()):
+                if now >= when and not self._stopping:
+                    del pending[slot]
+                    self._spawn(slot)
+            time.sleep(POLL_INTERVAL)
+
+        return self._shutdown()
+
+    def _spawn(self, slot: int) -> None:
+        parent: int = os.getpid()
+        pid: int = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            os.environ["GATEWAY_WORKER"] = str(slot)
+            os.environ["GATEWAY_SUPERVISOR_PID"] = str(parent)
+            code = 0
+            try:
+                self.target()
+            except KeyboardInterrupt:
+                pass
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+
+        self.pids[pid] = slot
+        self.started_at[slot] = time.monotonic()
+        print(f"   worker {slot} started (pid {pid})", flush=True)
+
+    def _reap(self, pending: dict[int, float]) -> None:
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot: int | None = self.pids.pop(pid, None)
+            if slot is None or self._stopping:
+                continue
+
+            uptime: float = time.monotonic() - self.started_at[slot]
+            delay: float = 0.0
+            if uptime < MIN_UPTIME:
+                delay = min(max(self.restart_delay.get(slot, 0.0) * 2, 0.5), MAX_RESTART_DELAY)
+            self.restart_delay[slot] = delay
+            self.restarts += 1
+            print(f"   worker {slot} (pid {pid}) exited with {_describe(status)}; "
+                  f"restarting in {delay:g}s", flush=True)
+            pending[slot] = time.monotonic() + delay
+
+    def _on_stop(self, signum: int, frame: object) -> None:
+        self._stopping = True
+
+    def _shutdown(self) -> int:
+        for pid in self.pids:
+            with suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+
+        deadline: float = time.monotonic() + self.shutdown_timeout
+        while self.pids and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.pids.pop(pid, None)
+            else:
+                time.sleep(0.05)
+
+        for pid in self.pids:
+            with suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGKILL)
+        return 0
+
+
+def watch_supervisor(loop_call_later: Callable, interval: float = 1.0) -> None:
+    """In a worker: exit if the supervisor is gone. Pass loop.call_later."""
+    supervisor: str | None = os.environ.get("GATEWAY_SUPERVISOR_PID")
+    if not supervisor:
+        return
+
+    def check() -> None:
+        if os.getppid() != int(supervisor):
+            os._exit(0)
+        loop_call_later(interval, check)
+
+    loop_call_later(interval, check)
+
+
+def _describe(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        return f"signal {signal.Signals(os.WTERMSIG(status)).name}"
+    return f"code {os.waitstatus_to_exitcode(status)}"
+
@@ -0,0 +1,15 @@
+from gateway.AdmissionController import AdmissionController
+from gateway.BatchRunner import BatchRunner
+from gateway.GatewayServer import GatewayServer
+from gateway.ResponseCache import ResponseCache
+from gateway.RestaurantRegistry import RestaurantRegistry
+from gateway.SessionStore import SessionStore
+
+__all__ = [
+    "AdmissionController",
+    "BatchRunner",
+    "GatewayServer",
+    "ResponseCache",
+    "RestaurantRegistry",
+    "SessionStore",
+]
@@ -0,0 +1,152 @@
+"""OpenAI chat.completions request/response shaping shared by both server engines."""
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from providers.models import Conversation
+
+
+@dataclass
+class ChatRequest:
+    """A /v1/chat/completions body split into what the LLM client needs."""
+    model: str
+    system: str
+    history: list[Conversation] = field(default_factory=list)
+    query: str = ""
+    stream: bool = False
+    restaurant: str | None = None
+    # The client's own system prompt, before any restaurant context
+    instructions: str = ""
+    session_id: str | None = None
+
+
+# How many of the latest user turns the knowledge is retrieved for, so
+# follow-ups like "and is it vegan?" still find the dish asked about before
+RETRIEVAL_USER_TURNS: int = 2
+
+
+def restaurant_context(restaurant: dict, knowledge: str | None = None) -> str:
+    """The block appended to the system prompt in restaurant mode.
+
+    `knowledge` replaces the restaurant's full knowledge (e.g. with retrieved sections).
+    """
+    if knowledge is None:
+        knowledge = restaurant["knowledge"]
+    return f"\n\nRestaurant: {restaurant['name']}\nCuisine: {restaurant.get('cuisine', '')}\n\n{knowledge}"
+
+
+def message_text(content: Any) -> str:
+    """The text of a message: the string itself, or the text parts of a content-part list."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            part["text"] for part in content
+            if isinstance(part, dict) and part.get("type") == "text" and isinstance(part.get("text"), str)
+        )
+    return ""
+
+
+def parse_chat_request(
+    body: dict[str, Any],
+    default_model: str,
+    restaurant: dict | None = None,
+    retrieve: Callable[[str], str] | None = None,
+    prior_history: list[Conversation] | None = None,
+    default_system: str = "",
+) -> ChatRequest:
+    """Split an OpenAI chat body into system prompt, history and query.
+
+    With `retrieve`, only the knowledge it returns for the latest user turns is
+    put in the system prompt instead of the restaurant's whole knowledge.
+
+    `prior_history` and `default_system` come from a server-side session: the
+    body then only carries the new turn, and its history is appended to them.
+    """
+    messages: list[dict[str, Any]] = body.get("messages", [])
+    req_model: str = body.get("model", default_model)
+    prior: list[Conversation] = prior_history or []
+
+    # Extract system prompt
+    system = default_system
+    chat_messages: list[dict[str, Any]] = []
+    for msg in messages:
+        if msg["role"] == "system":
+            system = msg["content"]
+        else:
+            chat_messages.append(msg)
+
+    instructions: str = system
+
+    # Inject restaurant context if available
+    if restaurant:
+        knowledge: str | None = None
+        if retrieve is not None:
+            user_turns: list[str] = [message_text(turn.content) for turn in prior if turn.role == "user"]
+            user_turns += [message_text(m["content"]) for m in chat_messages if m["role"] == "user"]
+            knowledge = retrieve("\n".join(user_turns[-RETRIEVAL_USER_TURNS:]))
+        system += restaurant_context(restaurant, knowledge)
+
+    # Build conversation history from prior messages
+    history: list[Conversation] = prior + [
+        Conversation(role=msg["role"], content=msg["content"])
+        for msg in chat_messages[:-1]
+        if msg["role"] in ("user", "assistant")
+    ]
+
+    # Generate response for the last user message
+    query: str = chat_messages[-1]["content"] if chat_messages else ""
+    if not isinstance(query, (str, list)):
+        raise ValueError("the last message's content must be text or a list of content parts")
+    return ChatRequest(
+        model=req_model,
+        system=system,
+        history=history,
+        query=query,
+        stream=bool(body.get("stream", False)),
+        restaurant=restaurant.get("slug") if restaurant else None,
+        instructions=instructions,
+    )
+
+
+def completion_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex[:8]}"
+
+
+def completion_response(model: str, reply: str) -> dict[str, Any]:
+    """Return OpenAI-compatible response"""
+    return {
+        "id": completion_id(),
+        "object": "chat.completion",
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+
+
+def completion_chunk(
+    chunk_id: str,
+    model: str,
+    delta: dict[str, Any],
+    finish_reason: str | None = None,
+) -> dict[str, Any]:
+    """One OpenAI chat.completion.chunk for a "stream": true response."""
+    return {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "delta": delta,
+                "finish_reason": finish_reason,
+            }
+        ],
+    }
@@ -0,0 +1,242 @@
+"""Minimal HTTP/1.x framing on top of asyncio streams.
+
+Just enough of the protocol for the gateway's JSON and SSE endpoints, so the
+gateway can serve many requests from one event loop without pulling in a
+third-party web framework.
+"""
+import asyncio
+import json
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any
+
+# Upper bound for the request line + headers (asyncio StreamReader limit).
+MAX_HEADER_BYTES: int = 64 * 1024
+
+# Default upper bound for a request body; larger ones get 413.
+MAX_BODY_BYTES: int = 8 * 1024 * 1024
+
+# Terminates a Transfer-Encoding: chunked body.
+LAST_CHUNK: bytes = b"0\r\n\r\n"
+
+SSE_HEADERS: dict[str, str] = {
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+}
+
+
+class ProtocolError(Exception):
+    """The peer sent something we can't parse as an HTTP request."""
+
+    def __init__(self, status: int, message: str) -> None:
+        self.status = status
+        super().__init__(message)
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    version: str
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def json(self) -> Any:
+        """Decode the body as JSON (an empty body decodes to {})."""
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError as e:
+            raise ProtocolError(400, f"Invalid JSON body: {e}")
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+async def read_request(
+    reader: asyncio.StreamReader, max_body: int = MAX_BODY_BYTES, idle_timeout: float | None = None
+) -> Request | None:
+    """Read one request from the stream. Returns None on a clean EOF.
+
+    The body is framed by Content-Length or Transfer-Encoding: chunked and may
+    be at most `max_body` bytes (413 otherwise). With `idle_timeout`, also
+    returns None if the request head has not arrived within that many seconds.
+    """
+    try:
+        async with asyncio.timeout(idle_timeout):
+            head: bytes = await reader.readuntil(b"\r\n\r\n")
+    except TimeoutError:
+        return None
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise ProtocolError(400, "Incomplete request head")
+    except asyncio.LimitOverrunError:
+        raise ProtocolError(431, "Request header fields too large")
+
+    lines: list[str] = head.decode("latin-1").split("\r\n")
+    try:
+        method, path, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise ProtocolError(400, f"Malformed request line: {lines[0]!r}")
+
+    headers: dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        if "content-length" in headers:
+            raise ProtocolError(400, "Both Content-Length and Transfer-Encoding sent")
+        body: bytes = await _read_chunked(reader, max_body)
+    else:
+        try:
+            content_length: int = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise ProtocolError(400, "Invalid Content-Length")
+        if content_length < 0:
+            raise ProtocolError(400, "Invalid Content-Length")
+        if content_length > max_body:
+            raise ProtocolError(413, f"Request body over {max_body} bytes")
+        try:
+            body = await reader.readexactly(content_length) if content_length else b""
+        except asyncio.IncompleteReadError:
+            raise ProtocolError(400, "Request body shorter than Content-Length")
+
+    return Request(method=method.upper(), path=path, version=version, headers=headers, body=body)
+
+
+async def _read_chunked(reader: asyncio.StreamReader, max_body: int) -> bytes:
+    parts: list[bytes] = []
+    size: int = 0
+    try:
+        while True:
+            line: bytes = await reader.readuntil(b"\r\n")
+            try:
+                chunk_size: int = int(line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise ProtocolError(400, "Malformed chunk size")
+            if chunk_size == 0:
+                # Skip any trailer fields up to the blank line; they count against max_body
+                while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+                    size += len(line)
+                    if size > max_body:
+                        raise ProtocolError(413, f"Request body over {max_body} bytes")
+                return b"".join(parts)
+            size += chunk_size
+            if size > max_body:
+                raise ProtocolError(413, f"Request body over {max_body} bytes")
+            parts.append(await reader.readexactly(chunk_size))
+            if await reader.readexactly(2) != b"\r\n":
+                raise ProtocolError(400, "Malformed chunk")
+    except asyncio.IncompleteReadError:
+        raise ProtocolError(400, "Incomplete chunked body")
+    except asyncio.LimitOverrunError:
+        raise ProtocolError(400, "Malformed chunk size")
+
+
+def encode_head(status: int, headers: dict[str, str] | None = None, keep_alive: bool = False) -> bytes:
+    """Encode a status line and header block."""
+    lines: list[str] = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    merged: dict[str, str] = {"Connection": "keep-alive" if keep_alive else "close"}
+    merged.update(headers or {})
+    lines.extend(f"{name}: {value}" for name, value in merged.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def encode_response(
+    status: int,
+    body: bytes = b"",
+    headers: dict[str, str] | None = None,
+    keep_alive: bool = False,
+) -> bytes:
+    """Encode a complete response with a Content-Length body."""
+    merged: dict[str, str] = {"Content-Length": str(len(body))}
+    merged.update(headers or {})
+    return encode_head(status, merged, keep_alive) + body
+
+
+def json_response(
+    status: int,
+    payload: Any,
+    headers: dict[str, str] | None = None,
+    keep_alive: bool = False,
+) -> bytes:
+    merged: dict[str, str] = {"Content-Type": "application/json"}
+    merged.update(headers or {})
+    return encode_response(status, json.dumps(payload).encode(), merged, keep_alive)
+
+
+def encode_chunk(data: bytes) -> bytes:
+    """Frame one piece of a Transfer-Encoding: chunked body."""
+    return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+
+class ResponseWriter:
+    """Writes responses to one connection, framed for keep-alive when the request allows it.
+
+    With `keep_alive` set, the Connection header says so and streamed bodies use
+    Transfer-Encoding: chunked, so the client can tell where a response ends.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, keep_alive: bool = False) -> None:
+        self.writer = writer
+        self.keep_alive = keep_alive
+        # Whether the current response's head has been written; reset by begin()
+        self.head_sent: bool = False
+
+    def begin(self, keep_alive: bool) -> None:
+        """Start the next response on the connection."""
+        self.keep_alive = keep_alive
+        self.head_sent = False
+
+    def close_after_response(self) -> None:
+        """Make the current response say Connection: close, unless its head is already out."""
+        if not self.head_sent:
+            self.keep_alive = False
+
+    async def send(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None) -> None:
+        self.head_sent = True
+        self.writer.write(encode_response(status, body, headers, self.keep_alive))
+        await self.writer.drain()
+
+    async def send_json(self, status: int, payload: Any, headers: dict[str, str] | None = None) -> None:
+        self.head_sent = True
+        self.writer.write(json_response(status, payload, headers, self.keep_alive))
+        await self.writer.drain()
+
+    def start_stream(self, status: int, headers: dict[str, str] | None = None) -> None:
+        self.head_sent = True
+        if self.keep_alive:
+            headers = {**(headers or {}), "Transfer-Encoding": "chunked"}
+        self.writer.write(encode_head(status, headers, self.keep_alive))
+
+    def write(self, data: bytes) -> None:
+        """One piece of a streamed body."""
+        self.writer.write(encode_chunk(data) if self.keep_alive else data)
+
+    def end_stream(self) -> None:
+        if self.keep_alive:
+            self.writer.write(LAST_CHUNK)
+
+    async def drain(self) -> None:
+        await self.writer.drain()
+
+
+def sse_event(payload: Any, event: str | None = None) -> bytes:
+    """Encode one server-sent event; dicts are sent as JSON."""
+    data: str = payload if isinstance(payload, str) else json.dumps(payload)
+    prefix: str = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {data}\n\n".encode()
+
+
+def error_payload(message: str, error_type: str = "invalid_request_error") -> dict[str, Any]:
+    """OpenAI-style error body."""
+    return {"error": {"message": message, "type": error_type}}
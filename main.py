@@ -1,10 +1,11 @@
 import argparse
 import asyncio
 import sys
+import time
 from argparse import Namespace
 from dotenv import load_dotenv
 
-from providers import AsyncBaseLLMClient
+from providers import AsyncAnthropicClient, AsyncBaseLLMClient, AsyncOpenAIClient
 from providers.ProviderFactory import ProviderFactory
 from providers.errors.ProviderError import (
     ProviderError,
@@ -14,6 +15,7 @@ from providers.errors.ProviderError import (
     ConnectionError,
     ProviderApiError,
 )
+from providers.models import Usage
 from services.PromptBuilder import PromptBuilder
 from tools.tools import registry
 
@@ -22,6 +24,7 @@ DEFAULT_MODEL = "gpt-5.2"
 DEFAULT_MAX_PROMPT_CHARS = 32000
 DEFAULT_CHUNK_DB = "data/pageindex_cache.db"
 DEFAULT_RANKER_MODEL = "gpt-4.1-mini"
+DEFAULT_HISTORY_TOKENS = 16000
 RAG_TOP_K = 10
 
 
@@ -50,13 +53,10 @@ async def main(args: Namespace) -> None:
     # ── Build the system prompt ───────────────────────────────────────────────
     # Filter tools if --tools is specified
     if args.tools:
-        requested = set(args.tools)
         available = set(registry.tool_spec.keys())
-        unknown = requested - available
+        unknown = registry.filter(set(args.tools))
         if unknown:
             print(f"  [Warning: unknown tools: {', '.join(unknown)}. Available: {', '.join(available)}]")
-        registry.tool_spec = {k: v for k, v in registry.tool_spec.items() if k in requested}
-        registry.tool_function = {k: v for k, v in registry.tool_function.items() if k in requested}
         print(f"  [Tools enabled: {', '.join(registry.tool_spec.keys())}]")
 
     builder.add_tools(registry)
@@ -73,11 +73,26 @@ async def main(args: Namespace) -> None:
         client: AsyncBaseLLMClient = ProviderFactory.from_model(
             model_name=args.model,
             instructions=system_prompt,
+            history_token_budget=args.history_tokens or None,
         )
     except Exception as e:
         print(f"Failed to initialize provider for model '{args.model}': {e}")
         return
 
+    if args.prompt_cache:
+        if isinstance(client, AsyncAnthropicClient):
+            client.prompt_caching = True
+            print("  [Prompt caching enabled]")
+        else:
+            print(f"  [Warning: --prompt-cache only applies to Claude models, ignoring it for '{args.model}']")
+
+    if args.chain_responses:
+        if isinstance(client, AsyncOpenAIClient):
+            client.chain_responses = True
+            print("  [Response chaining enabled]")
+        else:
+            print(f"  [Warning: --chain-responses only applies to OpenAI models, ignoring it for '{args.model}']")
+
     chunk_ctx = None
     if args.chunks:
         try:
@@ -139,11 +154,15 @@ async def main(args: Namespace) -> None:
                 print(f"  [Context routing failed: {e}]")
 
         try:
+            usage_before: Usage = client.usage.model_copy()
+            start: float = time.monotonic()
             if args.stream:
                 await client.generate_response_streaming(query=enriched_query)
                 sys.stdout.flush()
             else:
                 await client.generate_response(query=enriched_query)
+            if args.verbose:
+                print(format_turn_usage(usage_before, client.usage, time.monotonic() - start))
         except KeyboardInterrupt:
             print("\n[Interrupted]")
         except AuthenticationError as e:
@@ -162,6 +181,18 @@ async def main(args: Namespace) -> None:
             print(f"\n[Unexpected error] {type(e).__name__}: {e}")
 
 
+def format_turn_usage(before: Usage, after: Usage, elapsed: float) -> str:
+    """One line of what a turn took: time, input tokens (with prompt-cache reads and writes) and output tokens."""
+    cache_read: int = after.cache_read_input_tokens - before.cache_read_input_tokens
+    cache_write: int = after.cache_creation_input_tokens - before.cache_creation_input_tokens
+    uncached: int = after.input_tokens - before.input_tokens
+    output: int = after.output_tokens - before.output_tokens
+    line: str = f"  [{elapsed:.2f}s, {uncached + cache_read + cache_write} input tokens"
+    if cache_read or cache_write:
+        line += f" ({cache_read} read from cache, {cache_write} written to cache)"
+    return line + f", {output} output tokens]"
+
+
 if __name__ == "__main__":
     load_dotenv()
     parser: argparse.ArgumentParser = argparse.ArgumentParser()
@@ -169,6 +200,15 @@ if __name__ == "__main__":
     # ── LLM settings ──────────────────────────────────────────────────────────
     parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=True)
     parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--history-tokens", type=int, default=DEFAULT_HISTORY_TOKENS,
+                        help="Token budget for the conversation history sent each turn; "
+                             "the oldest turns are dropped past it, 0 keeps everything (default: 16000)")
+    parser.add_argument("--prompt-cache", action=argparse.BooleanOptionalAction, default=False,
+                        help="Claude models: cache the stable system prompt sections and tool definitions "
+                             "between calls (Anthropic prompt caching)")
+    parser.add_argument("--chain-responses", action=argparse.BooleanOptionalAction, default=False,
+                        help="OpenAI models: send only each turn's new input with previous_response_id "
+                             "instead of the whole history (responses are stored by OpenAI)")
 
     # ── PromptBuilder settings ────────────────────────────────────────────────
     parser.add_argument("--identity", required=True,
@@ -182,7 +222,7 @@ if __name__ == "__main__":
     parser.add_argument("--bootstrap", default=None,
                         help="Directory to scan for AGENTS.md workspace rules (e.g. '.')")
     parser.add_argument("--verbose", action=argparse.BooleanOptionalAction, default=False,
-                        help="Show system prompt preview on startup")
+                        help="Show system prompt preview on startup, and time and token usage per turn")
 
     # ── RAG / Chunk settings ──────────────────────────────────────────────────
     parser.add_argument("--chunks", action=argparse.BooleanOptionalAction, default=False,
@@ -20,10 +20,15 @@ from types import SimpleNamespace as config
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from providers.ProviderFactory import ProviderFactory
+from providers.retry import RetryPolicy
 
 CHATGPT_API_KEY = os.getenv("CHATGPT_API_KEY")
 
-# Cache for LLM clients to avoid recreating them
+# Indexing is a batch job: wait out rate limits rather than fail the document
+PAGEINDEX_RETRY_POLICY = RetryPolicy(max_retries=8, max_delay=30.0, max_total=300.0)
+
+# Cache for LLM clients to avoid recreating them. Calls share a client (and its
+# connection pool) but each gets its own CallContext, so they can overlap.
 _llm_client_cache = {}
 
 def count_tokens(text, model=None):
@@ -37,7 +42,7 @@ def _get_or_create_client(model):
     """Get cached LLM client or create new one"""
     if model not in _llm_client_cache:
         try:
-            _llm_client_cache[model] = ProviderFactory.from_model(model_name=model)
+            _llm_client_cache[model] = ProviderFactory.from_model(model_name=model, retry_policy=PAGEINDEX_RETRY_POLICY)
         except Exception as e:
             logging.error(f"Failed to create client for {model}: {e}")
             raise
@@ -60,32 +65,16 @@ def ChatGPT_API_with_finish_reason(model, prompt, api_key=CHATGPT_API_KEY, chat_
             full_prompt = f"{history_text}\nuser: {prompt}"
         
         # Use async generate_response
-        response = await client.generate_response(query=full_prompt)
+        response = await client.generate_response(query=full_prompt, context=client.new_context())
         return response, "finished"
-    
-    max_retries = 10
-    for i in range(max_retries):
-        try:
-            # Check if we're already in an event loop
-            try:
-                loop = asyncio.get_running_loop()
-                # We're in an async context, create a task
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as pool:
-                    future = pool.submit(asyncio.run, _async_call())
-                    return future.result()
-            except RuntimeError:
-                # No running loop, safe to use asyncio.run
-                return asyncio.run(_async_call())
-                
-        except Exception as e:
-            print('Retrying...')
-            logging.error(f"Error: {e}")
-            if i < max_retries - 1:
-                time.sleep(1)
-            else:
-                logging.error('Max retries reached for prompt: ' + prompt)
-                return "", "error"
+
+    # The client retries rate limits and transient errors itself (PAGEINDEX_RETRY_POLICY)
+    try:
+        return _run_sync(_async_call)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        logging.error('Giving up on prompt: ' + prompt)
+        return "", "error"
 
 
 
@@ -104,53 +93,39 @@ def ChatGPT_API(model, prompt, api_key=CHATGPT_API_KEY, chat_history=None):
             full_prompt = f"{history_text}\nuser: {prompt}"
         
         # Use async generate_response
-        response = await client.generate_response(query=full_prompt)
+        response = await client.generate_response(query=full_prompt, context=client.new_context())
         return response
-    
-    max_retries = 10
-    for i in range(max_retries):
-        try:
-            # Check if we're already in an event loop
-            try:
-                loop = asyncio.get_running_loop()
-                # We're in an async context, run in thread pool
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as pool:
-                    future = pool.submit(asyncio.run, _async_call())
-                    return future.result()
-            except RuntimeError:
-                # No running loop, safe to use asyncio.run
-                return asyncio.run(_async_call())
-                
-        except Exception as e:
-            print('Retrying...')
-            logging.error(f"Error: {e}")
-            if i < max_retries - 1:
-                time.sleep(1)
-            else:
-                logging.error('Max retries reached for prompt: ' + prompt)
-                return "Error"
-            
+
+    try:
+        return _run_sync(_async_call)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        logging.error('Giving up on prompt: ' + prompt)
+        return "Error"
+
+
+def _run_sync(make_call):
+    """Run the coroutine from make_call() to completion from sync code."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # No running loop, safe to use asyncio.run
+        return asyncio.run(make_call())
+    # We're in an async context, run in thread pool
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        return pool.submit(asyncio.run, make_call()).result()
+
 
 async def ChatGPT_API_async(model, prompt, api_key=CHATGPT_API_KEY):
     """Use ProviderFactory client with async generate_response"""
-    max_retries = 10
-    
-    for i in range(max_retries):
-        try:
-            client = _get_or_create_client(model)
-            
-            # Use async generate_response
-            response = await client.generate_response(query=prompt)
-            return response
-        except Exception as e:
-            print('************* Retrying *************')
-            logging.error(f"Error: {e}")
-            if i < max_retries - 1:
-                await asyncio.sleep(1)  # Wait for 1s before retrying
-            else:
-                logging.error('Max retries reached for prompt: ' + prompt)
-                return "Error"  
+    try:
+        client = _get_or_create_client(model)
+        return await client.generate_response(query=prompt, context=client.new_context())
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        logging.error('Giving up on prompt: ' + prompt)
+        return "Error"
             
             
 def get_json_content(response):
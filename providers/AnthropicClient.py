@@ -1,34 +1,80 @@
 import json
+from functools import partial
 from typing import Any, AsyncIterator
 
 import anthropic
 from providers.errors.ProviderError import AuthenticationError, RateLimitExceededError, ModelNotFoundError, ConnectionError, ProviderApiError
 from providers.base import AsyncBaseLLMClient
+from providers.context import CallContext
 from anthropic import AsyncAnthropic
 from anthropic.types import Message, ToolUseBlock
-from providers.models import Conversation, AnthropicToolSchema
+from providers.models import Conversation, AnthropicToolSchema, Usage
+from services.PromptBuilder import VOLATILE_SECTIONS, split_sections
+from tools.tools import ToolRegistry
 
 MAX_TOKENS: int = 4096
 
+# Prompt-cache breakpoint; Anthropic caches the request prefix up to and including the marked block
+CACHE_CONTROL: dict[str, str] = {"type": "ephemeral"}
+
 
 class AsyncAnthropicClient(AsyncBaseLLMClient):
+    # Mark the stable parts of `system` and `tools` for Anthropic's prompt cache
+    prompt_caching: bool = False
+
     def _create_client(self) -> AsyncAnthropic:
-        return AsyncAnthropic()
+        return AsyncAnthropic(max_retries=0)
 
-    def _build_request_kwargs(self) -> dict[str, Any]:
+    def _build_request_kwargs(self, context: CallContext) -> dict[str, Any]:
+        instructions: str = self._instructions(context)
+        tool_registry: ToolRegistry = self._tool_registry(context)
         kwargs: dict[str, Any] = {
             "model": self.model,
-            "system": self.instructions,
-            "messages": [c.model_dump() for c in self.conversation_history],
+            "system": self._system_payload(instructions) if self.prompt_caching else instructions,
+            "messages": self._history_payload(context),
             "max_tokens": MAX_TOKENS,
         }
-        tools: list[AnthropicToolSchema] | None = self._get_tools()
+        if self.prompt_caching:
+            tools: list[dict[str, Any]] | None = tool_registry.formatted(
+                "anthropic-cached", partial(self._cached_tool_payload, tool_registry)
+            )
+        else:
+            tools = tool_registry.formatted("anthropic", partial(self._tool_payload, tool_registry))
         if tools:
-            kwargs["tools"] = [tool.model_dump() for tool in tools]
+            kwargs["tools"] = tools
         return kwargs
 
-    def _get_tools(self) -> list[AnthropicToolSchema] | None:
-        if not self.tool_registry.tool_spec:
+    def _tool_payload(self, tool_registry: ToolRegistry) -> list[dict[str, Any]] | None:
+        tools: list[AnthropicToolSchema] | None = self._get_tools(tool_registry)
+        return [tool.model_dump() for tool in tools] if tools else None
+
+    def _cached_tool_payload(self, tool_registry: ToolRegistry) -> list[dict[str, Any]] | None:
+        """The tools, with a cache breakpoint on the last so the whole list is cached."""
+        tools: list[dict[str, Any]] | None = self._tool_payload(tool_registry)
+        if tools:
+            tools[-1]["cache_control"] = CACHE_CONTROL
+        return tools
+
+    def _system_payload(self, instructions: str) -> str | list[dict[str, Any]]:
+        """The system prompt as text blocks split at PromptBuilder sections, with cache breakpoints.
+
+        One breakpoint goes after the sections that stay the same all chat
+        (identity, tools, ...), so it still hits when the memory section
+        changes; another at the end covers the whole prompt for the tool
+        rounds and turns that reuse it unchanged.
+        """
+        if not instructions:
+            return instructions
+        sections: list[tuple[str, str]] = split_sections(instructions)
+        blocks: list[dict[str, Any]] = [{"type": "text", "text": text} for _, text in sections]
+        stable: int = next((i for i, (name, _) in enumerate(sections) if name in VOLATILE_SECTIONS), len(sections))
+        if stable:
+            blocks[stable - 1]["cache_control"] = CACHE_CONTROL
+        blocks[-1]["cache_control"] = CACHE_CONTROL
+        return blocks
+
+    def _get_tools(self, tool_registry: ToolRegistry) -> list[AnthropicToolSchema] | None:
+        if not tool_registry.tool_spec:
             return None
         return [
             AnthropicToolSchema(
@@ -36,10 +82,10 @@ class AsyncAnthropicClient(AsyncBaseLLMClient):
                 description=spec.get("description", ""),
                 input_schema=spec["parameters"],
             )
-            for spec in self.tool_registry.tool_spec.values()
+            for spec in tool_registry.tool_spec.values()
         ]
 
-    async def _call_api(self, **kwargs: Any) -> Message:
+    async def _call_api(self, context: CallContext, **kwargs: Any) -> Message:
         try:
             return await self.client.messages.create(**kwargs)
         except anthropic.AuthenticationError as e:
@@ -53,13 +99,13 @@ class AsyncAnthropicClient(AsyncBaseLLMClient):
         except anthropic.APIError as e:
             raise ProviderApiError(str(e), provider="anthropic", original_error=e)
 
-    async def _call_api_streaming(self, **kwargs: Any) -> AsyncIterator[str]:
+    async def _call_api_streaming(self, context: CallContext, **kwargs: Any) -> AsyncIterator[str]:
         kwargs.pop("stream", None)
         try:
             async with self.client.messages.stream(**kwargs) as stream:
                 async for text in stream.text_stream:
                     yield text
-                self._last_stream_response = await stream.get_final_message()
+                context.last_stream_response = await stream.get_final_message()
         except anthropic.AuthenticationError as e:
             raise AuthenticationError("Invalid API key", provider="anthropic", original_error=e)
         except anthropic.RateLimitError as e:
@@ -78,33 +124,36 @@ class AsyncAnthropicClient(AsyncBaseLLMClient):
         text_blocks: list[str] = [block.text for block in response.content if block.type == "text"]
         return "\n".join(text_blocks)
 
-    def _pre_tool_hook_streaming(self) -> None:
+    def _extract_usage(self, response: Message) -> Usage | None:
+        return Usage(
+            input_tokens=response.usage.input_tokens,
+            output_tokens=response.usage.output_tokens,
+            cache_read_input_tokens=response.usage.cache_read_input_tokens or 0,
+            cache_creation_input_tokens=response.usage.cache_creation_input_tokens or 0,
+        )
+
+    def _pre_tool_hook_streaming(self, context: CallContext) -> None:
         """Hook called before executing tool calls during streaming."""
-        if self._last_stream_response:
-            self._pre_tool_hook(self._last_stream_response)
+        if context.last_stream_response:
+            self._pre_tool_hook(context, context.last_stream_response)
 
-    def _pre_tool_hook(self, response: Message) -> None:
+    def _pre_tool_hook(self, context: CallContext, response: Message) -> None:
         """Append the full assistant response (including tool_use blocks) to history."""
         content: list[dict[str, Any]] = [block.model_dump() for block in response.content]
-        self.conversation_history.append(
+        context.history.append(
             Conversation(role="assistant", content=content)
         )
 
-    def _extract_streamed_tool_calls(self):
-        if hasattr(self, "_last_stream_response") and self._last_stream_response:
-            return self._extract_tool_calls(self._last_stream_response)
+    def _extract_streamed_tool_calls(self, context: CallContext):
+        if context.last_stream_response:
+            return self._extract_tool_calls(context.last_stream_response)
         return []
 
-    def _execute_tool_call(self, tool_call: ToolUseBlock) -> None:
-        arguments: str = json.dumps(tool_call.input)
-        tool_request_text: str = f"[Tool call: {tool_call.name}({arguments})]"
-        print(tool_request_text)
+    def _tool_call_request(self, tool_call: ToolUseBlock) -> tuple[str, str]:
+        return tool_call.name, json.dumps(tool_call.input)
 
-        result: str = self.tool_registry.execute(tool_call.name, arguments=arguments)
-        tool_response_text: str = f"[Tool result: {result}]"
-        print(tool_response_text)
-
-        self.conversation_history.append(
+    def _record_tool_call(self, context: CallContext, tool_call: ToolUseBlock, result: str) -> None:
+        context.history.append(
             Conversation(role="user", content=[
                 {
                     "type": "tool_result",
@@ -112,4 +161,4 @@ class AsyncAnthropicClient(AsyncBaseLLMClient):
                     "content": str(result),
                 }
             ])
-        )
\ No newline at end of file
+        )
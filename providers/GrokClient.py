@@ -10,4 +10,5 @@ class AsyncGrokClient(AsyncOpenAICompatClient):
         return AsyncOpenAI(
             base_url=os.getenv("GROK_BASE_URL", "https://api.x.ai/v1"),
             api_key=os.getenv("XAI_API_KEY", ""),
+            max_retries=0,
         )
@@ -10,4 +10,5 @@ class AsyncGroqClient(AsyncOpenAICompatClient):
         return AsyncOpenAI(
             base_url=os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1"),
             api_key=os.getenv("GROQ_API_KEY", ""),
+            max_retries=0,
         )
@@ -10,4 +10,5 @@ class AsyncOllamaClient(AsyncOpenAICompatClient):
         return AsyncOpenAI(
             base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"),
             api_key=os.getenv("OLLAMA_API_KEY", "ollama"),
+            max_retries=0,
         )
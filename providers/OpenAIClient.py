@@ -6,4 +6,4 @@ class AsyncOpenAIClient(AsyncOpenAICompatClient):
     """Asynchronous OpenAI client."""
 
     def _create_client(self) -> AsyncOpenAI:
-        return AsyncOpenAI()
+        return AsyncOpenAI(max_retries=0)
@@ -1,5 +1,6 @@
 from providers import AsyncBaseLLMClient, AsyncOllamaClient, AsyncOpenAIClient, AsyncAnthropicClient, AsyncGrokClient, AsyncGroqClient
 from typing import Final
+from providers.retry import RetryPolicy
 from tools.tools import ToolRegistry, registry
 
 MODEL_PROVIDERS: Final[dict[str, type[AsyncBaseLLMClient]]] = {
@@ -23,18 +24,34 @@ MODEL_PREFIXES: Final[list[tuple[str, str]]] = [
 
 
 class ProviderFactory:
+    @staticmethod
+    def provider_class(model_name: str) -> type[AsyncBaseLLMClient]:
+        """Resolve the client class from model name prefix.
+
+        Falls back to AsyncOllamaClient if no prefix matches.
+        """
+        for prefix, provider in MODEL_PREFIXES:
+            if model_name.lower().startswith(prefix.lower()):
+                return MODEL_PROVIDERS[provider]
+        return AsyncOllamaClient
+
     @staticmethod
     def from_model(
         model_name: str,
         instructions: str = "",
         tool_registry: ToolRegistry = registry,
+        history_token_budget: int | None = None,
+        retry_policy: RetryPolicy | None = None,
     ) -> AsyncBaseLLMClient:
         """Resolve the provider from model name prefix and return an initialized client.
         
         Falls back to AsyncOllamaClient if no prefix matches.
         """
-        for prefix, provider in MODEL_PREFIXES:
-            if model_name.lower().startswith(prefix.lower()):
-                client_class: type[AsyncBaseLLMClient] = MODEL_PROVIDERS[provider]
-                return client_class(model=model_name, instructions=instructions, tool_registry=tool_registry)
-        return AsyncOllamaClient(model=model_name, instructions=instructions, tool_registry=tool_registry)
+        client_class: type[AsyncBaseLLMClient] = ProviderFactory.provider_class(model_name)
+        return client_class(
+            model=model_name,
+            instructions=instructions,
+            tool_registry=tool_registry,
+            history_token_budget=history_token_budget,
+            retry_policy=retry_policy,
+        )
@@ -1,10 +1,14 @@
 import asyncio
-import sys
 from abc import ABC, abstractmethod
-from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
-from typing import Any, AsyncIterator
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, AsyncIterator, ClassVar
 from tools.tools import ToolRegistry, registry
-from providers.models import Conversation
+from providers.errors.ProviderError import ProviderError
+from providers.context import CallContext
+from providers.events import Done, StreamEvent, TerminalPrinter, TextDelta, ToolCallEnd, ToolCallStart, UsageEvent
+from providers.models import Conversation, Usage
+from providers.retry import RetryPolicy
+from providers.tokens import TokenCounter, atoken_counter, token_counter, trim_history
 
 # Default timeout (seconds) for a single LLM API call.
 DEFAULT_API_TIMEOUT: int = 120
@@ -18,22 +22,33 @@ class AsyncBaseLLMClient(BaseModel, ABC):
 
     Provider-agnostic — subclasses implement all provider-specific logic
     (client creation, API calls, tool formatting, response parsing).
+
+    Conversation state is kept in a CallContext (providers/context.py) passed
+    through each call, so one client can serve concurrent conversations.
     """
 
+    # The CallContext subclass new_context() makes, for providers with extra per-call state
+    context_class: ClassVar[type[CallContext]] = CallContext
+
     client: Any = None
     model: str = ""
-    conversation_history: list[Conversation] = Field(default_factory=list)
     instructions: str = ""
     tool_registry: ToolRegistry = registry
-    _last_stream_response: Any | None = PrivateAttr(default=None)
+    # Used by calls that aren't given a context of their own
+    context: CallContext = Field(default_factory=CallContext)
+    # Tokens of conversation history sent per API call; the oldest turns are dropped past it
+    history_token_budget: int | None = None
+    # Retries for rate limits and other transient API failures (the SDK client's own are off)
+    retry_policy: RetryPolicy = Field(default_factory=RetryPolicy)
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     @abstractmethod
-    async def _call_api_streaming(self, **kwargs: Any) -> AsyncIterator[str]:
+    async def _call_api_streaming(self, context: CallContext, **kwargs: Any) -> AsyncIterator[str]:
         """
         Stream tokens from the provider. Yields text chunks as they arrive.
 
-        Should yield text strings for content, and raise / return when tool calls are detected
+        Should yield text strings for content, and raise / return when tool calls are detected.
+        The completed response goes in context.last_stream_response.
         """
 
     @abstractmethod
@@ -42,13 +57,13 @@ class AsyncBaseLLMClient(BaseModel, ABC):
         ...
 
     @abstractmethod
-    async def _call_api(self, **kwargs: Any) -> Any:
+    async def _call_api(self, context: CallContext, **kwargs: Any) -> Any:
         """Make an asynchronous API call and return the raw provider response."""
         ...
 
     @abstractmethod
-    def _build_request_kwargs(self) -> dict[str, Any]:
-        """Build provider-specific request keyword arguments."""
+    def _build_request_kwargs(self, context: CallContext) -> dict[str, Any]:
+        """Build provider-specific request keyword arguments for the context's conversation."""
         ...
 
     @abstractmethod
@@ -62,119 +77,314 @@ class AsyncBaseLLMClient(BaseModel, ABC):
         ...
 
     @abstractmethod
-    def _execute_tool_call(self, tool_call: Any) -> None:
-        """Execute a single tool call and record it in conversation history."""
+    def _tool_call_request(self, tool_call: Any) -> tuple[str, str]:
+        """The tool name and JSON arguments of a tool call."""
+        ...
+
+    @abstractmethod
+    def _record_tool_call(self, context: CallContext, tool_call: Any, result: str) -> None:
+        """Record a tool call and its result in conversation history."""
         ...
 
-    def _pre_tool_hook(self, response: Any) -> None:
+    def _extract_usage(self, response: Any) -> Usage | None:
+        """Token usage reported in the provider response, if any. Override per provider."""
+        return None
+
+    def _record_usage(self, context: CallContext, response: Any) -> Usage | None:
+        """Add the response's usage to context.usage, and return it."""
+        usage: Usage | None = self._extract_usage(response)
+        if usage is not None:
+            context.usage.input_tokens += usage.input_tokens
+            context.usage.output_tokens += usage.output_tokens
+            context.usage.cache_read_input_tokens += usage.cache_read_input_tokens
+            context.usage.cache_creation_input_tokens += usage.cache_creation_input_tokens
+        return usage
+
+    def _pre_tool_hook(self, context: CallContext, response: Any) -> None:
         """Optional hook called before executing tool calls. Override to add provider-specific logic."""
         pass
 
-    def _pre_tool_hook_streaming(self) -> None:
+    def _pre_tool_hook_streaming(self, context: CallContext) -> None:
         pass
 
     def __init__(
-        self, model: str, instructions: str, tool_registry: ToolRegistry = registry
+        self,
+        model: str,
+        instructions: str,
+        tool_registry: ToolRegistry = registry,
+        client: Any = None,
+        history_token_budget: int | None = None,
+        retry_policy: RetryPolicy | None = None,
     ) -> None:
+        """Pass an existing provider SDK `client` to share its connection pool."""
         super().__init__(
             client=None,
             model=model,
             instructions=instructions,
-            conversation_history=[],
+            tool_registry=tool_registry,
+            history_token_budget=history_token_budget,
+            retry_policy=retry_policy or RetryPolicy(),
+        )
+        object.__setattr__(self, "client", client if client is not None else self._create_client())
+        self.context = self.new_context()
+
+    def new_context(
+        self,
+        history: list[Conversation] | None = None,
+        instructions: str | None = None,
+        tool_registry: ToolRegistry | None = None,
+    ) -> CallContext:
+        """A fresh conversation for this client, optionally starting from `history` (which it takes over).
+
+        `instructions` and `tool_registry` replace the client's own for this conversation.
+        """
+        return self.context_class(
+            history=history if history is not None else [],
+            instructions=instructions,
             tool_registry=tool_registry,
         )
-        object.__setattr__(self, "client", self._create_client())
 
-    async def generate_response(self, query: str) -> str:
-        self.conversation_history.append(Conversation(role="user", content=query))
+    def _instructions(self, context: CallContext) -> str:
+        return context.instructions if context.instructions is not None else self.instructions
+
+    def _tool_registry(self, context: CallContext) -> ToolRegistry:
+        return context.tool_registry if context.tool_registry is not None else self.tool_registry
+
+    @property
+    def conversation_history(self) -> list[Conversation]:
+        """History of the client's own context."""
+        return self.context.history
+
+    @conversation_history.setter
+    def conversation_history(self, history: list[Conversation]) -> None:
+        self.context.history = history
+
+    @property
+    def usage(self) -> Usage:
+        """Usage of the client's own context."""
+        return self.context.usage
+
+    @usage.setter
+    def usage(self, usage: Usage) -> None:
+        self.context.usage = usage
+
+    def count_tokens(self, text: str) -> int:
+        """Tokens in `text` for this model: its tiktoken encoding if known, else an estimate.
+
+        The first call per model may load (or download) the encoding; async code uses atoken_counter.
+        """
+        return token_counter(self.model)(text)
+
+    def _history_payload(self, context: CallContext) -> list[dict[str, Any]]:
+        """context.history as request dicts, serializing only messages not sent before.
+
+        History is only appended to, cleared or trimmed from the front, so the
+        cached dicts are matched up by checking the ends of the cached run
+        instead of comparing (or re-serializing) every message. Don't mutate a
+        message's content once it has been sent.
+        """
+        history: list[Conversation] = context.history
+        messages, payloads = context.sent_messages, context.sent_payloads
+        offset: int | None = _cached_offset(messages, history)
+        if offset is None:
+            messages.clear()
+            payloads.clear()
+        elif offset:
+            del messages[:offset]
+            del payloads[:offset]
+        for message in history[len(messages):]:
+            messages.append(message)
+            payloads.append(message.model_dump())
+        return list(payloads)
+
+    async def _trim_history(self, context: CallContext) -> None:
+        """Drop the oldest turns that don't fit in history_token_budget."""
+        if self.history_token_budget is not None:
+            count: TokenCounter = await atoken_counter(self.model)
+            trim_history(context.history, self.history_token_budget, count)
+
+    async def _run_tools(self, context: CallContext, requests: list[tuple[str, str]]) -> list[str]:
+        """Run one round's (name, arguments) tool calls concurrently; results come back in call order.
+
+        Each tool still gets ToolRegistry.aexecute's timeout; the round takes as
+        long as its slowest tool rather than the sum of them.
+        """
+        tool_registry: ToolRegistry = self._tool_registry(context)
+        return await asyncio.gather(*(
+            tool_registry.aexecute(name, arguments) for name, arguments in requests
+        ))
+
+    async def _execute_tool_calls(self, context: CallContext, tool_calls: list[Any]) -> None:
+        """Run one round's tool calls, printing them and recording the results in call order."""
+        requests: list[tuple[str, str]] = [self._tool_call_request(tool_call) for tool_call in tool_calls]
+        for name, arguments in requests:
+            print(f"[Tool call: {name}({arguments})]")
+        results: list[str] = await self._run_tools(context, requests)
+        for tool_call, result in zip(tool_calls, results):
+            print(f"[Tool result: {result}]")
+            self._record_tool_call(context, tool_call, result)
+
+    async def generate_response(self, query: str, context: CallContext | None = None) -> str:
+        """Answer `query` in `context` (default: the client's own), running tool rounds as needed."""
+        context = context if context is not None else self.context
+        context.history.append(Conversation(role="user", content=query))
 
         response: Any = None
         for round_num in range(MAX_TOOL_ROUNDS):
-            kwargs: dict[str, Any] = self._build_request_kwargs()
+            await self._trim_history(context)
+            kwargs: dict[str, Any] = self._build_request_kwargs(context)
             try:
-                response = await asyncio.wait_for(
-                    self._call_api(**kwargs),
-                    timeout=DEFAULT_API_TIMEOUT,
+                response = await self.retry_policy.call(
+                    lambda: asyncio.wait_for(self._call_api(context, **kwargs), timeout=DEFAULT_API_TIMEOUT)
                 )
             except asyncio.TimeoutError:
                 msg = f"[Error: LLM API call timed out after {DEFAULT_API_TIMEOUT}s]"
                 print(msg)
-                self.conversation_history.append(Conversation(role="assistant", content=msg))
+                context.history.append(Conversation(role="assistant", content=msg))
                 return msg
 
+            self._record_usage(context, response)
             tool_calls: list[Any] = self._extract_tool_calls(response)
 
             if not tool_calls:
-                return self._process_text_response(self._extract_text(response))
-
-            self._pre_tool_hook(response)
+                return self._process_text_response(context, self._extract_text(response))
 
-            for tool_call in tool_calls:
-                self._execute_tool_call(tool_call)
+            self._pre_tool_hook(context, response)
+            await self._execute_tool_calls(context, tool_calls)
 
         # If we exhausted the tool-call budget, return whatever text we have.
         print("[Warning: max tool-call rounds reached, returning partial response]")
         final_text = self._extract_text(response) if response else ""
-        return self._process_text_response(final_text)
+        return self._process_text_response(context, final_text)
 
-    async def generate_response_streaming(self, query: str) -> str:
-        """Like generate_response, but streams text tokens to stdout in real-time"""
-        self.conversation_history.append(Conversation(role="user", content=query))
+    async def events(self, query: str, context: CallContext | None = None) -> AsyncIterator[StreamEvent]:
+        """Stream the response as typed events (see providers/events.py), running tool rounds in between.
+
+        Raises asyncio.TimeoutError if a round takes longer than DEFAULT_API_TIMEOUT;
+        any partial text is recorded in conversation history first. A failed
+        round is retried per retry_policy only if it hadn't yielded any text.
+        """
+        context = context if context is not None else self.context
+        context.history.append(Conversation(role="user", content=query))
+        loop = asyncio.get_running_loop()
 
         full_text = ""
         for round_num in range(MAX_TOOL_ROUNDS):
-            self._last_stream_response = None
-            kwargs = self._build_request_kwargs()
+            context.last_stream_response = None
+            await self._trim_history(context)
+            kwargs = self._build_request_kwargs(context)
             kwargs["stream"] = True
 
             collected_text: list[str] = []
-
-            async def _consume_stream() -> None:
-                async for chunk in self._call_api_streaming(**kwargs):
-                    if isinstance(chunk, str):
-                        print(chunk, end="", flush=True)
-                        collected_text.append(chunk)
-
-            try:
-                await asyncio.wait_for(
-                    _consume_stream(),
-                    timeout=DEFAULT_API_TIMEOUT,
-                )
-            except asyncio.TimeoutError:
-                # Print whatever we collected so far, then warn the user.
-                partial = "".join(collected_text)
-                print(f"\n[Error: streaming response timed out after {DEFAULT_API_TIMEOUT}s]", flush=True)
-                if partial:
-                    self.conversation_history.append(
-                        Conversation(role="assistant", content=partial)
+            failures: int = 0
+            first_attempt: float = loop.time()
+            while True:
+                deadline: float = loop.time() + DEFAULT_API_TIMEOUT
+                stream: AsyncIterator[str] = self._call_api_streaming(context, **kwargs)
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(anext(stream), timeout=max(deadline - loop.time(), 0))
+                        except StopAsyncIteration:
+                            break
+                        if isinstance(chunk, str):
+                            collected_text.append(chunk)
+                            yield TextDelta(chunk)
+                    break
+                except asyncio.TimeoutError:
+                    partial = "".join(collected_text)
+                    if partial:
+                        context.history.append(
+                            Conversation(role="assistant", content=partial)
+                        )
+                    raise
+                except ProviderError as e:
+                    failures += 1
+                    delay: float | None = None if collected_text else self.retry_policy.backoff(
+                        failures, e, loop.time() - first_attempt
                     )
-                return partial
+                    if delay is None:
+                        raise
+                finally:
+                    await stream.aclose()
+                await asyncio.sleep(delay)
 
             full_text = "".join(collected_text)
 
             tool_calls: list[Any] = []
-            if hasattr(self, '_last_stream_response') and self._last_stream_response:
-                tool_calls = self._extract_tool_calls(self._last_stream_response)
+            if context.last_stream_response:
+                usage: Usage | None = self._record_usage(context, context.last_stream_response)
+                if usage is not None:
+                    yield UsageEvent(usage)
+                tool_calls = self._extract_tool_calls(context.last_stream_response)
 
             if not tool_calls:
-                print(flush=True)
-                self.conversation_history.append(
+                context.history.append(
                     Conversation(role="assistant", content=full_text)
                 )
-                return full_text
-
-            self._pre_tool_hook_streaming()
-            for tool_call in tool_calls:
-                self._execute_tool_call(tool_call)
+                yield Done(full_text)
+                return
+
+            self._pre_tool_hook_streaming(context)
+            requests: list[tuple[str, str]] = [self._tool_call_request(tool_call) for tool_call in tool_calls]
+            for name, arguments in requests:
+                yield ToolCallStart(name, arguments)
+            results: list[str] = await self._run_tools(context, requests)
+            # Record every result before handing any out, in case the consumer stops early
+            for tool_call, result in zip(tool_calls, results):
+                self._record_tool_call(context, tool_call, result)
+            for (name, _), result in zip(requests, results):
+                yield ToolCallEnd(name, result)
 
         # If we exhausted the tool-call budget, return whatever we have.
-        print("\n[Warning: max tool-call rounds reached, returning partial response]", flush=True)
-        self.conversation_history.append(
+        context.history.append(
             Conversation(role="assistant", content=full_text)
         )
-        return full_text
-                
-    def _process_text_response(self, output_text: str) -> str:
+        yield Done(full_text, max_rounds_reached=True)
+
+    async def stream_response(self, query: str, context: CallContext | None = None) -> AsyncIterator[str]:
+        """Just the text deltas of events()."""
+        events: AsyncIterator[StreamEvent] = self.events(query, context)
+        try:
+            async for event in events:
+                if isinstance(event, TextDelta):
+                    yield event.text
+        finally:
+            await events.aclose()
+
+    async def generate_response_streaming(self, query: str, context: CallContext | None = None) -> str:
+        """Like generate_response, but streams the response to stdout as it arrives"""
+        context = context if context is not None else self.context
+        printer: TerminalPrinter = TerminalPrinter()
+        collected_text: list[str] = []
+        try:
+            async for event in self.events(query, context):
+                printer.render(event)
+                if isinstance(event, TextDelta):
+                    collected_text.append(event.text)
+        except asyncio.TimeoutError:
+            # Print whatever we collected so far, then warn the user.
+            printer.flush()
+            print(f"\n[Error: streaming response timed out after {DEFAULT_API_TIMEOUT}s]", flush=True)
+            return "".join(collected_text)
+
+        last: Conversation = context.history[-1]
+        return last.content if isinstance(last.content, str) else "".join(collected_text)
+
+    def _process_text_response(self, context: CallContext, output_text: str) -> str:
         print(output_text)
-        self.conversation_history.append(Conversation(role="assistant", content=output_text))
+        context.history.append(Conversation(role="assistant", content=output_text))
         return output_text
+
+
+def _cached_offset(cached: list[Conversation], history: list[Conversation]) -> int | None:
+    """How many leading `cached` messages were trimmed off `history`, or None if the cache doesn't match it."""
+    if not cached or not history:
+        return None
+    for offset, message in enumerate(cached):
+        if message is history[0]:
+            kept: int = len(cached) - offset
+            if kept <= len(history) and history[kept - 1] is cached[-1]:
+                return offset
+            return None
+    return None
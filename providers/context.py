@@ -0,0 +1,39 @@
+"""Per-call conversation state for AsyncBaseLLMClient.
+
+A client's configuration (model, instructions, tools, SDK client and its
+connection pool) is shared, while everything a call mutates lives in a
+CallContext: the conversation history, token usage, the response a
+streaming round just completed, and the request dicts already serialized
+from the history. A context can also bring its own instructions and tools in
+place of the client's. Pass each conversation its own context to answer
+many at once on one client:
+
+    client = ProviderFactory.from_model("gpt-4o-mini")
+    replies = await asyncio.gather(*(
+        client.generate_response(prompt, client.new_context()) for prompt in prompts
+    ))
+
+Calls made without a context use the client's own `context`, which keeps a
+chat going across calls the way the CLI uses it. A context must only be
+used by one call at a time.
+"""
+from dataclasses import dataclass, field
+from typing import Any
+
+from providers.models import Conversation, Usage
+from tools.tools import ToolRegistry
+
+
+@dataclass
+class CallContext:
+    history: list[Conversation] = field(default_factory=list)
+    # Tokens billed across every API call made with this context
+    usage: Usage = field(default_factory=Usage)
+    # The completed response of the streaming round in progress
+    last_stream_response: Any | None = None
+    # history messages already serialized, and their request dicts
+    sent_messages: list[Conversation] = field(default_factory=list)
+    sent_payloads: list[dict[str, Any]] = field(default_factory=list)
+    # This conversation's system prompt and tools; None means the client's
+    instructions: str | None = None
+    tool_registry: ToolRegistry | None = None
@@ -0,0 +1,90 @@
+"""Typed events from AsyncBaseLLMClient.events(), and a terminal renderer for them.
+
+A response streams as TextDelta events. Each tool round adds a
+ToolCallStart per call, then a ToolCallEnd per call once they have all run
+(in call order). Every API call that reports token usage adds a UsageEvent.
+The stream ends with Done, carrying the final reply text.
+
+TerminalPrinter is the CLI's consumer. It writes deltas as they come but
+flushes the output at most every flush_interval seconds instead of once per
+token.
+"""
+import sys
+import time
+from dataclasses import dataclass
+from typing import TextIO
+
+from providers.models import Usage
+
+# Seconds between flushes of streamed text; 20 redraws a second reads as live
+DEFAULT_FLUSH_INTERVAL: float = 0.05
+
+
+@dataclass
+class TextDelta:
+    text: str
+
+
+@dataclass
+class ToolCallStart:
+    name: str
+    arguments: str
+
+
+@dataclass
+class ToolCallEnd:
+    name: str
+    result: str
+
+
+@dataclass
+class UsageEvent:
+    """Tokens billed for one API call."""
+    usage: Usage
+
+
+@dataclass
+class Done:
+    text: str
+    # The tool loop hit MAX_TOOL_ROUNDS, so `text` may be partial
+    max_rounds_reached: bool = False
+
+
+StreamEvent = TextDelta | ToolCallStart | ToolCallEnd | UsageEvent | Done
+
+
+class TerminalPrinter:
+    """Renders events to `out` as the CLI shows them, with buffered flushing."""
+
+    def __init__(self, out: TextIO | None = None, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        self.out = out if out is not None else sys.stdout
+        self.flush_interval = flush_interval
+        self._last_flush: float = time.monotonic()
+        self._line_open: bool = False
+
+    def render(self, event: StreamEvent) -> None:
+        if isinstance(event, TextDelta):
+            self.out.write(event.text)
+            self._line_open = not event.text.endswith("\n")
+            now: float = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self.flush(now)
+        elif isinstance(event, ToolCallStart):
+            self._write_line(f"[Tool call: {event.name}({event.arguments})]")
+        elif isinstance(event, ToolCallEnd):
+            self._write_line(f"[Tool result: {event.result}]")
+        elif isinstance(event, Done):
+            self.out.write("\n")
+            self._line_open = False
+            if event.max_rounds_reached:
+                self.out.write("[Warning: max tool-call rounds reached, returning partial response]\n")
+            self.flush()
+
+    def _write_line(self, line: str) -> None:
+        self.out.write(("\n" if self._line_open else "") + line + "\n")
+        self._line_open = False
+        self.flush()
+
+    def flush(self, now: float | None = None) -> None:
+        self.out.flush()
+        self._last_flush = now if now is not None else time.monotonic()
@@ -14,6 +14,15 @@ class Conversation(BaseModel):
     content: Union[str, list[Any]]
 
 
+class Usage(BaseModel):
+    """Tokens billed across every API call of a response (all tool rounds)."""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # Prompt-cache reads and writes, counted separately from input_tokens (Anthropic)
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+
+
 class AnthropicToolSchema(BaseModel):
     """Tool schema for Anthropic's tool use API."""
     name: str
@@ -2,30 +2,63 @@
 
 Any provider that speaks the OpenAI API (OpenAI, Ollama, Groq, Together AI, etc.)
 can extend this class and only override _create_client().
+
+With chain_responses, requests continue the upstream's stored copy of the
+conversation: they carry previous_response_id and only the input added
+since that response (new user turns and tool outputs) instead of the whole
+history. The chain starts over from the full history whenever the history
+no longer lines up with it (it was trimmed, cleared or replaced) or the
+upstream doesn't have the previous response any more. Only upstreams that
+store responses (OpenAI) support this. The chain is part of the conversation,
+so it's kept in a ChainContext.
 """
 from abc import ABC
+from dataclasses import dataclass, field
+from functools import partial
 
 import openai
 from openai.types.responses import Response, FunctionToolParam, ResponseFunctionToolCall
 from typing import Any, AsyncIterator
 from providers.base import AsyncBaseLLMClient
+from providers.context import CallContext
 from providers.errors.ProviderError import AuthenticationError, RateLimitExceededError, ModelNotFoundError, ConnectionError, ProviderApiError
-from providers.models import Conversation, OpenAIToolSchema
+from providers.models import Conversation, OpenAIToolSchema, Usage
+from tools.tools import ToolRegistry
+
+
+@dataclass
+class ChainContext(CallContext):
+    """CallContext plus the response chain the conversation continues."""
+    # The last response, the first history message of its chain, and the last one it has seen
+    chain_id: str | None = None
+    chain_start: Conversation | None = None
+    chain_anchor: Conversation | None = None
+    # Last history message in the request being made, the anchor once it's answered
+    request_anchor: Conversation | None = None
+    # Tool result messages, and the function_call_output items that stand for them in a chain
+    tool_outputs: list[tuple[Conversation, dict[str, Any]]] = field(default_factory=list)
 
 
 class AsyncOpenAICompatClient(AsyncBaseLLMClient, ABC):
     """Async base for any provider using the OpenAI-compatible API."""
-    async def _call_api_streaming(self, **kwargs: Any) -> AsyncIterator[str]:
+
+    context_class = ChainContext
+
+    # Send only new input items with previous_response_id (see the module docstring)
+    chain_responses: bool = False
+
+    async def _call_api_streaming(self, context: ChainContext, **kwargs: Any) -> AsyncIterator[str]:
         """Stream from the OpenAI-compatible Responses API."""
         try:
-            stream = await self.client.responses.create(**kwargs)
+            stream = await self._create_response(context, kwargs)
 
             async for event in stream:
                 if event.type == "response.output_text.delta":
                     yield event.delta
 
                 elif event.type == "response.completed":
-                    self._last_stream_response = event.response
+                    context.last_stream_response = event.response
+                    self._extend_chain(context, event.response)
         except openai.AuthenticationError as e:
             raise AuthenticationError("Invalid API key", provider="openai", original_error=e)
         except openai.RateLimitError as e:
@@ -37,15 +70,17 @@ class AsyncOpenAICompatClient(AsyncBaseLLMClient, ABC):
         except openai.APIError as e:
             raise ProviderApiError(str(e), provider="openai", original_error=e)
 
-    def _extract_streamed_tool_calls(self):
+    def _extract_streamed_tool_calls(self, context: CallContext):
         """Extract tool calls from the completed streamed response."""
-        if hasattr(self, '_last_stream_response') and self._last_stream_response:
-            return self._extract_tool_calls(self._last_stream_response)
+        if context.last_stream_response:
+            return self._extract_tool_calls(context.last_stream_response)
         return []
 
-    async def _call_api(self, **kwargs: Any) -> Response:
+    async def _call_api(self, context: ChainContext, **kwargs: Any) -> Response:
         try:
-            return await self.client.responses.create(**kwargs)
+            response: Response = await self._create_response(context, kwargs)
+            self._extend_chain(context, response)
+            return response
         except openai.AuthenticationError as e:
             raise AuthenticationError("Invalid API key", provider="openai", original_error=e)
         except openai.RateLimitError as e:
@@ -57,38 +92,93 @@ class AsyncOpenAICompatClient(AsyncBaseLLMClient, ABC):
         except openai.APIError as e:
             raise ProviderApiError(str(e), provider="openai", original_error=e)
 
-    def _build_request_kwargs(self) -> dict[str, Any]:
+    def _build_request_kwargs(self, context: ChainContext) -> dict[str, Any]:
         kwargs: dict[str, Any] = {
             "model": self.model,
-            "instructions": self.instructions,
-            "input": [c.model_dump() for c in self.conversation_history],
+            "instructions": self._instructions(context),
         }
-        tools: list[OpenAIToolSchema] | None = self._get_tools()
+        chained: list[dict[str, Any]] | None = self._chained_input(context) if self.chain_responses else None
+        if chained is not None:
+            kwargs["previous_response_id"] = context.chain_id
+            kwargs["input"] = chained
+        else:
+            kwargs["input"] = self._history_payload(context)
+        if self.chain_responses:
+            kwargs["store"] = True
+            context.request_anchor = context.history[-1] if context.history else None
+        tool_registry: ToolRegistry = self._tool_registry(context)
+        tools: list[OpenAIToolSchema] | None = tool_registry.formatted("openai", partial(self._get_tools, tool_registry))
         if tools:
             kwargs["tools"] = tools
         return kwargs
 
+    def _chained_input(self, context: ChainContext) -> list[dict[str, Any]] | None:
+        """The input added since the chain's last response, or None if the chain can't be continued."""
+        history: list[Conversation] = context.history
+        if context.chain_id is None or not history or history[0] is not context.chain_start:
+            return None
+        for index in range(len(history) - 1, -1, -1):
+            if history[index] is context.chain_anchor:
+                break
+        else:
+            return None
+
+        outputs: dict[int, dict[str, Any]] = {id(message): item for message, item in context.tool_outputs}
+        items: list[dict[str, Any]] = []
+        for message in history[index + 1:]:
+            if id(message) in outputs:
+                items.append(outputs[id(message)])
+            elif message.role == "user":
+                items.append(message.model_dump())
+            # Assistant messages are the previous response's output, which the upstream already has
+        return items or None
+
+    def _extend_chain(self, context: ChainContext, response: Response) -> None:
+        """Make `response` the one the context's next request continues from."""
+        if not self.chain_responses:
+            return
+        context.chain_id = response.id
+        context.chain_start = context.history[0] if context.history else None
+        context.chain_anchor = context.request_anchor
+        context.tool_outputs.clear()
+
+    async def _create_response(self, context: ChainContext, kwargs: dict[str, Any]) -> Any:
+        """responses.create, resending the full history if the upstream lost the previous response."""
+        try:
+            return await self.client.responses.create(**kwargs)
+        except (openai.BadRequestError, openai.NotFoundError):
+            if "previous_response_id" not in kwargs:
+                raise
+            context.chain_id = None
+            full: dict[str, Any] = self._build_request_kwargs(context)
+            if "stream" in kwargs:
+                full["stream"] = kwargs["stream"]
+            return await self.client.responses.create(**full)
+
     def _extract_tool_calls(self, response: Response) -> list[ResponseFunctionToolCall]:
         return [item for item in response.output if item.type == "function_call"]
 
     def _extract_text(self, response: Response) -> str:
         return response.output_text
 
-    def _execute_tool_call(self, tool_call: ResponseFunctionToolCall) -> None:
-        tool_request_text: str = f"[Tool call: {tool_call.name}({tool_call.arguments})]"
-
-        self.conversation_history.append(
-            Conversation(role="assistant", content=tool_request_text)
-        )
-        print(tool_request_text)
+    def _extract_usage(self, response: Response) -> Usage | None:
+        if response.usage is None:
+            return None
+        return Usage(input_tokens=response.usage.input_tokens, output_tokens=response.usage.output_tokens)
 
-        result: str = self.tool_registry.execute(tool_call.name, tool_call.arguments)
-        tool_response_text: str = f"[Tool result: {result}]"
+    def _tool_call_request(self, tool_call: ResponseFunctionToolCall) -> tuple[str, str]:
+        return tool_call.name, tool_call.arguments
 
-        self.conversation_history.append(
-            Conversation(role="user", content=tool_response_text)
+    def _record_tool_call(self, context: ChainContext, tool_call: ResponseFunctionToolCall, result: str) -> None:
+        context.history.append(
+            Conversation(role="assistant", content=f"[Tool call: {tool_call.name}({tool_call.arguments})]")
         )
-        print(tool_response_text)
+        result_message: Conversation = Conversation(role="user", content=f"[Tool result: {result}]")
+        context.history.append(result_message)
+        if self.chain_responses:
+            context.tool_outputs.append(
+                (result_message, {"type": "function_call_output", "call_id": tool_call.call_id, "output": result})
+            )
 
     def vision_query(self, image_b64: str, prompt: str, model: str, max_tokens: int) -> str:
         """Send an image + text prompt to the vision-capable model and return text response.
@@ -131,8 +221,8 @@ class AsyncOpenAICompatClient(AsyncBaseLLMClient, ABC):
         finally:
             loop.close()
 
-    def _get_tools(self) -> list[OpenAIToolSchema] | None:
-        if not self.tool_registry.tool_spec:
+    def _get_tools(self, tool_registry: ToolRegistry) -> list[OpenAIToolSchema] | None:
+        if not tool_registry.tool_spec:
             return None
         return [
             OpenAIToolSchema(
@@ -142,5 +232,5 @@ class AsyncOpenAICompatClient(AsyncBaseLLMClient, ABC):
                 parameters=spec["parameters"],
                 strict=None,
             )
-            for spec in self.tool_registry.tool_spec.values()
+            for spec in tool_registry.tool_spec.values()
         ]
@@ -0,0 +1,114 @@
+"""Retrying transient provider failures with exponential backoff.
+
+Rate limits (429), connection failures and the provider's own 5xx/408/409
+errors are retried; anything else (bad key, unknown model, bad request)
+fails straight away. Each retry waits base_delay * 2**n, capped at
+max_delay, with jitter so clients that failed together don't retry together.
+When the provider says how long to wait (`Retry-After` / `retry-after-ms`),
+that wait is used instead. The sleeps are asyncio.sleep. max_total caps
+the whole call, attempts included, from the start of the first attempt:
+once the next sleep would end past it, the last error is raised.
+
+The provider SDK clients are created with their own retries turned off, so
+this is the only retry layer.
+"""
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from providers.errors.ProviderError import ConnectionError, ProviderError, RateLimitExceededError
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RETRIES: int = 2
+DEFAULT_BASE_DELAY: float = 0.5
+DEFAULT_MAX_DELAY: float = 8.0
+# Total seconds a call may take, attempts and waits between them included
+DEFAULT_MAX_TOTAL: float = 60.0
+
+# Status codes worth retrying besides 429, as the provider SDKs do
+RETRYABLE_STATUS: frozenset[int] = frozenset({408, 409})
+
+
+def is_transient(error: ProviderError) -> bool:
+    if isinstance(error, (RateLimitExceededError, ConnectionError)):
+        return True
+    status: int | None = getattr(error.original_error, "status_code", None)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+def retry_after(error: ProviderError) -> float | None:
+    """Seconds the provider asked us to wait, from the response's Retry-After headers."""
+    response = getattr(error.original_error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if "retry-after-ms" in headers:
+            return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+        value: str | None = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(when.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """How often and how patiently a client retries transient ProviderErrors."""
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        max_total: float = DEFAULT_MAX_TOTAL,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total = max_total
+
+    def backoff(self, failures: int, error: BaseException, elapsed: float) -> float | None:
+        """Seconds to wait before the next attempt, or None to give up and raise `error`.
+
+        `failures` counts the attempts that have failed so far and `elapsed`
+        is the time since the first one started.
+        """
+        if failures > self.max_retries or not isinstance(error, ProviderError) or not is_transient(error):
+            return None
+        delay: float | None = retry_after(error)
+        if delay is None:
+            cap: float = min(self.base_delay * 2 ** (failures - 1), self.max_delay)
+            delay = cap / 2 + random.uniform(0, cap / 2)
+        if elapsed + delay > self.max_total:
+            return None
+        return delay
+
+    async def call(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """Await `attempt()`, calling it again after transient failures."""
+        failures: int = 0
+        start: float = time.monotonic()
+        while True:
+            try:
+                return await attempt()
+            except ProviderError as e:
+                failures += 1
+                delay: float | None = self.backoff(failures, e, time.monotonic() - start)
+                if delay is None:
+                    raise
+                logger.info("Retrying in %.2fs after %s", delay, e)
+                await asyncio.sleep(delay)
+
+
+# For callers that handle failures themselves, e.g. the gateway's hedging
+NO_RETRY = RetryPolicy(max_retries=0)
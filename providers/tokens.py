@@ -0,0 +1,97 @@
+"""Token counting and the token-budgeted conversation window.
+
+Counts use tiktoken for models it knows (OpenAI's), provided the encoding
+is available locally or can be downloaded; every other model (Claude,
+llama, ...) gets `estimate_tokens`, which is close enough to budget with.
+Loading an encoding reads (and the first time downloads) its BPE file, so
+async code gets its counter from `atoken_counter`, which does that in a
+thread.
+
+`trim_history` keeps a conversation under a budget by dropping its oldest
+turns. A turn starts at a user message that is not a tool result and runs up
+to the next one, so a tool call is never separated from its result and the
+window always starts with a user message.
+"""
+import asyncio
+import json
+import math
+from functools import lru_cache
+from typing import Callable
+
+from providers.models import Conversation
+
+TokenCounter = Callable[[str], int]
+
+# Role markers and separators the provider adds around every message
+MESSAGE_OVERHEAD_TOKENS: int = 4
+# Distinct message texts whose counts are remembered per counter
+COUNT_CACHE_SIZE: int = 4096
+
+# How AsyncOpenAICompatClient records tool results in history
+TOOL_RESULT_PREFIX = "[Tool result: "
+
+# Counters atoken_counter has loaded, so later lookups skip the thread hop
+_loaded_counters: dict[str, TokenCounter] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """About four ASCII characters per token; anything else counts a token per character."""
+    ascii_chars: int = sum(1 for c in text if c < "\x80")
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+@lru_cache(maxsize=None)
+def token_counter(model: str) -> TokenCounter:
+    """The tokenizer for `model` if tiktoken has it, else `estimate_tokens`; counts are cached."""
+    count: TokenCounter = estimate_tokens
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(model)
+        count = lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:  # unknown model, or the encoding can't be downloaded
+        pass
+    return lru_cache(maxsize=COUNT_CACHE_SIZE)(count)
+
+
+async def atoken_counter(model: str) -> TokenCounter:
+    """token_counter(model), loading the encoding in a thread the first time so the event loop never waits on it."""
+    count: TokenCounter | None = _loaded_counters.get(model)
+    if count is None:
+        count = _loaded_counters[model] = await asyncio.to_thread(token_counter, model)
+    return count
+
+
+def message_tokens(message: Conversation, count: TokenCounter) -> int:
+    content: str = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    return count(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def is_tool_result(message: Conversation) -> bool:
+    if isinstance(message.content, str):
+        return message.content.startswith(TOOL_RESULT_PREFIX)
+    return any(isinstance(block, dict) and block.get("type") == "tool_result" for block in message.content)
+
+
+def trim_history(history: list[Conversation], budget: int, count: TokenCounter) -> int:
+    """Drop the oldest whole turns until `history` fits in `budget` tokens. Returns messages dropped.
+
+    The latest turn is always kept, even if it alone is over budget.
+    """
+    sizes: list[int] = [message_tokens(m, count) for m in history]
+    remaining: int = sum(sizes)
+    if remaining <= budget:
+        return 0
+    starts: list[int] = [i for i, m in enumerate(history) if m.role == "user" and not is_tool_result(m)]
+    if not starts:
+        return 0
+
+    cut: int = 0
+    for start in starts:
+        if start == 0:
+            continue
+        remaining -= sum(sizes[cut:start])
+        cut = start
+        if remaining <= budget:
+            break
+    del history[:cut]
+    return cut
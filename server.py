@@ -3,101 +3,130 @@
 Exposes an OpenAI-compatible /v1/chat/completions endpoint so other
 services (like restaurant-chat) can use this as their LLM gateway.
 
+By default requests are served by the asyncio gateway engine (one event
+loop, many concurrent requests). `--engine threaded` keeps the original
+single-threaded HTTPServer, which uses asyncio.new_event_loop() per request.
+
+The asyncio engine serves every restaurant under restaurants/ from one
+process (see gateway/GatewayServer.py for how a request picks its tenant);
+`--restaurant` only sets the default. The threaded engine serves just the
+`--restaurant` one.
+
 Usage:
-    uv run python server.py [--port 8100] [--model llama3.1:8b]
+    uv run python server.py [--port 8100] [--model llama3.1:8b] [--engine asyncio|threaded]
+                            [--restaurant <slug>] [--restaurant-cache-mb 64] [--context full|sections]
+                            [--cache-ttl 300] [--cache-mb 16] [--cache-db data/response_cache.db]
+                            [--max-concurrency 4] [--model-concurrency llama3.1:8b=2]
+                            [--max-queue 64] [--queue-timeout 30] [--workers N]
+                            [--session-ttl 1800] [--max-sessions 10000]
+                            [--batch-dir data/batches] [--batch-concurrency 4]
+                            [--hedge-model llama-3.1-8b-instant] [--hedge-delay SECONDS]
+                            [--max-body-mb 8] [--keep-alive-timeout 5] [--max-idle-connections 256]
+                            [--warmup-timeout 120] [--drain-timeout 10]
+
+`--workers N` forks N gateway processes sharing one listening socket under
+a supervisor that restarts them if they die. Each worker has its own cache,
+admission limits and metrics. Server-side sessions are turned off with
+--workers > 1: a follow-up turn can land on a worker that never saw the session.
+
+Before the "chat-client-toy gateway on ..." line is printed, the asyncio
+engine sends one short request to the model (and hedge model) so Ollama has
+it loaded. On SIGTERM/SIGINT it stops accepting connections and gives
+in-flight requests up to --drain-timeout seconds to finish.
 """
 
 import argparse
 import asyncio
 import json
-import uuid
+import signal
+import socket
+import sys
 from pathlib import Path
 from http.server import HTTPServer, BaseHTTPRequestHandler
+from gateway.GatewayServer import GatewayServer
+from gateway.HedgePolicy import HedgePolicy
+from gateway.AdmissionController import AdmissionController
+from gateway.BatchRunner import BatchRunner
+from gateway.Supervisor import SHUTDOWN_TIMEOUT, Supervisor, bind_socket, watch_supervisor
+from gateway.ResponseCache import ResponseCache
+from gateway.RestaurantRegistry import RestaurantRegistry
+from gateway.SessionStore import SessionStore
+from gateway.completions import completion_response, parse_chat_request
+from gateway.protocol import MAX_BODY_BYTES
 from providers.OllamaClient import AsyncOllamaClient
-# Note: server uses asyncio.new_event_loop() per request to call async client
-
 
-def load_restaurant(slug: str) -> dict:
-    """Load restaurant config and all .md files from restaurants/<slug>/"""
-    restaurant_dir = Path(__file__).parent / "restaurants" / slug
-    if not restaurant_dir.exists():
-        return {}
-    config = json.loads((restaurant_dir / "config.json").read_text())
-    # Load all markdown files as knowledge
-    docs = []
-    for md_file in sorted(restaurant_dir.glob("*.md")):
-        docs.append(md_file.read_text())
-    config["knowledge"] = "\n\n---\n\n".join(docs)
-    return config
+# The threaded engine serves one connection at a time, so a keep-alive client
+# holds it only this long between requests.
+LEGACY_KEEP_ALIVE_TIMEOUT: float = 1.0
+# Socket timeout for each read once a request has started (headers and body)
+LEGACY_REQUEST_TIMEOUT: float = 30.0
 
 
-def create_handler(model: str, restaurant: dict | None = None):
+def create_handler(model: str, restaurant: dict | None = None, retrieve=None, max_body_bytes: int = MAX_BODY_BYTES):
     class ChatHandler(BaseHTTPRequestHandler):
+        # Keep-alive: every response carries a Content-Length. The server is
+        # single-threaded, so idle connections are dropped quickly.
+        protocol_version = "HTTP/1.1"
+        timeout = LEGACY_KEEP_ALIVE_TIMEOUT
+        # Headers and body go out as separate writes; without this a reused
+        # connection waits on Nagle/delayed ACK for every response.
+        disable_nagle_algorithm = True
+
+        def handle_one_request(self):
+            # The short timeout only covers waiting for the next request line
+            self.connection.settimeout(LEGACY_KEEP_ALIVE_TIMEOUT)
+            super().handle_one_request()
+
+        def parse_request(self):
+            # A request has started, so a slow client gets the normal timeout for the rest of it
+            self.connection.settimeout(LEGACY_REQUEST_TIMEOUT)
+            return super().parse_request()
+
         def do_POST(self):
             if self.path != "/v1/chat/completions":
                 self.send_error(404)
                 return
 
-            content_length = int(self.headers.get("Content-Length", 0))
-            body = json.loads(self.rfile.read(content_length))
-
-            messages = body.get("messages", [])
-            req_model = body.get("model", model)
-
-            # Extract system prompt
-            system = ""
-            chat_messages = []
-            for msg in messages:
-                if msg["role"] == "system":
-                    system = msg["content"]
-                else:
-                    chat_messages.append(msg)
-
-            # Inject restaurant context if available
-            if restaurant:
-                system += f"\n\nRestaurant: {restaurant['name']}\nCuisine: {restaurant.get('cuisine', '')}\n\n{restaurant['knowledge']}"
+            try:
+                content_length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                content_length = -1
+            if content_length < 0 or "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+                self.send_error(400, "Content-Length required")
+                return
+            if content_length > max_body_bytes:
+                self.send_error(413, f"Request body over {max_body_bytes} bytes")
+                return
+            try:
+                body = json.loads(self.rfile.read(content_length))
+                chat = parse_chat_request(body, model, restaurant, retrieve)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                self.send_error(400, f"Malformed chat request: {e}")
+                return
 
             # Create a fresh client per request
             # Disable tools in restaurant mode — menu is in the system prompt
             from tools.tools import ToolRegistry
             tool_reg = ToolRegistry() if restaurant else None
-            kwargs = {"model": req_model, "instructions": system}
+            kwargs = {"model": chat.model, "instructions": chat.system}
             if tool_reg is not None:
                 kwargs["tool_registry"] = tool_reg
             client = AsyncOllamaClient(**kwargs)
+            client.conversation_history.extend(chat.history)
 
-            # Build conversation history from prior messages
-            from providers.models import Conversation
-            for msg in chat_messages[:-1]:
-                if msg["role"] in ("user", "assistant"):
-                    client.conversation_history.append(Conversation(role=msg["role"], content=msg["content"]))
-
-            # Generate response for the last user message
-            last_msg = chat_messages[-1]["content"] if chat_messages else ""
             loop = asyncio.new_event_loop()
             try:
-                reply = loop.run_until_complete(client.generate_response(last_msg))
+                reply = loop.run_until_complete(client.generate_response(chat.query))
             finally:
                 loop.close()
 
-            # Return OpenAI-compatible response
-            response = {
-                "id": f"chatcmpl-{uuid.uuid4().hex[:8]}",
-                "object": "chat.completion",
-                "model": req_model,
-                "choices": [
-                    {
-                        "index": 0,
-                        "message": {"role": "assistant", "content": reply},
-                        "finish_reason": "stop",
-                    }
-                ],
-            }
+            response = json.dumps(completion_response(chat.model, reply)).encode()
 
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
             self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.wfile.write(response)
 
         def log_message(self, format, *args):
             print(f"[chat-client-toy] {args[0]}")
@@ -105,20 +134,216 @@ def create_handler(model: str, restaurant: dict | None = None):
     return ChatHandler
 
 
+def create_cache(args: argparse.Namespace) -> ResponseCache | None:
+    if args.cache_ttl <= 0:
+        return None
+    store = None
+    if args.cache_db:
+        from database.connection import create_db
+        from database.repository.ResponseCacheRepository import ResponseCacheRepository
+        Path(args.cache_db).parent.mkdir(parents=True, exist_ok=True)
+        # Every --workers process shares the file
+        store = ResponseCacheRepository(create_db(args.cache_db, wal=True)())
+    cache = ResponseCache(ttl=args.cache_ttl, max_bytes=args.cache_mb * 1024 * 1024, store=store)
+    cache.purge_expired()
+    return cache
+
+
+def create_admission(args: argparse.Namespace) -> AdmissionController | None:
+    if args.max_concurrency <= 0:
+        return None
+    model_limits: dict[str, int] = {}
+    for spec in args.model_concurrency:
+        model, _, limit = spec.rpartition("=")
+        if not model or not limit.isdigit() or int(limit) < 1:
+            sys.exit(f"--model-concurrency expects MODEL=N, got {spec!r}")
+        model_limits[model] = int(limit)
+    return AdmissionController(
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        queue_timeout=args.queue_timeout,
+        model_limits=model_limits,
+    )
+
+
+def create_sessions(args: argparse.Namespace) -> SessionStore | None:
+    if args.session_ttl <= 0 or args.workers > 1:
+        return None
+    return SessionStore(ttl=args.session_ttl, max_sessions=args.max_sessions)
+
+
+def create_batches(args: argparse.Namespace) -> BatchRunner | None:
+    if args.batch_dir is None or args.batch_concurrency <= 0:
+        return None
+    return BatchRunner(root=args.batch_dir, concurrency=args.batch_concurrency)
+
+
+def create_hedge(args: argparse.Namespace) -> HedgePolicy | None:
+    if not args.hedge_model:
+        return None
+    return HedgePolicy(args.hedge_model, delay=args.hedge_delay)
+
+
+async def run_gateway(
+    args: argparse.Namespace, restaurants: RestaurantRegistry, sock: socket.socket | None = None
+) -> None:
+    gateway = GatewayServer(
+        args.model, args.restaurant, restaurants,
+        context=args.context, cache=create_cache(args), admission=create_admission(args),
+        sessions=create_sessions(args), batches=create_batches(args), hedge=create_hedge(args),
+        max_body_bytes=args.max_body_mb * 1024 * 1024, keep_alive_timeout=args.keep_alive_timeout,
+        max_idle_connections=args.max_idle_connections,
+    )
+    # With --workers the supervisor has already warmed the model up, and the
+    # banner is out, so a worker starts serving straight away
+    if args.warmup_timeout > 0 and sock is None:
+        await gateway.warm_up(args.warmup_timeout)
+    await gateway.start(args.host, args.port, sock=sock)
+    if sock is None:
+        print_banner(args, restaurants)
+    else:
+        watch_supervisor(asyncio.get_running_loop().call_later)
+    await serve_until_stopped(gateway, args.drain_timeout)
+
+
+async def serve_until_stopped(gateway: GatewayServer, drain_timeout: float) -> None:
+    """Serve until SIGTERM/SIGINT, then drain in-flight requests and close."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+        print(f"[chat-client-toy] draining (up to {drain_timeout:g}s)", flush=True)
+        if not await gateway.drain(drain_timeout):
+            print("[chat-client-toy] drain timed out; cut off the remaining requests", flush=True)
+    finally:
+        await gateway.close()
+
+
+async def warm_up_upstream(args: argparse.Namespace) -> None:
+    """With --workers: load the models once in the supervisor, before forking."""
+    gateway = GatewayServer(args.model, hedge=create_hedge(args))
+    try:
+        await gateway.warm_up(args.warmup_timeout)
+    finally:
+        await gateway.close()
+
+
+def run_workers(args: argparse.Namespace, restaurants: RestaurantRegistry) -> int:
+    sock = bind_socket(args.host, args.port)
+    if args.warmup_timeout > 0:
+        asyncio.run(warm_up_upstream(args))
+    # Workers drain for up to --drain-timeout after SIGTERM, then need a moment to close
+    supervisor = Supervisor(
+        args.workers, lambda: asyncio.run(run_gateway(args, restaurants, sock)),
+        shutdown_timeout=args.drain_timeout + SHUTDOWN_TIMEOUT,
+    )
+    print_banner(args, restaurants)
+    return supervisor.run()
+
+
+def print_banner(args: argparse.Namespace, restaurants: RestaurantRegistry) -> None:
+    print(f"   chat-client-toy gateway on http://localhost:{args.port}/v1/chat/completions", flush=True)
+    print(f"   Model: {args.model}", flush=True)
+    print(f"   Engine: {args.engine}" + (f" × {args.workers} workers" if args.workers > 1 else ""), flush=True)
+    print(f"   Context: {args.context}", flush=True)
+    if args.engine == "asyncio" and args.max_concurrency > 0:
+        print(f"   Admission: {args.max_concurrency} in flight per model, queue {args.max_queue}, "
+              f"{args.queue_timeout:g}s wait", flush=True)
+    if args.engine == "asyncio" and args.cache_ttl > 0:
+        print(f"   Cache: {args.cache_ttl:g}s TTL, {args.cache_mb}MB" + (f", persisted to {args.cache_db}" if args.cache_db else ""), flush=True)
+    if args.engine == "asyncio" and args.session_ttl > 0 and args.workers == 1:
+        print(f"   Sessions: {args.session_ttl:g}s idle TTL, up to {args.max_sessions}", flush=True)
+    if args.engine == "asyncio" and args.batch_dir is not None and args.batch_concurrency > 0:
+        print(f"   Batches: {args.batch_dir}, {args.batch_concurrency} at a time", flush=True)
+    if args.engine == "asyncio" and args.hedge_model:
+        delay: str = f"{args.hedge_delay:g}s" if args.hedge_delay is not None else "p95 latency"
+        print(f"   Hedge: {args.hedge_model} after {delay} or on connection errors", flush=True)
+    if args.restaurant:
+        print(f"   Restaurant: {restaurants.get(args.restaurant)['name']}", flush=True)
+    if args.engine == "asyncio":
+        print(f"   Restaurants: {', '.join(restaurants.slugs()) or '(none)'}", flush=True)
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=8100)
     parser.add_argument("--model", default="llama3.1:8b")
+    parser.add_argument("--host", default="0.0.0.0")
     parser.add_argument("--restaurant", default=None, help="Restaurant slug (folder name in restaurants/)")
+    parser.add_argument("--restaurant-cache-mb", type=int, default=64,
+                        help="Memory cap for loaded restaurant knowledge (asyncio engine)")
+    parser.add_argument("--context", default="full", choices=["full", "sections"],
+                        help="full: every restaurant .md file in the system prompt (default); "
+                             "sections: only the heading sections relevant to the question")
+    parser.add_argument("--cache-ttl", type=float, default=0,
+                        help="Seconds a cached restaurant reply stays valid, e.g. 300; 0 (default) disables the cache "
+                             "(asyncio engine)")
+    parser.add_argument("--cache-mb", type=int, default=16, help="Memory cap for cached replies")
+    parser.add_argument("--cache-db", default=None,
+                        help="SQLite file for a persistent cache tier that survives restarts")
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="Upstream requests in flight per model, e.g. 4; 0 (default) means unlimited, "
+                             "with no admission control (asyncio engine)")
+    parser.add_argument("--model-concurrency", action="append", default=[], metavar="MODEL=N",
+                        help="Per-model override of --max-concurrency (repeatable)")
+    parser.add_argument("--max-queue", type=int, default=64,
+                        help="Requests allowed to wait per model before answering 429")
+    parser.add_argument("--queue-timeout", type=float, default=30.0,
+                        help="Seconds a request may wait for a slot before answering 429")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Gateway processes sharing the port, restarted if they die (asyncio engine)")
+    parser.add_argument("--session-ttl", type=float, default=1800,
+                        help="Idle seconds before a server-side conversation session expires; 0 disables sessions")
+    parser.add_argument("--max-sessions", type=int, default=10_000,
+                        help="Sessions kept in memory; the least recently used go first")
+    parser.add_argument("--batch-dir", default=None,
+                        help="Where /v1/batches inputs, results and checkpoints are kept, e.g. data/batches; "
+                             "/v1/batches is off without it")
+    parser.add_argument("--batch-concurrency", type=int, default=4,
+                        help="Batch requests run at once per worker with --batch-dir; 0 disables /v1/batches")
+    parser.add_argument("--hedge-model", default=None,
+                        help="Secondary model (any provider) raced against slow or unreachable primary requests")
+    parser.add_argument("--hedge-delay", type=float, default=None,
+                        help="Seconds before hedging; default is the p95 of the primary's recent latencies")
+    parser.add_argument("--max-body-mb", type=int, default=8,
+                        help="Largest request body accepted; bigger ones get 413")
+    parser.add_argument("--keep-alive-timeout", type=float, default=5.0,
+                        help="Seconds an idle keep-alive connection stays open (asyncio engine)")
+    parser.add_argument("--max-idle-connections", type=int, default=256,
+                        help="Idle keep-alive connections held at once; beyond it responses close the connection")
+    parser.add_argument("--warmup-timeout", type=float, default=120.0,
+                        help="Seconds to wait for the startup request that loads the model; 0 skips warmup")
+    parser.add_argument("--drain-timeout", type=float, default=10.0,
+                        help="Seconds in-flight requests get to finish after SIGTERM (asyncio engine)")
+    parser.add_argument("--engine", default="asyncio", choices=["asyncio", "threaded"],
+                        help="asyncio: one event loop serving concurrent requests (default); "
+                             "threaded: legacy single-threaded HTTPServer")
     args = parser.parse_args()
 
-    restaurant = load_restaurant(args.restaurant) if args.restaurant else None
-    server = HTTPServer(("0.0.0.0", args.port), create_handler(args.model, restaurant))
-    print(f"   chat-client-toy gateway on http://localhost:{args.port}/v1/chat/completions", flush=True)
-    print(f"   Model: {args.model}", flush=True)
-    if restaurant:
-        print(f"   Restaurant: {restaurant['name']}", flush=True)
-    server.serve_forever()
+    restaurants = RestaurantRegistry(max_bytes=args.restaurant_cache_mb * 1024 * 1024)
+    if args.restaurant and not restaurants.exists(args.restaurant):
+        sys.exit(f"Unknown restaurant: {args.restaurant} (available: {', '.join(restaurants.slugs())})")
+
+    if args.workers > 1 and args.engine != "asyncio":
+        sys.exit("--workers needs the asyncio engine")
+
+    if args.engine == "threaded":
+        restaurant = restaurants.get(args.restaurant) if args.restaurant else None
+        retrieve = restaurants.retriever(args.restaurant) if restaurant and args.context == "sections" else None
+        server = HTTPServer((args.host, args.port), create_handler(args.model, restaurant, retrieve, args.max_body_mb * 1024 * 1024))
+        print_banner(args, restaurants)
+        server.serve_forever()
+        return
+
+    if args.workers > 1:
+        sys.exit(run_workers(args, restaurants))
+
+    try:
+        asyncio.run(run_gateway(args, restaurants))
+    except KeyboardInterrupt:  # Ctrl+C during warmup, before the drain handler is installed
+        pass
 
 
 if __name__ == "__main__":
@@ -157,7 +157,8 @@ Available chunks:
 Return the IDs of the {top_k} most relevant chunks as a JSON array."""
 
         try:
-            raw = (await self._client.generate_response(prompt)).strip()
+            # A fresh context per search: concurrent searches don't share history
+            raw = (await self._client.generate_response(prompt, self._client.new_context())).strip()
             chunk_ids = self._parse_chunk_id_list(raw, top_k)
 
         except Exception as e:
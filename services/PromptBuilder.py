@@ -19,6 +19,7 @@ Usage:
 """
 
 import os
+import re
 import json
 import yaml
 from datetime import datetime
@@ -46,6 +47,10 @@ MODE_SECTIONS = {
     "none":    set(),
 }
 
+# Sections that can change between requests of one chat (RAG results per query).
+# Everything before them is a stable prefix that providers can cache.
+VOLATILE_SECTIONS = {"memory"}
+
 PRICE_MAP = {
     "PRICE_LEVEL_FREE":           "Free",
     "PRICE_LEVEL_INEXPENSIVE":    "$",
@@ -262,3 +267,21 @@ class PromptBuilder:
         return remaining
 
 
+_SECTION_HEADER = re.compile(r"^## (" + "|".join(name.upper() for name in PRIORITY) + r")\n", re.MULTILINE)
+
+
+def split_sections(prompt: str) -> List[tuple]:
+    """
+    Split a prompt made by build() back into its (section name, text) blocks.
+
+    Text before the first section header, or a whole prompt that didn't come
+    from PromptBuilder, is returned as one block named "".
+    """
+    starts = [(m.start(), m.group(1).lower()) for m in _SECTION_HEADER.finditer(prompt)]
+    blocks = []
+    if not starts or starts[0][0] > 0:
+        blocks.append(("", prompt[:starts[0][0]] if starts else prompt))
+    for i, (start, name) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(prompt)
+        blocks.append((name, prompt[start:end]))
+    return blocks
@@ -0,0 +1,155 @@
+"""
+SectionIndex — heading-level lexical retrieval over markdown knowledge.
+
+Splits markdown documents into sections at their `#`/`##`/`###` headings and
+ranks sections against a question with BM25, so a prompt can carry only the
+parts of the knowledge that matter for that question. Unlike ChunkContext it
+needs no database and no ranking LLM call, so it is cheap enough to run on
+every gateway request.
+
+Usage:
+    index = SectionIndex.from_markdown(restaurant["knowledge"])
+    knowledge = index.render(index.search("is the butter chicken gluten free?"))
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+
+# Separator used when a restaurant's .md files are joined into one knowledge string
+DOCUMENT_SEPARATOR = "\n\n---\n\n"
+
+HEADING_PATTERN = re.compile(r"^(#{1,3})\s+(.+?)\s*$", re.MULTILINE)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "have", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or",
+    "the", "there", "this", "to", "what", "which", "with", "you", "your",
+}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens with stopwords dropped and plural 's' stripped."""
+    out: list[str] = []
+    for tok in TOKEN_PATTERN.findall(text.lower()):
+        if tok in STOPWORDS:
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        out.append(tok)
+    return out
+
+
+@dataclass
+class Section:
+    """One heading and the text under it, up to the next heading."""
+    doc: int
+    position: int
+    heading: str
+    text: str
+    terms: Counter = field(default_factory=Counter)
+    length: int = 0
+
+
+class SectionIndex:
+    """BM25 index over the heading sections of one or more markdown documents."""
+
+    def __init__(self, sections: list[Section], preambles: list[str]):
+        self.sections = sections
+        # Text before a document's first sub-heading (title, legends) — shown
+        # with any section of that document so tables stay readable
+        self.preambles = preambles
+        self._df: Counter = Counter()
+        for section in sections:
+            self._df.update(section.terms.keys())
+        self._avg_length = (sum(s.length for s in sections) / len(sections)) if sections else 0.0
+
+    @classmethod
+    def from_markdown(cls, knowledge: str) -> "SectionIndex":
+        """Build an index from a knowledge string of DOCUMENT_SEPARATOR-joined markdown files."""
+        sections: list[Section] = []
+        preambles: list[str] = []
+        for doc, text in enumerate(knowledge.split(DOCUMENT_SEPARATOR)):
+            matches = list(HEADING_PATTERN.finditer(text))
+            # A lone top-level title belongs to the preamble, not its own section
+            body_starts = [m for m in matches if len(m.group(1)) > 1] or matches[1:]
+            preamble_end = body_starts[0].start() if body_starts else len(text)
+            preambles.append(text[:preamble_end].strip())
+
+            for i, match in enumerate(body_starts):
+                end = body_starts[i + 1].start() if i + 1 < len(body_starts) else len(text)
+                section_text = text[match.start():end].strip()
+                terms = Counter(tokenize(section_text))
+                # Headings are the best summary a section has — count them twice
+                terms.update(tokenize(match.group(2)))
+                sections.append(Section(
+                    doc=doc,
+                    position=len(sections),
+                    heading=match.group(2),
+                    text=section_text,
+                    terms=terms,
+                    length=sum(terms.values()),
+                ))
+        return cls(sections, preambles)
+
+    def score(self, query_terms: list[str], section: Section) -> float:
+        n = len(self.sections)
+        total = 0.0
+        for term in set(query_terms):
+            tf = section.terms.get(term, 0)
+            if not tf:
+                continue
+            df = self._df[term]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            norm = K1 * (1 - B + B * section.length / self._avg_length)
+            total += idf * tf * (K1 + 1) / (tf + norm)
+        return total
+
+    def search(self, query: str, top_k: int = 4, max_chars: int = 8000) -> list[Section]:
+        """Return the most relevant sections, best first.
+
+        Args:
+            query: The user's question (or recent turns).
+            top_k: Maximum number of sections to return.
+            max_chars: Stop adding sections once their combined text exceeds this.
+        """
+        query_terms = tokenize(query)
+        if not query_terms:
+            return []
+
+        scored = [(self.score(query_terms, s), s) for s in self.sections]
+        ranked = sorted((pair for pair in scored if pair[0] > 0), key=lambda p: (-p[0], p[1].position))
+
+        results: list[Section] = []
+        used = 0
+        for _, section in ranked[:top_k]:
+            if results and used + len(section.text) > max_chars:
+                break
+            results.append(section)
+            used += len(section.text)
+        return results
+
+    def outline(self) -> str:
+        """Every section heading, so the model knows what else exists."""
+        return "\n".join(f"- {s.heading}" for s in self.sections)
+
+    def render(self, sections: list[Section]) -> str:
+        """Format selected sections as knowledge text, in document order."""
+        parts: list[str] = []
+        for doc in sorted({s.doc for s in sections}):
+            doc_sections = sorted((s for s in sections if s.doc == doc), key=lambda s: s.position)
+            parts.append("\n\n".join([self.preambles[doc], *(s.text for s in doc_sections)]).strip())
+
+        out = f"Sections available:\n{self.outline()}"
+        if parts:
+            out += "\n\nRelevant sections:\n\n" + DOCUMENT_SEPARATOR.join(parts)
+        else:
+            out += "\n\nNo section matched this question."
+        return out
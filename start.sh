@@ -1,29 +1,35 @@
 #!/bin/bash
 # Start chat-client-toy LLM gateway
 # Usage:
-#   ./start.sh                              → default model, no restaurant
+#   ./start.sh                              → default model, every restaurant in restaurants/
+#                                             (picked per request by path, X-Restaurant header or model@slug)
 #   ./start.sh llama3.2:3b                  → specific model
-#   ./start.sh llama3.1:8b 8100 delhi-darbar → model + port + restaurant
+#   ./start.sh llama3.1:8b 8100 delhi-darbar → model + port + default restaurant
+#   ./start.sh llama3.1:8b 8100 "" 4         → 4 worker processes on one port
 cd "$(dirname "$0")"
 
 MODEL="${1:-llama3.1:8b}"
 PORT="${2:-8100}"
 RESTAURANT="${3:-}"
+WORKERS="${4:-1}"
 
-# Kill existing instance
-[ -f server.pid ] && kill "$(cat server.pid)" 2>/dev/null
+# Stop existing instance (and wait for its workers to let go of the port)
+[ -f server.pid ] && ./stop.sh > /dev/null
 
-echo "$(date '+%Y-%m-%d %H:%M:%S') Starting chat-client-toy (model=$MODEL, port=$PORT)" | tee -a server.log
+echo "$(date '+%Y-%m-%d %H:%M:%S') Starting chat-client-toy (model=$MODEL, port=$PORT, workers=$WORKERS)" | tee -a server.log
 RESTAURANT_FLAG=""
 [ -n "$RESTAURANT" ] && RESTAURANT_FLAG="--restaurant $RESTAURANT"
-UV_INDEX_URL=https://pypi.org/simple/ PYTHONUNBUFFERED=1 uv run python server.py --model "$MODEL" --port "$PORT" $RESTAURANT_FLAG >> server.log 2>&1 &
+LOG_START=$(wc -l < server.log)
+UV_INDEX_URL=https://pypi.org/simple/ PYTHONUNBUFFERED=1 uv run python server.py --model "$MODEL" --port "$PORT" --workers "$WORKERS" $RESTAURANT_FLAG >> server.log 2>&1 &
 echo $! > server.pid
 echo "PID $(cat server.pid) — logs → server.log"
 
-# Wait for it to be ready
-for i in $(seq 1 10); do
+# Wait for it to be ready — the banner is printed once the model is warmed
+# up, which includes loading it into Ollama (up to --warmup-timeout, 120s)
+for i in $(seq 1 130); do
   sleep 1
-  if grep -q "chat-client-toy gateway" server.log 2>/dev/null && kill -0 "$(cat server.pid)" 2>/dev/null; then
+  kill -0 "$(cat server.pid)" 2>/dev/null || break
+  if tail -n +"$((LOG_START + 1))" server.log | grep -q "chat-client-toy gateway"; then
     echo ""
     echo "════════════════════════════════════════════════"
     echo "  🧠 chat-client-toy is live!"
@@ -1,10 +1,26 @@
 #!/bin/bash
 # Stop chat-client-toy gateway
+# SIGTERM lets in-flight requests finish (up to --drain-timeout, 10s) and,
+# with --workers, goes to the supervisor, which stops its workers before
+# exiting — so wait for it rather than returning straight away.
 cd "$(dirname "$0")"
 
 if [ -f server.pid ]; then
   PID=$(cat server.pid)
-  kill "$PID" 2>/dev/null && echo "Stopped chat-client-toy (PID $PID)" || echo "Process $PID not running"
+  if kill "$PID" 2>/dev/null; then
+    for i in $(seq 1 60); do
+      kill -0 "$PID" 2>/dev/null || break
+      sleep 0.5
+    done
+    if kill -0 "$PID" 2>/dev/null; then
+      kill -9 "$PID" 2>/dev/null
+      echo "Killed chat-client-toy (PID $PID) after 30s"
+    else
+      echo "Stopped chat-client-toy (PID $PID)"
+    fi
+  else
+    echo "Process $PID not running"
+  fi
   rm -f server.pid
 else
   echo "No server.pid found"
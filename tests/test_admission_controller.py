@@ -0,0 +1,214 @@
+"""
+Tests for gateway admission control (gateway/AdmissionController.py)
+
+Run with:
+    python -m pytest tests/test_admission_controller.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+
+from tests.test_gateway_server import _restores_env
+
+
+def test_limits_requests_in_flight():
+    """Test 1: never more than the model's limit in flight; other models are independent"""
+    from gateway.AdmissionController import AdmissionController
+
+    async def run():
+        admission = AdmissionController(max_concurrency=3, model_limits={"small": 1})
+        peak = {"big": 0, "small": 0}
+        active = {"big": 0, "small": 0}
+
+        async def call(model):
+            async with admission.admit(model):
+                active[model] += 1
+                peak[model] = max(peak[model], active[model])
+                await asyncio.sleep(0.01)
+                active[model] -= 1
+
+        await asyncio.gather(*[call("big") for _ in range(10)], *[call("small") for _ in range(4)])
+        return peak, admission
+
+    peak, admission = asyncio.run(run())
+    assert peak == {"big": 3, "small": 1}
+    assert admission.in_flight("big") == 0 and admission.queued("big") == 0
+    print("✅ Test 1 passed: per-model concurrency limit")
+
+
+def test_full_queue_rejects_immediately():
+    """Test 2: a full queue raises Overloaded with a Retry-After hint"""
+    from gateway.AdmissionController import AdmissionController, Overloaded
+
+    async def run():
+        admission = AdmissionController(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with admission.admit("m"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        try:
+            async with admission.admit("m"):
+                raise AssertionError("Should not be admitted")
+        except Overloaded as e:
+            error = e
+        release.set()
+        await asyncio.gather(*tasks)
+        return error, admission
+
+    error, admission = asyncio.run(run())
+    assert error.retry_after >= 1
+    assert admission.rejected == 1 and admission.in_flight("m") == 0
+    print("✅ Test 2 passed: 429 when the queue is full")
+
+
+def test_queue_deadline():
+    """Test 3: waiting longer than queue_timeout raises Overloaded and leaves the queue"""
+    from gateway.AdmissionController import AdmissionController, Overloaded
+
+    async def run():
+        admission = AdmissionController(max_concurrency=1, queue_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold():
+            async with admission.admit("m"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        try:
+            async with admission.admit("m"):
+                pass
+        except Overloaded as e:
+            error = e
+        queued_after = admission.queued("m")
+        release.set()
+        await holder
+        # The slot is free again once the holder is done
+        async with admission.admit("m"):
+            pass
+        return error, queued_after, admission
+
+    error, queued_after, admission = asyncio.run(run())
+    assert "Timed out" in str(error)
+    assert queued_after == 0 and admission.in_flight("m") == 0
+    print("✅ Test 3 passed: queue deadline")
+
+
+def test_waiters_are_served_round_robin_across_restaurants():
+    """Test 4: a busy restaurant's backlog doesn't starve a quieter one"""
+    from gateway.AdmissionController import AdmissionController
+
+    async def run():
+        admission = AdmissionController(max_concurrency=1)
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with admission.admit("m", "busy"):
+                await release.wait()
+
+        async def call(restaurant, n):
+            async with admission.admit("m", restaurant):
+                order.append(f"{restaurant}{n}")
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(call("busy", n)) for n in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("quiet", 0)))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return order
+
+    order = asyncio.run(run())
+    assert order.index("quiet0") == 1, order
+    assert [o for o in order if o.startswith("busy")] == ["busy0", "busy1", "busy2", "busy3"]
+    print("✅ Test 4 passed: restaurant fairness")
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    """Test 5: a client that disconnects while queued gives up its place"""
+    from gateway.AdmissionController import AdmissionController
+
+    async def run():
+        admission = AdmissionController(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with admission.admit("m"):
+                await release.wait()
+
+        async def wait_forever():
+            async with admission.admit("m"):
+                await asyncio.sleep(10)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(wait_forever())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await holder
+        await asyncio.wait_for(_admit_once(admission), 1)
+        return admission
+
+    admission = asyncio.run(run())
+    assert admission.in_flight("m") == 0 and admission.queued("m") == 0
+    print("✅ Test 5 passed: cancellation")
+
+
+async def _admit_once(admission):
+    async with admission.admit("m"):
+        pass
+
+
+@_restores_env
+def test_gateway_answers_429_with_retry_after():
+    """Test 6: requests beyond limit + queue get a fast 429 instead of a timeout"""
+    from gateway.AdmissionController import AdmissionController
+    from tests.test_gateway_server import _post
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+
+    async def run():
+        upstream = MockUpstream(latency_ms=300)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", admission=AdmissionController(max_concurrency=1, max_queue=1))
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        payload = {"messages": [{"role": "user", "content": "Hi"}]}
+        try:
+            return await asyncio.gather(*[_post(port, "/v1/chat/completions", payload) for _ in range(3)])
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    results = asyncio.run(run())
+    statuses = sorted(status for status, _, _ in results)
+    assert statuses == [200, 200, 429], statuses
+    status, headers, body = next(r for r in results if r[0] == 429)
+    assert int(headers["retry-after"]) >= 1
+    assert json.loads(body)["error"]["type"] == "rate_limit_error"
+    print("✅ Test 6 passed: 429 + Retry-After from the gateway")
+
+
+if __name__ == "__main__":
+    print("Running admission controller tests...\n")
+    test_limits_requests_in_flight()
+    test_full_queue_rejects_immediately()
+    test_queue_deadline()
+    test_waiters_are_served_round_robin_across_restaurants()
+    test_cancelled_waiter_does_not_leak_a_slot()
+    test_gateway_answers_429_with_retry_after()
+    print("\n🎉 All admission controller tests passed!")
@@ -0,0 +1,170 @@
+"""
+Tests for offline batch completions (gateway/BatchRunner.py, POST /v1/batches)
+
+Run with:
+    python -m pytest tests/test_batch_runner.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+from tests.test_gateway_server import _restores_env
+
+
+def _line(custom_id, content="Hi", **body):
+    return json.dumps({"custom_id": custom_id, "body": {"messages": [{"role": "user", "content": content}], **body}})
+
+
+def test_batch_file_validation():
+    """Test 1: bad lines are rejected with their line number"""
+    from gateway.BatchRunner import BatchError, parse_batch
+
+    assert parse_batch(f"{_line('a')}\n\n{_line('b')}\n".encode()) == [
+        ("a", {"messages": [{"role": "user", "content": "Hi"}]}),
+        ("b", {"messages": [{"role": "user", "content": "Hi"}]}),
+    ]
+    for data, message in (
+        (b"", "no requests"),
+        (b"{not json", "Line 1: invalid JSON"),
+        (f"{_line('a')}\n{_line('a')}".encode(), "Line 2: duplicate custom_id"),
+        (b'{"body": {}}', "custom_id"),
+        (json.dumps({"custom_id": "a", "url": "/v1/embeddings", "body": {}}).encode(), "only /v1/chat/completions"),
+    ):
+        try:
+            parse_batch(data)
+        except BatchError as e:
+            assert message in str(e), (message, str(e))
+        else:
+            raise AssertionError(f"{data!r} should have been rejected")
+    print("✅ Test 1 passed: batch file validation")
+
+
+def test_resume_skips_answered_lines():
+    """Test 2: a restarted batch only runs lines without a result and repairs a torn write"""
+    from gateway.BatchRunner import BatchRunner
+
+    ran = []
+
+    async def execute(batch_id, body, restaurant):
+        ran.append(body["messages"][0]["content"])
+        return 200, {"choices": [{"message": {"content": "ok"}}]}
+
+    async def run(root):
+        first = BatchRunner(root)
+        first.execute = execute
+        batch = first.submit("\n".join(_line(f"q{i}", f"question {i}") for i in range(5)).encode())
+        await first.close()  # stopped before any line ran
+        directory = Path(root) / batch["id"]
+        with open(directory / "output.jsonl", "w") as out:
+            out.write(json.dumps({"custom_id": "q0", "response": {"status_code": 200, "body": {}}, "error": None}) + "\n")
+            out.write(json.dumps({"custom_id": "q3", "response": {"status_code": 200, "body": {}}, "error": None}) + "\n")
+            out.write('{"custom_id": "q4", "resp')
+
+        second = BatchRunner(root)
+        second.execute = execute
+        assert second.resume() == [batch["id"]]
+        while second.status(batch["id"])["status"] != "completed":
+            await asyncio.sleep(0.01)
+        return second.status(batch["id"]), (directory / "output.jsonl").read_text()
+
+    with tempfile.TemporaryDirectory() as root:
+        status, output = asyncio.run(run(root))
+
+    assert sorted(ran) == ["question 1", "question 2", "question 4"]
+    assert status["request_counts"] == {"total": 5, "completed": 5, "failed": 0}
+    assert sorted(json.loads(line)["custom_id"] for line in output.splitlines()) == ["q0", "q1", "q2", "q3", "q4"]
+    print("✅ Test 2 passed: resume from checkpoint")
+
+
+@_restores_env
+def test_gateway_batch_endpoint():
+    """Test 3: submit, poll and download a batch through the gateway"""
+    from bench.mock_upstream import DEFAULT_REPLY, MockUpstream
+    from gateway.BatchRunner import BatchRunner
+    from gateway.GatewayServer import GatewayServer
+    from tests.test_gateway_server import _post
+    from tests.test_metrics import _get
+
+    async def run(root):
+        upstream = MockUpstream(latency_ms=5)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", batches=BatchRunner(root, concurrency=2))
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        lines = [_line(f"q{i}") for i in range(6)] + [json.dumps({"custom_id": "bad", "body": {"messages": "nope"}})]
+        try:
+            status, _, body = await _post(port, "/v1/batches", "\n".join(lines).encode())
+            assert status == 200, body
+            batch = json.loads(body)
+            for _ in range(200):
+                _, _, polled = await _get(port, f"/v1/batches/{batch['id']}")
+                if json.loads(polled)["status"] == "completed":
+                    break
+                await asyncio.sleep(0.05)
+            _, _, output = await _get(port, f"/v1/batches/{batch['id']}/output")
+            rejected = await _post(port, "/v1/batches", b"{oops")
+            unknown = await _get(port, "/v1/batches/batch_0000000000000000")
+            return batch, json.loads(polled), output, rejected, unknown, upstream.requests_served
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    with tempfile.TemporaryDirectory() as root:
+        batch, polled, output, rejected, unknown, served = asyncio.run(run(root))
+
+    assert batch["object"] == "batch" and batch["request_counts"]["total"] == 7
+    assert polled["request_counts"] == {"total": 7, "completed": 6, "failed": 1}
+    results = {r["custom_id"]: r for r in map(json.loads, output.splitlines())}
+    assert results["q0"]["response"]["body"]["choices"][0]["message"]["content"] == DEFAULT_REPLY
+    assert results["bad"]["response"]["status_code"] == 400 and results["bad"]["error"]
+    assert served == 6
+    assert rejected[0] == 400 and b"Line 1" in rejected[2]
+    assert unknown[0] == 404
+    print("✅ Test 3 passed: gateway batches")
+
+
+def test_resume_marks_unreadable_batches_failed():
+    """Test 4: a corrupt input file fails its own batch and the others still resume"""
+    from gateway.BatchRunner import BatchRunner
+
+    async def execute(batch_id, body, restaurant):
+        return 200, {"choices": [{"message": {"content": "ok"}}]}
+
+    async def run(root):
+        first = BatchRunner(root)
+        first.execute = execute
+        good = first.submit(_line("q0").encode())
+        bad = first.submit(_line("q0").encode())
+        await first.close()
+        (Path(root) / bad["id"] / "input.jsonl").write_bytes(b'{"custom_id": "q0", "bo')
+
+        second = BatchRunner(root)
+        second.execute = execute
+        resumed = second.resume()
+        while second.status(good["id"])["status"] != "completed":
+            await asyncio.sleep(0.01)
+        return good["id"], resumed, second.status(bad["id"])
+
+    with tempfile.TemporaryDirectory() as root:
+        good_id, resumed, bad_status = asyncio.run(run(root))
+
+    assert resumed == [good_id]
+    assert bad_status["status"] == "failed" and bad_status["completed_at"] is not None
+    assert "invalid JSON" in bad_status["errors"]["data"][0]["message"]
+    print("✅ Test 4 passed: unreadable batches fail on resume")
+
+
+if __name__ == "__main__":
+    print("Running batch runner tests...\n")
+    test_batch_file_validation()
+    test_resume_skips_answered_lines()
+    test_gateway_batch_endpoint()
+    test_resume_marks_unreadable_batches_failed()
+    print("\n🎉 All batch runner tests passed!")
@@ -0,0 +1,105 @@
+"""
+Tests for per-call conversation state (CallContext) on one shared client
+
+Run with:
+    python -m pytest tests/test_call_context.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+from tests.test_gateway_server import _restores_env
+
+
+def _serve(upstream, chain=False):
+    """An AsyncOllamaClient for `upstream`, recording the kwargs of every request it sends."""
+    from providers.OllamaClient import AsyncOllamaClient
+    from tools.tools import ToolRegistry
+
+    client = AsyncOllamaClient(model="m", instructions="", tool_registry=ToolRegistry())
+    client.chain_responses = chain
+    sent = []
+    create = client.client.responses.create
+
+    async def recording_create(**kwargs):
+        sent.append(kwargs)
+        return await create(**kwargs)
+
+    client.client.responses.create = recording_create
+    return client, sent
+
+
+@_restores_env
+def test_concurrent_conversations_on_one_client():
+    """Test 1: overlapping conversations on one client keep their own history and usage"""
+    from bench.mock_upstream import MockUpstream
+
+    async def run():
+        upstream = MockUpstream(latency_ms=20)
+        server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        client, sent = _serve(upstream)
+        try:
+            contexts = [client.new_context() for _ in range(4)]
+
+            async def chat(i, context):
+                await client.generate_response(f"c{i} first", context)
+                async for _ in client.stream_response(f"c{i} second", context):
+                    pass
+
+            await asyncio.gather(*(chat(i, context) for i, context in enumerate(contexts)))
+            return upstream, client, contexts, sent
+        finally:
+            server.close()
+            await client.client.close()
+
+    upstream, client, contexts, sent = asyncio.run(run())
+    for i, context in enumerate(contexts):
+        assert [m.content for m in context.history] == [
+            f"c{i} first", upstream.reply, f"c{i} second", upstream.reply,
+        ]
+        assert context.usage.input_tokens == 100
+    for request in sent:
+        owners = {m["content"][:2] for m in request["input"] if m["role"] == "user"}
+        assert len(owners) == 1, f"Request mixes conversations: {owners}"
+    assert client.conversation_history == [] and client.usage.input_tokens == 0
+    print("✅ Test 1 passed: concurrent conversations stay separate")
+
+
+@_restores_env
+def test_response_chains_are_per_context():
+    """Test 2: with chain_responses, each context continues its own previous response"""
+    from bench.mock_upstream import MockUpstream
+
+    async def run():
+        upstream = MockUpstream(latency_ms=20)
+        server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        client, sent = _serve(upstream, chain=True)
+        try:
+            contexts = [client.new_context() for _ in range(3)]
+            await asyncio.gather(*(client.generate_response(f"c{i} one", c) for i, c in enumerate(contexts)))
+            first_ids = [context.chain_id for context in contexts]
+            await asyncio.gather(*(client.generate_response(f"c{i} two", c) for i, c in enumerate(contexts)))
+            return first_ids, sent
+        finally:
+            server.close()
+            await client.client.close()
+
+    first_ids, sent = asyncio.run(run())
+    assert len(set(first_ids)) == 3
+    assert len(sent) == 6
+    for request in sent[3:]:
+        i = int(request["input"][0]["content"][1])
+        assert request["input"] == [{"role": "user", "content": f"c{i} two"}]
+        assert request["previous_response_id"] == first_ids[i], "Each conversation continues its own response"
+    print("✅ Test 2 passed: per-context response chains")
+
+
+if __name__ == "__main__":
+    print("Running call context tests...\n")
+    test_concurrent_conversations_on_one_client()
+    test_response_chains_are_per_context()
+    print("\n🎉 All call context tests passed!")
@@ -0,0 +1,99 @@
+"""
+Tests for the gateway client pool (gateway/ClientPool.py)
+
+Run with:
+    python -m pytest tests/test_client_pool.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+from tests.test_gateway_server import _restores_env
+
+
+def _pool():
+    from gateway.ClientPool import ClientPool
+    from tools.tools import ToolRegistry
+
+    os.environ.setdefault("OLLAMA_BASE_URL", "http://127.0.0.1:9/v1")
+    return ClientPool(tool_registry=ToolRegistry())
+
+
+@_restores_env
+def test_lease_primes_and_resets_state():
+    """Test 1: a lease's context carries the request's prompt/history and leaves the client untouched"""
+    from providers.models import Conversation
+    from tools.tools import ToolRegistry
+
+    async def run():
+        pool = _pool()
+        history = [Conversation(role="user", content="Hi"), Conversation(role="assistant", content="Hello")]
+        tools = ToolRegistry()
+        async with pool.lease("llama3.1:8b", "Be brief.", history, tools) as (client, context):
+            assert context.instructions == "Be brief." and context.tool_registry is tools
+            assert client._instructions(context) == "Be brief." and client._tool_registry(context) is tools
+            assert [c.content for c in context.history] == ["Hi", "Hello"]
+            context.history.append(Conversation(role="user", content="Menu?"))
+        assert client.instructions == "" and client.tool_registry is pool.tool_registry
+        assert client.conversation_history == []
+        assert len(history) == 2, "Caller's history list must not be mutated"
+        async with pool.lease("llama3.1:8b", "") as (_, fresh):
+            assert fresh.history == [] and fresh is not context
+        await pool.close()
+
+    asyncio.run(run())
+    print("✅ Test 1 passed: lease primes and resets state")
+
+
+@_restores_env
+def test_clients_are_reused_and_share_one_sdk_client():
+    """Test 2: sequential and concurrent leases share one client per model, each with its own context"""
+    async def run():
+        pool = _pool()
+        async with pool.lease("llama3.1:8b", "") as (first, _):
+            pass
+        async with pool.lease("llama3.1:8b", "") as (second, _):
+            pass
+        assert first is second
+        assert pool.created == 1
+
+        async with pool.lease("llama3.1:8b", "A") as (a, ca), pool.lease("llama3.1:8b", "B") as (b, cb):
+            assert a is b
+            assert ca is not cb and (ca.instructions, cb.instructions) == ("A", "B")
+        assert pool.created == 1
+
+        async with pool.lease("llama3.2:3b", "") as (other, _):
+            assert other.client is not a.client, "Each model gets its own SDK client"
+        assert pool.created == 2 and pool.leased == 5
+        await pool.close()
+
+    asyncio.run(run())
+    print("✅ Test 2 passed: one client per model, separate contexts")
+
+
+@_restores_env
+def test_gateway_reuses_upstream_connections():
+    """Test 3: many gateway requests ride a handful of keep-alive upstream connections"""
+    from tests.test_gateway_server import _post, _with_gateway
+
+    async def run(port, upstream):
+        payload = {"messages": [{"role": "user", "content": "Hi"}]}
+        for _ in range(10):
+            status, _, _ = await _post(port, "/v1/chat/completions", payload)
+            assert status == 200
+        return upstream.connections_opened, upstream.requests_served
+
+    connections, served = asyncio.run(_with_gateway(run, latency_ms=5))
+    assert served == 10
+    assert connections == 1, f"Expected one reused upstream connection, got {connections}"
+    print("✅ Test 3 passed: upstream keep-alive reuse")
+
+
+if __name__ == "__main__":
+    print("Running client pool tests...\n")
+    test_lease_primes_and_resets_state()
+    test_clients_are_reused_and_share_one_sdk_client()
+    test_gateway_reuses_upstream_connections()
+    print("\n🎉 All client pool tests passed!")
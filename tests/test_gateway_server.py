@@ -0,0 +1,461 @@
+"""
+Tests for the asyncio gateway engine (gateway/GatewayServer.py)
+
+Runs the gateway and a mock OpenAI-compatible upstream on one event loop.
+
+Run with:
+    python -m pytest tests/test_gateway_server.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import functools
+import json
+import time
+
+
+async def _post(port, path, payload, headers=None):
+    """Send one HTTP/1.1 request and return (status, headers, body bytes)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    head = f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n"
+    for name, value in (headers or {}).items():
+        head += f"{name}: {value}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head_bytes, _, resp_body = raw.partition(b"\r\n\r\n")
+    lines = head_bytes.decode().split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    resp_headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:])}
+    return status, resp_headers, resp_body
+
+
+async def _stream(port, payload):
+    """POST a streaming request; return (status, [(seconds since send, data), ...])."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode()
+    start = time.monotonic()
+    writer.write(f"POST /v1/chat/completions HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.readuntil(b"\r\n\r\n")
+    events = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if line.startswith(b"data: "):
+            events.append((time.monotonic() - start, line[6:].strip().decode()))
+    writer.close()
+    return int(status_line.split()[1]), events
+
+
+# Environment variables tests point at their mock upstreams
+_UPSTREAM_ENV = ("OLLAMA_BASE_URL", "GROQ_BASE_URL", "GROQ_API_KEY")
+
+
+def _restores_env(test):
+    """Put the upstream environment variables back after `test`, so no test leaks them into the next."""
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        saved = {name: os.environ.get(name) for name in _UPSTREAM_ENV}
+        try:
+            return test(*args, **kwargs)
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    return wrapper
+
+
+async def _with_gateway(test, latency_ms=50, restaurant=None, token_ms=0):
+    """Start mock upstream + gateway, run `test(port, upstream)`, then shut both down."""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+
+    upstream = MockUpstream(latency_ms=latency_ms, token_ms=token_ms)
+    upstream_server = await upstream.start()
+    upstream_port = upstream_server.sockets[0].getsockname()[1]
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_port}/v1"
+
+    gateway = GatewayServer("llama3.1:8b", restaurant)
+    server = await gateway.start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        return await test(port, upstream)
+    finally:
+        server.close()
+        upstream_server.close()
+
+
+def test_parse_chat_request_splits_system_history_and_query():
+    """Test 1: parse_chat_request keeps the legacy request semantics"""
+    from gateway.completions import parse_chat_request
+
+    chat = parse_chat_request(
+        {
+            "model": "llama3.2:3b",
+            "messages": [
+                {"role": "system", "content": "Be brief."},
+                {"role": "user", "content": "Hi"},
+                {"role": "assistant", "content": "Hello!"},
+                {"role": "user", "content": "Opening hours?"},
+            ],
+        },
+        default_model="llama3.1:8b",
+        restaurant={"name": "Delhi Darbar", "knowledge": "# Menu"},
+    )
+    assert chat.model == "llama3.2:3b"
+    assert chat.system.startswith("Be brief.")
+    assert "Restaurant: Delhi Darbar" in chat.system and "# Menu" in chat.system
+    assert [(c.role, c.content) for c in chat.history] == [("user", "Hi"), ("assistant", "Hello!")]
+    assert chat.query == "Opening hours?"
+    print("✅ Test 1 passed: request parsing")
+
+
+@_restores_env
+def test_chat_completion_response_shape():
+    """Test 2: /v1/chat/completions returns an OpenAI chat.completion body"""
+    async def run(port, upstream):
+        return await _post(port, "/v1/chat/completions", {"messages": [{"role": "user", "content": "Hi"}]})
+
+    status, headers, body = asyncio.run(_with_gateway(run))
+    data = json.loads(body)
+    assert status == 200
+    assert headers["content-type"] == "application/json"
+    assert data["object"] == "chat.completion"
+    assert data["model"] == "llama3.1:8b"
+    assert data["id"].startswith("chatcmpl-")
+    assert data["choices"][0]["message"]["role"] == "assistant"
+    assert "Namaste" in data["choices"][0]["message"]["content"]
+    assert data["choices"][0]["finish_reason"] == "stop"
+    print("✅ Test 2 passed: response shape")
+
+
+@_restores_env
+def test_requests_are_served_concurrently():
+    """Test 3: slow upstream calls overlap instead of queueing behind each other"""
+    async def run(port, upstream):
+        payload = {"messages": [{"role": "user", "content": "Hi"}]}
+        start = time.monotonic()
+        results = await asyncio.gather(*[_post(port, "/v1/chat/completions", payload) for _ in range(8)])
+        return time.monotonic() - start, results
+
+    elapsed, results = asyncio.run(_with_gateway(run, latency_ms=300))
+    assert all(status == 200 for status, _, _ in results)
+    # Serially this would take 8 × 300ms = 2.4s
+    assert elapsed < 1.5, f"8 concurrent requests took {elapsed:.2f}s"
+    print("✅ Test 3 passed: concurrent requests")
+
+
+@_restores_env
+def test_unknown_path_and_bad_json():
+    """Test 4: errors come back as JSON with the right status"""
+    async def run(port, upstream):
+        missing = await _post(port, "/v1/embeddings", {})
+        bad = await _post(port, "/v1/chat/completions", b"{not json")
+        return missing, bad
+
+    missing, bad = asyncio.run(_with_gateway(run))
+    assert missing[0] == 404 and "error" in json.loads(missing[2])
+    assert bad[0] == 400 and "Invalid JSON" in json.loads(bad[2])["error"]["message"]
+    print("✅ Test 4 passed: error responses")
+
+
+@_restores_env
+def test_stream_sends_chat_completion_chunks():
+    """Test 5: "stream": true returns chat.completion.chunk events ending in [DONE]"""
+    async def run(port, upstream):
+        return await _stream(port, {"stream": True, "messages": [{"role": "user", "content": "Hi"}]})
+
+    status, events = asyncio.run(_with_gateway(run))
+    assert status == 200
+    assert events[-1][1] == "[DONE]"
+    chunks = [json.loads(data) for _, data in events[:-1]]
+    assert all(c["object"] == "chat.completion.chunk" for c in chunks)
+    assert len({c["id"] for c in chunks}) == 1
+    assert chunks[0]["choices"][0]["delta"]["role"] == "assistant"
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+    text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+    assert text == "Namaste! We are open from 12pm to 10pm every day."
+    assert len(chunks) > 3, "Reply should arrive as several deltas"
+    print("✅ Test 5 passed: SSE chunk stream")
+
+
+@_restores_env
+def test_stream_first_token_arrives_before_generation_finishes():
+    """Test 6: time-to-first-token is the first delta, not the whole generation"""
+    async def run(port, upstream):
+        return await _stream(port, {"stream": True, "messages": [{"role": "user", "content": "Hi"}]})
+
+    # 11 tokens × 100ms ≈ 1s of generation after a 50ms first-token latency
+    status, events = asyncio.run(_with_gateway(run, latency_ms=50, token_ms=100))
+    content_times = [t for t, data in events[:-1] if json.loads(data)["choices"][0]["delta"].get("content")]
+    assert content_times[0] < 0.6, f"First token after {content_times[0]:.2f}s"
+    assert content_times[-1] - content_times[0] > 0.5, "Deltas should be relayed as they arrive"
+    print("✅ Test 6 passed: streaming time-to-first-token")
+
+
+async def _read_response(reader):
+    """Read one Content-Length or chunked response; return (status, headers, body bytes)."""
+    head = (await reader.readuntil(b"\r\n\r\n")).decode()
+    lines = head.split("\r\n")
+    headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+    if headers.get("transfer-encoding") == "chunked":
+        body = b""
+        while size := int((await reader.readuntil(b"\r\n")).strip(), 16):
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+        await reader.readexactly(2)
+    else:
+        body = await reader.readexactly(int(headers["content-length"]))
+    return int(lines[0].split()[1]), headers, body
+
+
+def _request(path, payload, extra=""):
+    body = json.dumps(payload).encode()
+    return f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n{extra}\r\n".encode() + body
+
+
+@_restores_env
+def test_keep_alive_and_pipelining():
+    """Test 7: several requests, pipelined and streamed, share one connection"""
+    async def run(port, upstream):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        payload = {"messages": [{"role": "user", "content": "Hi"}]}
+        # Two pipelined requests in one write, then a streamed one, then a closing one
+        writer.write(_request("/v1/chat/completions", payload) + _request("/v1/embeddings", payload))
+        first, second = await _read_response(reader), await _read_response(reader)
+        writer.write(_request("/v1/chat/completions", {**payload, "stream": True}))
+        streamed = await _read_response(reader)
+        writer.write(_request("/v1/chat/completions", payload, "Connection: close\r\n"))
+        last = await _read_response(reader)
+        closed = await reader.read() == b""
+        writer.close()
+        return first, second, streamed, last, closed, upstream.requests_served
+
+    first, second, streamed, last, closed, served = asyncio.run(_with_gateway(run, latency_ms=0))
+    assert first[0] == 200 and first[1]["connection"] == "keep-alive"
+    assert second[0] == 404 and second[1]["connection"] == "keep-alive"
+    assert streamed[0] == 200 and streamed[1]["transfer-encoding"] == "chunked"
+    assert streamed[2].endswith(b"data: [DONE]\n\n")
+    assert last[0] == 200 and last[1]["connection"] == "close" and closed
+    assert served == 3
+    print("✅ Test 7 passed: keep-alive and pipelining")
+
+
+@_restores_env
+def test_body_limits_and_chunked_requests():
+    """Test 8: oversized bodies get 413; chunked request bodies are accepted"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+
+    async def run():
+        upstream = MockUpstream(latency_ms=0)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", max_body_bytes=1024, keep_alive_timeout=0.2)
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            too_big = await _post(port, "/v1/chat/completions", {"messages": [{"role": "user", "content": "x" * 2000}]})
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = json.dumps({"messages": [{"role": "user", "content": "Hi"}]}).encode()
+            writer.write(b"POST /v1/chat/completions HTTP/1.1\r\nHost: localhost\r\nTransfer-Encoding: chunked\r\n\r\n"
+                         + f"{10:x}\r\n".encode() + body[:10] + b"\r\n"
+                         + f"{len(body) - 10:x}\r\n".encode() + body[10:] + b"\r\n0\r\n\r\n")
+            chunked = await _read_response(reader)
+            start = time.monotonic()
+            idle_closed = await reader.read() == b""
+            idle_for = time.monotonic() - start
+            writer.close()
+            return too_big, chunked, idle_closed, idle_for
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    too_big, chunked, idle_closed, idle_for = asyncio.run(run())
+    assert too_big[0] == 413
+    assert chunked[0] == 200 and "Namaste" in json.loads(chunked[2])["choices"][0]["message"]["content"]
+    assert idle_closed and idle_for < 2, "Idle keep-alive connections are closed after the timeout"
+    print("✅ Test 8 passed: body limits and chunked requests")
+
+
+@_restores_env
+def test_warm_up_and_graceful_drain():
+    """Test 9: warm_up primes the pool; drain finishes in-flight requests and closes idle connections"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+
+    async def run():
+        upstream = MockUpstream(latency_ms=300)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b")
+        try:
+            await gateway.warm_up(timeout=5)
+            warmed = upstream.requests_served, gateway.pool.created
+            server = await gateway.start("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+
+            idle_reader, idle_writer = await asyncio.open_connection("127.0.0.1", port)
+            in_flight = asyncio.create_task(_post(port, "/v1/chat/completions", {"messages": [{"role": "user", "content": "Hi"}]}))
+            await asyncio.sleep(0.1)
+            drained = await gateway.drain(timeout=5)
+            idle_closed = await idle_reader.read() == b""
+            idle_writer.close()
+            try:
+                await asyncio.open_connection("127.0.0.1", port)
+                refused = False
+            except OSError:
+                refused = True
+            return warmed, drained, await in_flight, idle_closed, refused
+        finally:
+            upstream_server.close()
+            await gateway.close()
+
+    (served, created), drained, (status, headers, body), idle_closed, refused = asyncio.run(run())
+    assert served == 1 and created == 1, "Warmup sends one request and leaves a client in the pool"
+    assert drained
+    assert status == 200 and "Namaste" in json.loads(body)["choices"][0]["message"]["content"]
+    assert idle_closed and refused
+    print("✅ Test 9 passed: warmup and graceful drain")
+
+
+@_restores_env
+def test_warm_up_failure_and_drain_deadline():
+    """Test 10: an unreachable upstream does not stop startup; drain cuts off requests past its deadline"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+
+    async def run():
+        os.environ["OLLAMA_BASE_URL"] = "http://127.0.0.1:9/v1"
+        gateway = GatewayServer("llama3.1:8b")
+        await gateway.warm_up(timeout=5)
+        await gateway.close()
+
+        upstream = MockUpstream(latency_ms=5000)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b")
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(_request("/v1/chat/completions", {"messages": [{"role": "user", "content": "Hi"}]}))
+            await asyncio.sleep(0.1)
+            start = time.monotonic()
+            drained = await gateway.drain(timeout=0.2)
+            elapsed = time.monotonic() - start
+            cut_off = await reader.read()
+            writer.close()
+            return drained, elapsed, cut_off
+        finally:
+            upstream_server.close()
+            await gateway.close()
+
+    drained, elapsed, cut_off = asyncio.run(run())
+    assert not drained and elapsed < 2
+    assert cut_off == b"", "The cut-off request's connection is closed without a reply"
+    print("✅ Test 10 passed: warmup failure and drain deadline")
+
+
+
+@_restores_env
+def test_drain_closes_in_flight_keep_alive_connections():
+    """Test 11: a keep-alive request in flight when drain starts is answered with Connection: close"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+
+    async def run():
+        upstream = MockUpstream(latency_ms=300)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b")
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(_request("/v1/chat/completions", {"messages": [{"role": "user", "content": "Hi"}]}))
+            await asyncio.sleep(0.1)
+            drained = await gateway.drain(timeout=5)
+            raw = await reader.read()
+            writer.close()
+            return drained, raw
+        finally:
+            upstream_server.close()
+            await gateway.close()
+
+    drained, raw = asyncio.run(run())
+    head = raw.partition(b"\r\n\r\n")[0].decode().lower()
+    assert drained and head.startswith("http/1.1 200")
+    assert "connection: close" in head, head
+    print("✅ Test 11 passed: drain closes in-flight keep-alive connections")
+
+
+def test_chunked_trailers_count_against_the_body_limit():
+    """Test 12: trailer fields after the last chunk can't exceed max_body"""
+    from gateway.protocol import ProtocolError, read_request
+
+    async def read(trailers):
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"POST /v1/chat/completions HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                         b"2\r\n{}\r\n0\r\n" + trailers + b"\r\n")
+        reader.feed_eof()
+        try:
+            return await read_request(reader, max_body=64)
+        except ProtocolError as e:
+            return e.status
+
+    assert asyncio.run(read(b"X-Checksum: abc\r\n")).body == b"{}"
+    assert asyncio.run(read(b"X-Pad: padding\r\n" * 10)) == 413
+    print("✅ Test 12 passed: chunked trailer limit")
+
+
+def test_threaded_engine_waits_for_a_slow_body():
+    """Test 13: the threaded engine's short keep-alive timeout doesn't cut off a body that is still arriving"""
+    import socket
+    import threading
+    from http.server import HTTPServer
+    from server import LEGACY_KEEP_ALIVE_TIMEOUT, create_handler
+
+    httpd = HTTPServer(("127.0.0.1", 0), create_handler("llama3.1:8b"))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with socket.create_connection(httpd.server_address, timeout=10) as sock:
+            sock.sendall(b"POST /v1/chat/completions HTTP/1.1\r\nHost: localhost\r\nContent-Length: 8\r\n\r\nnot")
+            time.sleep(LEGACY_KEEP_ALIVE_TIMEOUT + 0.5)
+            sock.sendall(b" json")
+            status_line = sock.makefile("rb").readline()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert status_line.split()[1] == b"400", status_line
+    print("✅ Test 13 passed: slow request bodies")
+
+
+if __name__ == "__main__":
+    print("Running gateway server tests...\n")
+    test_parse_chat_request_splits_system_history_and_query()
+    test_chat_completion_response_shape()
+    test_requests_are_served_concurrently()
+    test_unknown_path_and_bad_json()
+    test_stream_sends_chat_completion_chunks()
+    test_stream_first_token_arrives_before_generation_finishes()
+    test_keep_alive_and_pipelining()
+    test_body_limits_and_chunked_requests()
+    test_warm_up_and_graceful_drain()
+    test_warm_up_failure_and_drain_deadline()
+    test_drain_closes_in_flight_keep_alive_connections()
+    test_chunked_trailers_count_against_the_body_limit()
+    test_threaded_engine_waits_for_a_slow_body()
+    print("\n🎉 All gateway server tests passed!")
@@ -0,0 +1,187 @@
+"""
+Tests for hedged and failover upstream requests (gateway/HedgePolicy.py)
+
+Run with:
+    python -m pytest tests/test_hedge_policy.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import socket
+import time
+
+from tests.test_gateway_server import _restores_env
+
+
+def test_delay_tracks_p95():
+    """Test 1: initial delay until enough samples, then the p95 of recent latencies"""
+    from gateway.HedgePolicy import MIN_SAMPLES, HedgePolicy
+
+    policy = HedgePolicy("backup", initial_delay=2.0)
+    assert policy.delay("primary") == 2.0
+    for i in range(100):
+        policy.observe("primary", 0.01 * (i + 1))
+    assert abs(policy.delay("primary") - 0.96) < 1e-9
+    assert policy.delay("primary", stream=True) == 2.0, "Streams are timed to the first delta separately"
+    assert HedgePolicy("backup", delay=0.3).delay("primary") == 0.3
+    assert MIN_SAMPLES <= 100
+    print("✅ Test 1 passed: p95 hedge delay")
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    """Test 2: the secondary wins a slow primary, which is then cancelled"""
+    from gateway.HedgePolicy import HedgePolicy
+    from providers.errors.ProviderError import ConnectionError
+
+    cancelled = []
+    outcomes = []
+
+    async def call(model):
+        try:
+            await asyncio.sleep(5 if model == "primary" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    async def unreachable(model):
+        if model == "primary":
+            raise ConnectionError("refused", provider="ollama")
+        return model
+
+    async def run():
+        policy = HedgePolicy("backup", delay=0.05)
+        policy.on_hedge.append(lambda *labels: outcomes.append(labels))
+        start = time.monotonic()
+        hedged = await policy.run("primary", call)
+        elapsed = time.monotonic() - start
+        failover = await policy.run("primary", unreachable)
+        return hedged, elapsed, failover
+
+    hedged, elapsed, failover = asyncio.run(run())
+    assert hedged == "backup" and elapsed < 1
+    assert cancelled == ["primary"]
+    assert failover == "backup"
+    assert outcomes == [("primary", "delay", "secondary"), ("primary", "failover", "secondary")]
+    print("✅ Test 2 passed: hedge and failover")
+
+
+@_restores_env
+def test_gateway_hedges_to_second_upstream():
+    """Test 3: a stalled Ollama is hedged to a second (Groq-compatible) mock upstream"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+    from gateway.HedgePolicy import HedgePolicy
+    from tests.test_gateway_server import _post, _stream
+    from tests.test_metrics import _get, _sample
+
+    async def run():
+        slow = MockUpstream(latency_ms=3000, reply="from ollama")
+        fast = MockUpstream(latency_ms=10, reply="from groq")
+        slow_server, fast_server = await slow.start(), await fast.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{slow_server.sockets[0].getsockname()[1]}/v1"
+        os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{fast_server.sockets[0].getsockname()[1]}/v1"
+        os.environ.setdefault("GROQ_API_KEY", "groq")
+        gateway = GatewayServer("llama3.1:8b", hedge=HedgePolicy("llama-3.1-8b-instant", delay=0.1))
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        payload = {"messages": [{"role": "user", "content": "Hi"}]}
+        try:
+            start = time.monotonic()
+            status, _, body = await _post(port, "/v1/chat/completions", payload)
+            streamed = await _stream(port, {**payload, "stream": True})
+            elapsed = time.monotonic() - start
+            return status, json.loads(body), streamed, elapsed, (await _get(port, "/metrics"))[2], fast.last_request
+        finally:
+            server.close()
+            slow_server.close()
+            fast_server.close()
+            await gateway.close()
+
+    status, body, streamed, elapsed, metrics, sent = asyncio.run(run())
+    assert status == 200 and body["choices"][0]["message"]["content"] == "from groq"
+    chunks = [json.loads(data) for _, data in streamed[1] if data != "[DONE]"]
+    assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks) == "from groq"
+    assert elapsed < 2, "Neither request should have waited for the stalled upstream"
+    assert sent["model"] == "llama-3.1-8b-instant"
+    assert _sample(metrics, 'gateway_hedged_requests_total{model="llama3.1:8b",reason="delay",winner="secondary"}') == 2
+    print("✅ Test 3 passed: gateway hedging")
+
+
+@_restores_env
+def test_gateway_fails_over_when_primary_is_down():
+    """Test 4: a refused connection goes to the secondary without waiting for the delay"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+    from gateway.HedgePolicy import HedgePolicy
+    from tests.test_gateway_server import _post
+    from tests.test_metrics import _no_retry_client
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        dead_port = s.getsockname()[1]
+
+    async def run():
+        fast = MockUpstream(latency_ms=0, reply="from groq")
+        fast_server = await fast.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{dead_port}/v1"
+        os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{fast_server.sockets[0].getsockname()[1]}/v1"
+        os.environ.setdefault("GROQ_API_KEY", "groq")
+        gateway = GatewayServer("llama3.1:8b", hedge=HedgePolicy("llama-3.1-8b-instant", delay=30))
+        gateway.pool._sdk_clients["llama3.1:8b"] = _no_retry_client()
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            start = time.monotonic()
+            status, _, body = await _post(port, "/v1/chat/completions", {"messages": [{"role": "user", "content": "Hi"}]})
+            return status, json.loads(body), time.monotonic() - start
+        finally:
+            server.close()
+            fast_server.close()
+            await gateway.close()
+
+    status, body, elapsed = asyncio.run(run())
+    assert status == 200 and body["choices"][0]["message"]["content"] == "from groq"
+    assert elapsed < 5
+    print("✅ Test 4 passed: failover")
+
+
+def test_losing_stream_closes_when_the_winner_is_chosen():
+    """Test 5: a hedged stream closes the loser as soon as the winner's first delta arrives"""
+    from gateway.HedgePolicy import HedgePolicy
+
+    closed = {}
+
+    async def open_stream(model):
+        try:
+            await asyncio.sleep(0.1 if model == "primary" else 0.15)
+            for delta in ("a", "b", "c", "d", "e"):
+                yield f"{model}:{delta}"
+                await asyncio.sleep(0.1)
+        finally:
+            closed[model] = time.monotonic()
+
+    async def run():
+        policy = HedgePolicy("backup", delay=0.05)
+        start = time.monotonic()
+        deltas = [delta async for delta in policy.stream("primary", open_stream)]
+        return deltas, start, time.monotonic()
+
+    deltas, start, end = asyncio.run(run())
+    assert deltas == [f"primary:{d}" for d in "abcde"]
+    assert closed["backup"] - start < 0.2, f"Loser stayed open for {closed['backup'] - start:.2f}s"
+    assert end - start > 0.5
+    print("✅ Test 5 passed: losing stream closed early")
+
+
+if __name__ == "__main__":
+    print("Running hedge policy tests...\n")
+    test_delay_tracks_p95()
+    test_slow_primary_is_hedged_and_cancelled()
+    test_gateway_hedges_to_second_upstream()
+    test_gateway_fails_over_when_primary_is_down()
+    test_losing_stream_closes_when_the_winner_is_chosen()
+    print("\n🎉 All hedge policy tests passed!")
@@ -0,0 +1,81 @@
+"""
+Tests for incremental request serialization of conversation history (AsyncBaseLLMClient._history_payload)
+
+Run with:
+    python -m pytest tests/test_history_payload.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _client(client_class=None):
+    from providers.OllamaClient import AsyncOllamaClient
+    from tools.tools import ToolRegistry
+    return (client_class or AsyncOllamaClient)(model="m", instructions="", tool_registry=ToolRegistry(), client=object())
+
+
+def _counting_conversation():
+    from providers.models import Conversation
+
+    dumps = []
+
+    class Counted(Conversation):
+        def model_dump(self, **kwargs):
+            dumps.append(self.content)
+            return super().model_dump(**kwargs)
+
+    return Counted, dumps
+
+
+def test_payload_matches_model_dump_through_history_changes():
+    """Test 1: appends, front trims, clears and replaced lists all serialize like model_dump()"""
+    from providers.AnthropicClient import AsyncAnthropicClient
+    from providers.models import Conversation
+
+    for client in (_client(), _client(AsyncAnthropicClient)):
+        def expected():
+            return [c.model_dump() for c in client.conversation_history]
+
+        key = "input" if "input" in client._build_request_kwargs(client.context) else "messages"
+        history = client.conversation_history
+        for i in range(6):
+            history.append(Conversation(role="user" if i % 2 == 0 else "assistant", content=f"m{i}"))
+            assert client._build_request_kwargs(client.context)[key] == expected()
+        del history[:2]
+        assert client._build_request_kwargs(client.context)[key] == expected()
+        history.clear()
+        assert client._build_request_kwargs(client.context)[key] == []
+        history.extend([Conversation(role="user", content="fresh")])
+        assert client._build_request_kwargs(client.context)[key] == [{"role": "user", "content": "fresh"}]
+        client.conversation_history = [Conversation(role="user", content="other")]
+        assert client._build_request_kwargs(client.context)[key] == [{"role": "user", "content": "other"}]
+    print("✅ Test 1 passed: payload stays in sync with history")
+
+
+def test_only_new_messages_are_serialized():
+    """Test 2: each round serializes just the messages added since the last one"""
+    Counted, dumps = _counting_conversation()
+    client = _client()
+    client.conversation_history.extend(Counted(role="user", content=f"m{i}") for i in range(100))
+    client._build_request_kwargs(client.context)
+    assert len(dumps) == 100
+
+    client.conversation_history.append(Counted(role="assistant", content="reply"))
+    payload = client._build_request_kwargs(client.context)["input"]
+    assert dumps[100:] == ["reply"] and len(payload) == 101
+
+    del client.conversation_history[:10]
+    client._build_request_kwargs(client.context)
+    assert len(dumps) == 101, "Trimming the front re-uses the cached dicts"
+
+    payload.append({"role": "user", "content": "caller's own list"})
+    assert len(client._build_request_kwargs(client.context)["input"]) == 91
+    print("✅ Test 2 passed: incremental serialization")
+
+
+if __name__ == "__main__":
+    print("Running history payload tests...\n")
+    test_payload_matches_model_dump_through_history_changes()
+    test_only_new_messages_are_serialized()
+    print("\n🎉 All history payload tests passed!")
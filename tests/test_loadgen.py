@@ -0,0 +1,82 @@
+"""
+Tests for the load generator (bench/loadgen.py) and the mock upstream's jitter and failures
+
+Run with:
+    python -m pytest tests/test_loadgen.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+
+from tests.test_gateway_server import _restores_env
+
+
+def test_percentiles_and_summary():
+    """Test 1: nearest-rank percentiles and the JSON row for a run"""
+    from bench.loadgen import CONNECTION_ERROR, Sample, compare, percentile, summarize
+
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+    assert percentile([], 95) == 0.0
+
+    samples = [Sample(stream=i % 2 == 0, status="200", latency=0.1, ttft=0.02 if i % 2 == 0 else None) for i in range(8)]
+    samples += [Sample(False, "500", 0.1), Sample(False, CONNECTION_ERROR, 0.01)]
+    row = summarize(samples, concurrency=4, wall=2.0)
+    assert row["requests"] == 10 and row["ok"] == 8 and row["streamed"] == 4
+    assert row["errors"] == {"500": 1, "connection": 1} and row["error_rate"] == 0.2
+    assert row["throughput_rps"] == 4.0
+    assert row["latency_ms"]["p50"] == 100.0 and row["ttft_ms"]["p99"] == 20.0
+    json.dumps(row)
+
+    table = compare({"meta": {"commit": "abc1234"}, "runs": [row]}, {"meta": {}, "runs": [{**row, "throughput_rps": 8.0}]})
+    assert "vs abc1234" in table and "8.0 (+100%)" in table
+    print("✅ Test 1 passed: percentiles and summary")
+
+
+@_restores_env
+def test_drive_reports_ttft_and_errors():
+    """Test 2: a run against the gateway records TTFT for streamed requests and counts upstream failures"""
+    from bench.loadgen import drive
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+    from providers.retry import NO_RETRY
+    from tests.test_metrics import _no_retry_client
+
+    async def run():
+        upstream = MockUpstream(latency_ms=20, token_ms=5, jitter_ms=10, fail_every=5)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b")
+        gateway.pool._sdk_clients["llama3.1:8b"] = _no_retry_client()
+        gateway.pool.retry_policy = NO_RETRY
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            closing = await drive(port, concurrency=2, duration=0.5)
+            reusing = await drive(port, concurrency=2, duration=0.5, stream_ratio=1.0, keep_alive=True)
+            return closing, reusing, upstream.requests_failed
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    closing, reusing, failed = asyncio.run(run())
+    for row in (closing, reusing):
+        assert row["requests"] > 0 and row["ok"] > 0
+        assert 0 < row["ttft_ms"]["p50"] < row["latency_ms"]["p99"]
+    assert 0 < closing["streamed"] < closing["requests"]
+    assert reusing["streamed"] == reusing["requests"]
+    assert sum(closing["errors"].values()) + sum(reusing["errors"].values()) == failed > 0
+    assert set(closing["errors"]) | set(reusing["errors"]) <= {"502", "stream_error"}
+    print("✅ Test 2 passed: TTFT and error rates")
+
+
+if __name__ == "__main__":
+    print("Running load generator tests...\n")
+    test_percentiles_and_summary()
+    test_drive_reports_ttft_and_errors()
+    print("\n🎉 All load generator tests passed!")
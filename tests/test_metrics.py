@@ -0,0 +1,142 @@
+"""
+Tests for the gateway /metrics endpoint (gateway/Metrics.py)
+
+Run with:
+    python -m pytest tests/test_metrics.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import socket
+
+from tests.test_gateway_server import _restores_env
+
+
+async def _get(port, path):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), head.decode(), body.decode()
+
+
+def _sample(text, line_prefix):
+    """Value of the first exposition line starting with `line_prefix`."""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"No sample {line_prefix!r} in:\n{text}")
+
+
+def test_histogram_and_counter_exposition():
+    """Test 1: cumulative buckets, +Inf, _sum/_count and escaped labels"""
+    from gateway.Metrics import Counter, Histogram
+
+    histogram = Histogram("latency_seconds", "Latency.", ("model",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "m")
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{model="m",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{model="m",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{model="m",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{model="m"} 3.65' in lines
+    assert 'latency_seconds_count{model="m"} 4' in lines
+
+    counter = Counter("requests_total", "Requests.", ("model",))
+    counter.inc('say "hi"')
+    counter.inc('say "hi"', amount=2)
+    assert 'requests_total{model="say \\"hi\\""} 3' in counter.render()
+    print("✅ Test 1 passed: exposition format")
+
+
+@_restores_env
+def test_gateway_metrics_endpoint():
+    """Test 2: /metrics reports requests, latency, TTFT, tokens and in-flight"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.AdmissionController import AdmissionController
+    from gateway.GatewayServer import GatewayServer
+    from tests.test_gateway_server import _post, _stream
+
+    async def run():
+        upstream = MockUpstream(latency_ms=20)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", admission=AdmissionController())
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        payload = {"messages": [{"role": "user", "content": "Hi"}]}
+        try:
+            await _post(port, "/v1/chat/completions", payload)
+            await _post(port, "/v1/chat/completions", payload)
+            await _stream(port, {**payload, "stream": True})
+            await _post(port, "/v1/embeddings", payload)
+            return await _get(port, "/metrics")
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    status, head, text = asyncio.run(run())
+    assert status == 200 and "text/plain; version=0.0.4" in head
+    assert _sample(text, 'gateway_requests_total{restaurant="",model="llama3.1:8b",status="200"}') == 3
+    assert _sample(text, 'gateway_requests_total{restaurant="",model="",status="404"}') == 1
+    assert _sample(text, 'gateway_request_duration_seconds_count{restaurant="",model="llama3.1:8b"}') == 3
+    assert _sample(text, 'gateway_time_to_first_token_seconds_count{model="llama3.1:8b"}') == 1
+    assert _sample(text, 'gateway_upstream_duration_seconds_count{model="llama3.1:8b"}') == 3
+    assert _sample(text, 'gateway_upstream_in_flight{model="llama3.1:8b"}') == 0
+    assert _sample(text, 'gateway_queue_depth{model="llama3.1:8b"}') == 0
+    # The mock reports 10 output tokens per response
+    assert _sample(text, 'gateway_output_tokens_total{model="llama3.1:8b"}') == 30
+    assert _sample(text, 'gateway_output_tokens_per_second_count{model="llama3.1:8b"}') == 3
+    print("✅ Test 2 passed: gateway metrics")
+
+
+@_restores_env
+def test_upstream_errors_are_counted_by_subclass():
+    """Test 3: an unreachable upstream shows up as ConnectionError"""
+    from gateway.GatewayServer import GatewayServer
+    from providers.retry import NO_RETRY
+    from tests.test_gateway_server import _post
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        dead_port = s.getsockname()[1]
+
+    async def run():
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{dead_port}/v1"
+        gateway = GatewayServer("llama3.1:8b")
+        # Don't spend retries on a port that is known to be closed
+        gateway.pool._sdk_clients["llama3.1:8b"] = _no_retry_client()
+        gateway.pool.retry_policy = NO_RETRY
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            status, _, _ = await _post(port, "/v1/chat/completions", {"messages": [{"role": "user", "content": "Hi"}]})
+            return status, (await _get(port, "/metrics"))[2]
+        finally:
+            server.close()
+            await gateway.close()
+
+    status, text = asyncio.run(run())
+    assert status == 502
+    assert _sample(text, 'gateway_upstream_errors_total{model="llama3.1:8b",error="ConnectionError"}') == 1
+    assert _sample(text, 'gateway_requests_total{restaurant="",model="llama3.1:8b",status="502"}') == 1
+    print("✅ Test 3 passed: upstream errors by subclass")
+
+
+def _no_retry_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(base_url=os.environ["OLLAMA_BASE_URL"], api_key="ollama", max_retries=0)
+
+
+if __name__ == "__main__":
+    print("Running metrics tests...\n")
+    test_histogram_and_counter_exposition()
+    test_gateway_metrics_endpoint()
+    test_upstream_errors_are_counted_by_subclass()
+    print("\n🎉 All metrics tests passed!")
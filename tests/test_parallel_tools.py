@@ -0,0 +1,89 @@
+"""
+Tests for running one model turn's tool calls concurrently (AsyncBaseLLMClient._execute_tool_calls)
+
+Run with:
+    python -m pytest tests/test_parallel_tools.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import time
+
+from pydantic import BaseModel
+
+
+class _Params(BaseModel):
+    seconds: float
+
+
+def _slow_registry():
+    from tools.tools import ToolRegistry
+    registry = ToolRegistry()
+
+    @registry.register("details", "Slow details lookup", _Params)
+    def details(seconds: float) -> str:
+        time.sleep(seconds)
+        return f"details after {seconds}"
+
+    @registry.register("photos", "Slow photos lookup", _Params)
+    def photos(seconds: float) -> str:
+        time.sleep(seconds)
+        return f"photos after {seconds}"
+
+    return registry
+
+
+def test_tool_calls_run_concurrently_in_call_order():
+    """Test 1: a round takes as long as its slowest tool and history keeps the calls' order"""
+    from openai.types.responses import ResponseFunctionToolCall
+    from providers.OllamaClient import AsyncOllamaClient
+
+    client = AsyncOllamaClient(model="m", instructions="", tool_registry=_slow_registry(), client=object())
+    calls = [
+        ResponseFunctionToolCall(type="function_call", call_id="c1", name="details", arguments=json.dumps({"seconds": 0.4})),
+        ResponseFunctionToolCall(type="function_call", call_id="c2", name="photos", arguments=json.dumps({"seconds": 0.1})),
+        ResponseFunctionToolCall(type="function_call", call_id="c3", name="missing", arguments="{}"),
+    ]
+    start = time.perf_counter()
+    asyncio.run(client._execute_tool_calls(client.context, calls))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.45, f"Tools ran one after another ({elapsed:.2f}s)"
+    assert [m.content for m in client.conversation_history] == [
+        '[Tool call: details({"seconds": 0.4})]', "[Tool result: details after 0.4]",
+        '[Tool call: photos({"seconds": 0.1})]', "[Tool result: photos after 0.1]",
+        "[Tool call: missing({})]", "[Tool result: Unknown tool: missing]",
+    ]
+    print("✅ Test 1 passed: concurrent tool calls, results in call order")
+
+
+def test_anthropic_results_follow_tool_use_order():
+    """Test 2: Anthropic tool_result blocks come back in tool_use order, and per-tool timeouts still apply"""
+    from anthropic.types import ToolUseBlock
+    from providers.AnthropicClient import AsyncAnthropicClient
+
+    registry = _slow_registry()
+    aexecute = registry.aexecute
+    registry.aexecute = lambda name, arguments: aexecute(name, arguments, timeout=0.2)
+    client = AsyncAnthropicClient(model="m", instructions="", tool_registry=registry, client=object())
+    calls = [
+        ToolUseBlock(type="tool_use", id="t1", name="details", input={"seconds": 0.5}),
+        ToolUseBlock(type="tool_use", id="t2", name="photos", input={"seconds": 0.0}),
+    ]
+    asyncio.run(client._execute_tool_calls(client.context, calls))
+
+    blocks = [m.content[0] for m in client.conversation_history]
+    assert [b["tool_use_id"] for b in blocks] == ["t1", "t2"]
+    assert "timed out after 0.2 seconds" in blocks[0]["content"]
+    assert blocks[1]["content"] == "photos after 0.0"
+    print("✅ Test 2 passed: Anthropic tool results in order")
+
+
+if __name__ == "__main__":
+    print("Running parallel tool call tests...\n")
+    test_tool_calls_run_concurrently_in_call_order()
+    test_anthropic_results_follow_tool_use_order()
+    print("\n🎉 All parallel tool call tests passed!")
@@ -0,0 +1,85 @@
+"""
+Tests for Anthropic prompt caching at PromptBuilder section boundaries
+
+Run with:
+    python -m pytest tests/test_prompt_caching.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel
+
+
+class _Params(BaseModel):
+    query: str
+
+
+def _builder():
+    from services.PromptBuilder import PromptBuilder
+    builder = PromptBuilder(mode="full")
+    builder.sections["identity"] = "You are My Delhi, a restaurant assistant."
+    builder.sections["tools"] = "**get_place_details**: Live restaurant info\n"
+    builder.add_datetime()
+    return builder
+
+
+def _client(prompt, cached=True):
+    from providers.AnthropicClient import AsyncAnthropicClient
+    from tools.tools import ToolRegistry
+    registry = ToolRegistry()
+    for name in ("details", "photos"):
+        registry.register(name, f"{name} tool", _Params)(lambda query: query)
+    client = AsyncAnthropicClient(model="claude-sonnet-4-5", instructions=prompt, tool_registry=registry, client=object())
+    client.prompt_caching = cached
+    return client
+
+
+def test_split_sections():
+    """Test 1: a built prompt splits back into its sections; other prompts stay one block"""
+    from services.PromptBuilder import split_sections
+
+    builder = _builder()
+    builder.add_memory([{"node_title": "Menu", "page_index": 2, "rank": 1, "text": "## Starters\nSamosa"}])
+    prompt = builder.build()
+    sections = split_sections(prompt)
+    assert [name for name, _ in sections] == ["identity", "datetime", "tools", "memory"]
+    assert "".join(text for _, text in sections) == prompt
+
+    assert split_sections("Be helpful.\n\nRestaurant: My Delhi") == [("", "Be helpful.\n\nRestaurant: My Delhi")]
+    assert split_sections("Intro\n## TOOLS\nx\n") == [("", "Intro\n"), ("tools", "## TOOLS\nx\n")]
+    print("✅ Test 1 passed: section splitting")
+
+
+def test_cache_breakpoints_and_usage():
+    """Test 2: breakpoints after the stable sections, at the end and on the last tool; cache usage is recorded"""
+    from types import SimpleNamespace
+
+    builder = _builder()
+    builder.add_memory([{"node_title": "Menu", "text": "Samosa"}])
+    client = _client(builder.build())
+    kwargs = client._build_request_kwargs(client.context)
+
+    marked = [block["text"].split("\n")[0] for block in kwargs["system"] if "cache_control" in block]
+    assert marked == ["## TOOLS", "## MEMORY"]
+    assert "".join(block["text"] for block in kwargs["system"]) == client.instructions
+    assert ["cache_control" in tool for tool in kwargs["tools"]] == [False, True]
+
+    plain = _client(builder.build(), cached=False)
+    plain.tool_registry = client.tool_registry
+    kwargs = plain._build_request_kwargs(plain.context)
+    assert kwargs["system"] == plain.instructions
+    assert not any("cache_control" in tool for tool in kwargs["tools"]), "Uncached clients share an unmarked tool list"
+
+    usage = SimpleNamespace(input_tokens=20, output_tokens=5, cache_read_input_tokens=1800, cache_creation_input_tokens=None)
+    client._record_usage(client.context, SimpleNamespace(usage=usage))
+    client._record_usage(client.context, SimpleNamespace(usage=usage))
+    assert (client.usage.input_tokens, client.usage.cache_read_input_tokens, client.usage.cache_creation_input_tokens) == (40, 3600, 0)
+    print("✅ Test 2 passed: cache breakpoints and usage")
+
+
+if __name__ == "__main__":
+    print("Running prompt caching tests...\n")
+    test_split_sections()
+    test_cache_breakpoints_and_usage()
+    print("\n🎉 All prompt caching tests passed!")
@@ -0,0 +1,256 @@
+"""
+Tests for the gateway completion cache (gateway/ResponseCache.py)
+
+Run with:
+    python -m pytest tests/test_response_cache.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from tests.test_gateway_server import _restores_env
+
+
+def _chat(query="Are you open today?", **kwargs):
+    from gateway.completions import ChatRequest
+    return ChatRequest(model=kwargs.pop("model", "llama3.1:8b"), system=kwargs.pop("system", "sys"),
+                       query=query, restaurant=kwargs.pop("restaurant", "spice-hut"), **kwargs)
+
+
+def test_key_normalizes_messages():
+    """Test 1: whitespace and case don't change the key; model, prompt and restaurant do"""
+    from gateway.ResponseCache import cache_key
+
+    base = cache_key(_chat("Are you open today?"), "v1")
+    assert cache_key(_chat("  are YOU   open today?\n"), "v1") == base
+    assert cache_key(_chat("Are you open today?", model="llama3.2:3b"), "v1") != base
+    assert cache_key(_chat("Are you open today?", system="other"), "v1") != base
+    assert cache_key(_chat("Are you open today?", restaurant="noodle-bar"), "v1") != base
+    assert cache_key(_chat("Are you open today?"), "v2") != base
+    print("✅ Test 1 passed: key normalization")
+
+
+def test_ttl_and_byte_cap():
+    """Test 2: entries expire after the TTL and the LRU stays under the byte cap"""
+    from gateway.ResponseCache import ResponseCache
+
+    cache = ResponseCache(ttl=0.05)
+    cache.put("k", _chat(), "Yes, 12pm to 10pm.")
+    assert cache.get("k") == "Yes, 12pm to 10pm."
+    time.sleep(0.06)
+    assert cache.get("k") is None and len(cache) == 0
+
+    cache = ResponseCache(ttl=60, max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.put(key, _chat(), "x" * 100)
+        if key == "b":
+            cache.get("a")  # a is now the most recent
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.size_bytes <= 250 and cache.evictions == 1
+    print("✅ Test 2 passed: TTL and LRU byte cap")
+
+
+def test_sqlite_tier_survives_restart():
+    """Test 3: a new cache over the same SQLite file still has the reply"""
+    from database.connection import create_db
+    from database.repository.ResponseCacheRepository import ResponseCacheRepository
+    from gateway.ResponseCache import ResponseCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "cache.db")
+        first = ResponseCache(store=ResponseCacheRepository(create_db(db_path)()))
+        first.put("k", _chat(), "Namaste!", "v1")
+        first.close()
+
+        second = ResponseCache(store=ResponseCacheRepository(create_db(db_path)()))
+        assert len(second) == 0
+        assert second.get("k") == "Namaste!"
+        assert len(second) == 1, "Persistent hits are promoted into memory"
+    print("✅ Test 3 passed: persistent tier")
+
+
+def test_restaurant_reload_invalidates():
+    """Test 4: loading a new knowledge version drops the restaurant's old entries"""
+    from database.connection import create_db
+    from database.repository.ResponseCacheRepository import ResponseCacheRepository
+    from gateway.ResponseCache import ResponseCache
+    from gateway.RestaurantRegistry import RestaurantRegistry
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp) / "spice-hut"
+        folder.mkdir()
+        menu = folder / "menu.md"
+        menu.write_text("# Menu\nDal")
+        registry = RestaurantRegistry(tmp, check_interval=0)
+        store = ResponseCacheRepository(create_db(str(Path(tmp) / "cache.db"))())
+        cache = ResponseCache(store=store)
+        registry.on_load.append(cache.invalidate_restaurant)
+
+        version = registry.get("spice-hut")["version"]
+        cache.put("menu", _chat(), "We have dal.", version)
+        cache.put("other", _chat(restaurant="noodle-bar"), "We have ramen.", "n1")
+        assert registry.get("spice-hut")["version"] == version and cache.get("menu")
+
+        menu.write_text("# Menu\nDal\nPaneer")
+        stat = menu.stat()
+        os.utime(menu, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        registry.get("spice-hut")
+
+        assert cache.get("menu") is None
+        cache.flush()
+        assert store.get("menu") is None
+        assert cache.get("other") == "We have ramen."
+    print("✅ Test 4 passed: invalidation on knowledge change")
+
+
+@_restores_env
+def test_gateway_serves_repeats_from_cache():
+    """Test 5: repeated questions skip the upstream and say so in X-Cache"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+    from gateway.ResponseCache import ResponseCache
+    from gateway.RestaurantRegistry import RestaurantRegistry
+    from tests.test_gateway_server import _post
+
+    async def run(root):
+        upstream = MockUpstream(latency_ms=0)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", None, RestaurantRegistry(root), cache=ResponseCache())
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        path = "/restaurants/spice-hut/v1/chat/completions"
+        try:
+            first = await _post(port, path, {"messages": [{"role": "user", "content": "Open today?"}]})
+            second = await _post(port, path, {"messages": [{"role": "user", "content": "open  today?"}]})
+            stream = await _post(port, path, {"stream": True, "messages": [{"role": "user", "content": "Open today?"}]})
+            bypass = await _post(port, path, {"messages": [{"role": "user", "content": "Open today?"}]},
+                                 {"Cache-Control": "no-cache"})
+            plain = await _post(port, "/v1/chat/completions", {"messages": [{"role": "user", "content": "Open today?"}]})
+            return first, second, stream, bypass, plain, upstream.requests_served
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    with tempfile.TemporaryDirectory() as root:
+        (Path(root) / "spice-hut").mkdir()
+        (Path(root) / "spice-hut" / "menu.md").write_text("# Menu\nDal")
+        first, second, stream, bypass, plain, served = asyncio.run(run(root))
+
+    assert first[1]["x-cache"] == "MISS"
+    assert second[1]["x-cache"] == "HIT"
+    assert json.loads(second[2])["choices"][0]["message"]["content"] == json.loads(first[2])["choices"][0]["message"]["content"]
+    assert stream[1]["x-cache"] == "HIT"
+    assert b"Namaste" in stream[2] and b"data: [DONE]" in stream[2]
+    assert bypass[1]["x-cache"] == "BYPASS"
+    assert plain[1]["x-cache"] == "BYPASS", "Requests that may call tools are never cached"
+    assert served == 3
+    print("✅ Test 5 passed: gateway cache hits")
+
+
+
+@_restores_env
+def test_non_text_content_is_keyed():
+    """Test 6: content-part lists are cached by their JSON, and null content is a 400 instead of a dropped connection"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+    from gateway.ResponseCache import ResponseCache, cache_key
+    from gateway.RestaurantRegistry import RestaurantRegistry
+    from tests.test_gateway_server import _post
+
+    parts = [{"type": "text", "text": "Open today?"}]
+    assert cache_key(_chat(parts), "v1") == cache_key(_chat([{"text": "Open today?", "type": "text"}]), "v1")
+    assert cache_key(_chat(parts), "v1") != cache_key(_chat("Open today?"), "v1")
+    assert cache_key(_chat(None), "v1") == cache_key(_chat(""), "v1")
+
+    async def run(root):
+        upstream = MockUpstream(latency_ms=0)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", None, RestaurantRegistry(root), cache=ResponseCache())
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        path = "/restaurants/spice-hut/v1/chat/completions"
+        try:
+            first = await _post(port, path, {"messages": [{"role": "user", "content": parts}]})
+            second = await _post(port, path, {"messages": [{"role": "user", "content": parts}]})
+            null = await _post(port, path, {"messages": [{"role": "user", "content": None}]})
+            return first, second, null
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    with tempfile.TemporaryDirectory() as root:
+        (Path(root) / "spice-hut").mkdir()
+        (Path(root) / "spice-hut" / "menu.md").write_text("# Menu\nDal")
+        first, second, null = asyncio.run(run(root))
+
+    assert (first[0], first[1]["x-cache"]) == (200, "MISS")
+    assert (second[0], second[1]["x-cache"]) == (200, "HIT")
+    assert null[0] == 400 and b"Malformed chat request" in null[2]
+    print("✅ Test 6 passed: non-text content")
+
+
+
+def test_sqlite_tier_stays_off_the_event_loop():
+    """Test 7: SQLite reads and writes run on the store thread, and the shared file uses WAL"""
+    import threading
+    from sqlalchemy import text
+    from database.connection import create_db
+    from database.repository.ResponseCacheRepository import ResponseCacheRepository
+    from gateway.ResponseCache import ResponseCache
+
+    threads = []
+
+    class RecordingRepository(ResponseCacheRepository):
+        def get(self, cache_key):
+            threads.append(threading.current_thread())
+            return super().get(cache_key)
+
+        def upsert(self, record):
+            threads.append(threading.current_thread())
+            return super().upsert(record)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session = create_db(str(Path(tmp) / "cache.db"), wal=True)()
+        journal = session.execute(text("PRAGMA journal_mode")).scalar()
+        busy = session.execute(text("PRAGMA busy_timeout")).scalar()
+        session.close()
+
+        async def run():
+            writer = ResponseCache(store=RecordingRepository(create_db(str(Path(tmp) / "cache.db"), wal=True)()))
+            writer.put("k", _chat(), "Namaste!", "v1")
+            writer.close()
+            reader = ResponseCache(store=RecordingRepository(create_db(str(Path(tmp) / "cache.db"), wal=True)()))
+            reply = await reader.aget("k")
+            missing = await reader.aget("other")
+            reader.close()
+            return reply, missing
+
+        reply, missing = asyncio.run(run())
+
+    assert (reply, missing) == ("Namaste!", None)
+    assert len(threads) == 3 and threading.main_thread() not in threads
+    assert journal == "wal" and busy == 5000
+    print("✅ Test 7 passed: SQLite tier off the event loop")
+
+
+if __name__ == "__main__":
+    print("Running response cache tests...\n")
+    test_key_normalizes_messages()
+    test_ttl_and_byte_cap()
+    test_sqlite_tier_survives_restart()
+    test_restaurant_reload_invalidates()
+    test_gateway_serves_repeats_from_cache()
+    test_non_text_content_is_keyed()
+    test_sqlite_tier_stays_off_the_event_loop()
+    print("\n🎉 All response cache tests passed!")
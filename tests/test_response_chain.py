@@ -0,0 +1,123 @@
+"""
+Tests for delta-only requests with previous_response_id (AsyncOpenAICompatClient.chain_responses)
+
+Run with:
+    python -m pytest tests/test_response_chain.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+
+from pydantic import BaseModel
+
+from tests.test_gateway_server import _restores_env
+
+
+class _Params(BaseModel):
+    query: str
+
+
+@_restores_env
+def test_turns_send_only_new_input():
+    """Test 1: later turns send previous_response_id and the new message; a lost response or a trim resends everything"""
+    from bench.mock_upstream import MockUpstream
+    from providers.OllamaClient import AsyncOllamaClient
+    from tools.tools import ToolRegistry
+
+    async def run():
+        upstream = MockUpstream(latency_ms=0)
+        server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        client = AsyncOllamaClient(model="m", instructions="Be brief.", tool_registry=ToolRegistry())
+        client.chain_responses = True
+        sent = []
+        try:
+            for query in ("one", "two", "three"):
+                await client.generate_response(query)
+                sent.append(dict(upstream.last_request))
+            upstream.response_ids.clear()
+            await client.generate_response("four")
+            sent.append(dict(upstream.last_request))
+            await client.generate_response("five")
+            sent.append(dict(upstream.last_request))
+            del client.conversation_history[:2]
+            await client.generate_response("six")
+            sent.append(dict(upstream.last_request))
+            return sent
+        finally:
+            server.close()
+            await client.client.close()
+
+    sent = asyncio.run(run())
+    assert "previous_response_id" not in sent[0] and len(sent[0]["input"]) == 1
+    for request in sent[1:3]:
+        assert request["previous_response_id"].startswith("resp_mock_")
+        assert len(request["input"]) == 1 and request["input"][0]["role"] == "user"
+        assert request["instructions"] == "Be brief." and request["store"] is True
+    assert sent[2]["input"][0]["content"] == "three"
+
+    assert "previous_response_id" not in sent[3] and len(sent[3]["input"]) == 7, "Lost response: full history"
+    assert sent[4]["input"] == [{"role": "user", "content": "five"}]
+    assert "previous_response_id" not in sent[5] and len(sent[5]["input"]) == 9, "Trimmed history: new chain"
+    print("✅ Test 1 passed: delta-only turns")
+
+
+def test_tool_rounds_send_function_call_outputs():
+    """Test 2: a tool round continues the chain with function_call_output items for each call"""
+    from openai.types.responses import Response
+    from bench.mock_upstream import MockUpstream
+    from providers.OllamaClient import AsyncOllamaClient
+    from tools.tools import ToolRegistry
+
+    registry = ToolRegistry()
+    registry.register("echo", "Echo the query", _Params)(lambda query: f"echo {query}")
+    payloads = MockUpstream(latency_ms=0)
+
+    def response(output):
+        payload = payloads.response_payload("m")
+        del payload["usage"]
+        if output is not None:
+            payload["output"] = output
+        return Response.model_validate(payload)
+
+    calls = [
+        {"type": "function_call", "id": f"fc_{i}", "call_id": f"call_{i}", "name": "echo",
+         "arguments": json.dumps({"query": q}), "status": "completed"}
+        for i, q in enumerate(["a", "b"])
+    ]
+    script = [response(calls), response(None)]
+    requests = []
+
+    class FakeResponses:
+        async def create(self, **kwargs):
+            requests.append(kwargs)
+            return script.pop(0)
+
+    class FakeSDK:
+        responses = FakeResponses()
+
+    client = AsyncOllamaClient(model="m", instructions="", tool_registry=registry, client=FakeSDK())
+    client.chain_responses = True
+    asyncio.run(client.generate_response("Use the tools"))
+
+    first, second = requests
+    assert "previous_response_id" not in first
+    assert second["previous_response_id"] == "resp_mock_1"
+    assert second["input"] == [
+        {"type": "function_call_output", "call_id": "call_0", "output": "echo a"},
+        {"type": "function_call_output", "call_id": "call_1", "output": "echo b"},
+    ]
+    assert [m.content for m in client.conversation_history][3:] == [
+        '[Tool call: echo({"query": "b"})]', "[Tool result: echo b]", payloads.reply,
+    ], "Text history is still kept for full-history fallbacks"
+    print("✅ Test 2 passed: tool outputs in the chain")
+
+
+if __name__ == "__main__":
+    print("Running response chain tests...\n")
+    test_turns_send_only_new_input()
+    test_tool_rounds_send_function_call_outputs()
+    print("\n🎉 All response chain tests passed!")
@@ -0,0 +1,210 @@
+"""
+Tests for multi-tenant restaurant serving (gateway/RestaurantRegistry.py)
+
+Run with:
+    python -m pytest tests/test_restaurant_registry.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from tests.test_gateway_server import _restores_env
+
+
+def _make_restaurants(root, tenants):
+    """Write {slug: {"name": ..., "knowledge": ...}} as restaurants/<slug>/ folders."""
+    for slug, spec in tenants.items():
+        folder = Path(root) / slug
+        folder.mkdir()
+        if "name" in spec:
+            (folder / "config.json").write_text(json.dumps({"name": spec["name"]}))
+        (folder / "menu.md").write_text(spec["knowledge"])
+
+
+def test_loads_lazily_and_caches():
+    """Test 1: tenants are read on first use and then served from memory"""
+    from gateway.RestaurantRegistry import RestaurantRegistry
+
+    with tempfile.TemporaryDirectory() as root:
+        _make_restaurants(root, {
+            "spice-hut": {"name": "Spice Hut", "knowledge": "# Menu\nDal"},
+            "noodle-bar": {"knowledge": "# Menu\nRamen"},
+        })
+        registry = RestaurantRegistry(root)
+        assert registry.slugs() == ["noodle-bar", "spice-hut"]
+        assert registry.loaded() == []
+
+        hut = registry.get("spice-hut")
+        assert hut["name"] == "Spice Hut" and hut["slug"] == "spice-hut"
+        assert "Dal" in hut["knowledge"]
+        assert registry.get("spice-hut") is hut
+        assert registry.loads == 1
+
+        # config.json is optional — the name falls back to the slug
+        assert registry.get("noodle-bar")["name"] == "Noodle Bar"
+        assert registry.loaded() == ["spice-hut", "noodle-bar"]
+    print("✅ Test 1 passed: lazy load")
+
+
+def test_unknown_and_invalid_slugs():
+    """Test 2: missing tenants and path-like slugs return None"""
+    from gateway.RestaurantRegistry import RestaurantRegistry
+
+    with tempfile.TemporaryDirectory() as root:
+        _make_restaurants(root, {"spice-hut": {"knowledge": "# Menu"}})
+        registry = RestaurantRegistry(root)
+        assert registry.get("nope") is None
+        assert registry.get("../spice-hut") is None
+        assert registry.get("") is None
+    print("✅ Test 2 passed: slug validation")
+
+
+def test_lru_eviction_under_byte_cap():
+    """Test 3: the least recently used tenant is evicted when over the memory cap"""
+    from gateway.RestaurantRegistry import RestaurantRegistry
+
+    with tempfile.TemporaryDirectory() as root:
+        _make_restaurants(root, {slug: {"knowledge": "x" * 1000} for slug in ("a", "b", "c")})
+        registry = RestaurantRegistry(root, max_bytes=2500)
+        registry.get("a")
+        registry.get("b")
+        registry.get("a")  # a is now the most recent
+        registry.get("c")
+        assert registry.loaded() == ["a", "c"]
+        assert registry.evictions == 1
+        assert registry.loaded_bytes <= 2500
+    print("✅ Test 3 passed: LRU eviction")
+
+
+def test_reloads_when_files_change():
+    """Test 4: edited knowledge is picked up and gets a new version"""
+    from gateway.RestaurantRegistry import RestaurantRegistry
+
+    with tempfile.TemporaryDirectory() as root:
+        _make_restaurants(root, {"spice-hut": {"knowledge": "# Menu\nDal"}})
+        registry = RestaurantRegistry(root, check_interval=0)
+        before = registry.get("spice-hut")
+
+        menu = Path(root) / "spice-hut" / "menu.md"
+        menu.write_text("# Menu\nDal\nPaneer Tikka")
+        stat = menu.stat()
+        os.utime(menu, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        after = registry.get("spice-hut")
+        assert "Paneer Tikka" in after["knowledge"]
+        assert after["version"] != before["version"]
+        assert registry.loads == 2
+        assert registry.get("spice-hut")["version"] == after["version"]
+    print("✅ Test 4 passed: reload on change")
+
+
+@_restores_env
+def test_gateway_routes_by_path_header_and_model_suffix():
+    """Test 5: one gateway serves every tenant, picked per request"""
+    from gateway.RestaurantRegistry import RestaurantRegistry
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+    from tests.test_gateway_server import _post
+
+    async def run(root):
+        upstream = MockUpstream(latency_ms=0)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", "spice-hut", RestaurantRegistry(root))
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        payload = {"messages": [{"role": "user", "content": "Menu?"}]}
+        seen = {}
+        try:
+            for label, path, body, headers in [
+                ("default", "/v1/chat/completions", payload, None),
+                ("path", "/restaurants/noodle-bar/v1/chat/completions", payload, None),
+                ("header", "/v1/chat/completions", payload, {"X-Restaurant": "noodle-bar"}),
+                ("suffix", "/v1/chat/completions", {**payload, "model": "llama3.2:3b@noodle-bar"}, None),
+            ]:
+                status, _, resp = await _post(port, path, body, headers)
+                assert status == 200, resp
+                seen[label] = (upstream.last_request["instructions"], upstream.last_request["model"])
+            missing = await _post(port, "/restaurants/nope/v1/chat/completions", payload)
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+        return seen, missing
+
+    with tempfile.TemporaryDirectory() as root:
+        _make_restaurants(root, {
+            "spice-hut": {"name": "Spice Hut", "knowledge": "# Menu\nDal"},
+            "noodle-bar": {"name": "Noodle Bar", "knowledge": "# Menu\nRamen"},
+        })
+        seen, missing = asyncio.run(run(root))
+
+    assert "Spice Hut" in seen["default"][0]
+    for label in ("path", "header", "suffix"):
+        assert "Noodle Bar" in seen[label][0] and "Spice Hut" not in seen[label][0], label
+    assert seen["suffix"][1] == "llama3.2:3b"
+    assert missing[0] == 404 and "Unknown restaurant" in json.loads(missing[2])["error"]["message"]
+    print("✅ Test 5 passed: per-request tenant routing")
+
+
+def test_aget_loads_in_a_thread_once():
+    """Test 6: concurrent aget() misses share one load, run off the event loop"""
+    import threading
+    import importlib
+    registry_module = importlib.import_module("gateway.RestaurantRegistry")
+    from gateway.RestaurantRegistry import RestaurantRegistry
+
+    loads = []
+    original = registry_module.load_restaurant
+
+    def slow_load(slug, root):
+        loads.append(threading.current_thread() is threading.main_thread())
+        time.sleep(0.3)
+        return original(slug, root)
+
+    async def run(registry):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(registry.aget("spice-hut") for _ in range(5)), registry.aget("nope"))
+        ticking.cancel()
+        return results, ticks
+
+    with tempfile.TemporaryDirectory() as root:
+        _make_restaurants(root, {"spice-hut": {"name": "Spice Hut", "knowledge": "# Menu\nDal"}})
+        registry = RestaurantRegistry(root, check_interval=0)
+        registry_module.load_restaurant = slow_load
+        try:
+            results, ticks = asyncio.run(run(registry))
+            assert asyncio.run(registry.aget("spice-hut")) is results[0], "Unchanged files aren't read again"
+        finally:
+            registry_module.load_restaurant = original
+
+    assert all(r is results[0] for r in results[:5]) and results[0]["name"] == "Spice Hut"
+    assert results[5] is None
+    assert loads == [False] and registry.loads == 1
+    assert ticks > 15, f"The event loop stalled while the tenant loaded ({ticks} ticks)"
+    print("✅ Test 6 passed: aget loads off the loop, once")
+
+
+if __name__ == "__main__":
+    print("Running restaurant registry tests...\n")
+    test_loads_lazily_and_caches()
+    test_unknown_and_invalid_slugs()
+    test_lru_eviction_under_byte_cap()
+    test_reloads_when_files_change()
+    test_gateway_routes_by_path_header_and_model_suffix()
+    test_aget_loads_in_a_thread_once()
+    print("\n🎉 All restaurant registry tests passed!")
@@ -0,0 +1,119 @@
+"""
+Tests for provider-level retries (providers/retry.py)
+
+Run with:
+    python -m pytest tests/test_retry.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+from tests.test_gateway_server import _restores_env
+
+
+def _status_error(status, headers=None):
+    import httpx
+    import openai
+    from providers.errors.ProviderError import ProviderApiError, RateLimitExceededError
+
+    response = httpx.Response(status, headers=headers or {}, request=httpx.Request("POST", "http://upstream/v1/responses"))
+    if status == 429:
+        return RateLimitExceededError("Rate limit exceeded", provider="openai", original_error=openai.RateLimitError("slow down", response=response, body=None))
+    return ProviderApiError("failed", provider="openai", original_error=openai.APIStatusError("failed", response=response, body=None))
+
+
+def test_backoff_decisions():
+    """Test 1: which errors retry, exponential delays with jitter, Retry-After and the total cap"""
+    from providers.errors.ProviderError import AuthenticationError, ConnectionError
+    from providers.retry import RetryPolicy
+
+    policy = RetryPolicy(max_retries=4, base_delay=1.0, max_delay=4.0, max_total=10.0)
+    limited = _status_error(429)
+    for failures, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 4.0)]:
+        delay = policy.backoff(failures, limited, elapsed=0.0)
+        assert cap / 2 <= delay <= cap, (failures, delay)
+    assert policy.backoff(5, limited, elapsed=0.0) is None, "Out of retries"
+
+    assert policy.backoff(1, ConnectionError("down", provider="openai"), 0.0) is not None
+    assert policy.backoff(1, _status_error(503), 0.0) is not None
+    assert policy.backoff(1, _status_error(400), 0.0) is None
+    assert policy.backoff(1, AuthenticationError("bad key", provider="openai"), 0.0) is None
+    assert policy.backoff(1, ValueError("not a provider error"), 0.0) is None
+
+    assert policy.backoff(1, _status_error(429, {"retry-after": "7"}), 0.0) == 7.0
+    assert policy.backoff(1, _status_error(429, {"retry-after-ms": "250"}), 0.0) == 0.25
+    assert policy.backoff(1, _status_error(429, {"retry-after": "7"}), elapsed=5.0) is None, "Would exceed max_total"
+    print("✅ Test 1 passed: backoff decisions")
+
+
+@_restores_env
+def test_client_retries_transient_upstream_failures():
+    """Test 2: generate_response and stream_response retry a 500 without blocking the loop; NO_RETRY surfaces it"""
+    from bench.mock_upstream import MockUpstream
+    from providers.OllamaClient import AsyncOllamaClient
+    from providers.errors.ProviderError import ProviderApiError
+    from providers.retry import NO_RETRY, RetryPolicy
+    from tools.tools import ToolRegistry
+
+    async def run():
+        upstream = MockUpstream(latency_ms=0, reply="Namaste", fail_every=2)
+        server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        client = AsyncOllamaClient(model="m", instructions="", tool_registry=ToolRegistry(), retry_policy=RetryPolicy(base_delay=0.05))
+        strict = AsyncOllamaClient(model="m", instructions="", tool_registry=ToolRegistry(), client=client.client, retry_policy=NO_RETRY)
+        try:
+            await strict.generate_response("first")  # request 1 succeeds, so the next one fails
+            reply = await client.generate_response("Hi")
+            streamed = [chunk async for chunk in client.stream_response("Hi again")]
+            try:
+                await strict.generate_response("third")
+                error = None
+            except ProviderApiError as e:
+                error = e
+            return reply, "".join(streamed), upstream.requests_failed, error
+        finally:
+            server.close()
+            await client.client.close()
+
+    reply, streamed, failed, error = asyncio.run(run())
+    assert reply == "Namaste" and streamed == "Namaste"
+    assert failed == 3 and error is not None
+    print("✅ Test 2 passed: client retries")
+
+
+def test_max_total_counts_time_spent_in_attempts():
+    """Test 3: slow failing attempts use up max_total, not just the sleeps between them"""
+    import time
+    from providers.errors.ProviderError import ConnectionError
+    from providers.retry import RetryPolicy
+
+    policy = RetryPolicy(max_retries=5, base_delay=0.01, max_delay=0.01, max_total=0.5)
+    attempts = []
+
+    async def slow_failure():
+        attempts.append(time.monotonic())
+        await asyncio.sleep(0.3)
+        raise ConnectionError("down", provider="openai")
+
+    async def run():
+        start = time.monotonic()
+        try:
+            await policy.call(slow_failure)
+        except ConnectionError:
+            return time.monotonic() - start
+        raise AssertionError("The last error should be raised")
+
+    elapsed = asyncio.run(run())
+    assert len(attempts) == 2, f"Expected to stop after the attempt that passed max_total, got {len(attempts)}"
+    assert elapsed < 0.8, elapsed
+    print("✅ Test 3 passed: max_total is a deadline")
+
+
+if __name__ == "__main__":
+    print("Running retry tests...\n")
+    test_backoff_decisions()
+    test_client_retries_transient_upstream_failures()
+    test_max_total_counts_time_spent_in_attempts()
+    print("\n🎉 All retry tests passed!")
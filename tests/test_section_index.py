@@ -0,0 +1,176 @@
+"""
+Tests for heading-section retrieval (services/SectionIndex.py)
+
+Run with:
+    python -m pytest tests/test_section_index.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+from tests.test_gateway_server import _restores_env
+
+MENU = """# Spice Hut — Menu
+
+All prices include tax.
+
+## Starters
+| Item | Price |
+|------|-------|
+| Samosa (2 pcs) | $8 |
+| Paneer Tikka | $14 |
+
+## Mains
+| Item | Price |
+|------|-------|
+| Butter Chicken | $22 |
+| Dal Makhani | $18 |
+
+## Desserts
+| Item | Price |
+|------|-------|
+| Gulab Jamun | $9 |
+"""
+
+ALLERGENS = """# Spice Hut — Allergens
+
+Columns: Gluten (GL), Dairy (D), Nuts (N)
+
+## Mains
+| Item | GL | D | N |
+|------|----|---|---|
+| Butter Chicken | | ✓ | ✓ |
+
+## Desserts
+| Item | GL | D | N |
+|------|----|---|---|
+| Gulab Jamun | ✓ | ✓ | |
+"""
+
+
+def _index():
+    from services.SectionIndex import DOCUMENT_SEPARATOR, SectionIndex
+    return SectionIndex.from_markdown(DOCUMENT_SEPARATOR.join([ALLERGENS, MENU]))
+
+
+def test_splits_documents_at_headings():
+    """Test 1: each ## heading is a section; the title and legend are the preamble"""
+    index = _index()
+    assert [s.heading for s in index.sections] == ["Mains", "Desserts", "Starters", "Mains", "Desserts"]
+    assert index.preambles[0].startswith("# Spice Hut — Allergens") and "Columns:" in index.preambles[0]
+    assert "All prices include tax." in index.preambles[1]
+    assert "Butter Chicken" in index.sections[0].text and "Gulab" not in index.sections[0].text
+    print("✅ Test 1 passed: heading split")
+
+
+def test_search_ranks_relevant_sections():
+    """Test 2: the sections mentioning the dish rank first, unrelated ones are left out"""
+    index = _index()
+    headings = [s.heading for s in index.search("How much are the samosas?")]
+    assert headings == ["Starters"]
+
+    hits = index.search("does the gulab jamun have nuts?")
+    assert {s.heading for s in hits} == {"Desserts"}
+    assert len(hits) == 2, "Both the menu and allergen dessert sections should match"
+    assert index.search("") == [] and index.search("the and is") == []
+    print("✅ Test 2 passed: ranking")
+
+
+def test_render_keeps_preamble_and_outline():
+    """Test 3: rendered context has the legend, the outline and only the chosen sections"""
+    index = _index()
+    text = index.render(index.search("is butter chicken gluten free"))
+    assert "Columns: Gluten (GL)" in text
+    assert "- Starters" in text, "Outline should list every heading"
+    assert "Butter Chicken" in text
+    assert "Samosa" not in text and "Gulab Jamun |" not in text
+    assert "No section matched" in index.render([])
+    print("✅ Test 3 passed: rendering")
+
+
+@_restores_env
+def test_gateway_sections_mode_sends_only_relevant_knowledge():
+    """Test 4: context="sections" shrinks the system prompt to the question's sections"""
+    from bench.mock_upstream import MockUpstream
+    from gateway.GatewayServer import GatewayServer
+    from gateway.RestaurantRegistry import RestaurantRegistry
+    from tests.test_gateway_server import _post
+
+    async def run(root, context):
+        upstream = MockUpstream(latency_ms=0)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", "spice-hut", RestaurantRegistry(root), context=context)
+        server = await gateway.start("127.0.0.1", 0)
+        try:
+            status, _, _ = await _post(server.sockets[0].getsockname()[1], "/v1/chat/completions", {
+                "messages": [
+                    {"role": "user", "content": "Tell me about the gulab jamun"},
+                    {"role": "assistant", "content": "It is a sweet dumpling."},
+                    {"role": "user", "content": "Does it contain nuts?"},
+                ],
+            })
+            assert status == 200
+            return upstream.last_request["instructions"]
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    with tempfile.TemporaryDirectory() as root:
+        folder = Path(root) / "spice-hut"
+        folder.mkdir()
+        (folder / "config.json").write_text(json.dumps({"name": "Spice Hut"}))
+        (folder / "allergens.md").write_text(ALLERGENS)
+        (folder / "menu.md").write_text(MENU)
+        full = asyncio.run(run(root, "full"))
+        sections = asyncio.run(run(root, "sections"))
+
+    assert "Samosa" in full and "Samosa" not in sections
+    # The follow-up only resolves "it" through the previous user turn
+    assert "Gulab Jamun" in sections
+    assert len(sections) < len(full)
+    print("✅ Test 4 passed: retrieval mode in the gateway")
+
+
+def test_retrieval_query_uses_text_parts_of_list_content():
+    """Test 5: content-part lists are retrieved for by their text parts"""
+    from gateway.completions import parse_chat_request
+
+    queries = []
+
+    def retrieve(query):
+        queries.append(query)
+        return "## Gulab Jamun"
+
+    chat = parse_chat_request(
+        {"messages": [
+            {"role": "user", "content": "Tell me about the gulab jamun"},
+            {"role": "assistant", "content": "It is a sweet dumpling."},
+            {"role": "user", "content": [
+                {"type": "text", "text": "Does it contain nuts?"},
+                {"type": "image_url", "image_url": {"url": "https://example.com/dish.png"}},
+            ]},
+        ]},
+        default_model="llama3.1:8b",
+        restaurant={"name": "Spice Hut", "knowledge": MENU},
+        retrieve=retrieve,
+    )
+    assert queries == ["Tell me about the gulab jamun\nDoes it contain nuts?"]
+    assert "## Gulab Jamun" in chat.system and isinstance(chat.query, list)
+    print("✅ Test 5 passed: list content retrieval")
+
+
+if __name__ == "__main__":
+    print("Running section index tests...\n")
+    test_splits_documents_at_headings()
+    test_search_ranks_relevant_sections()
+    test_render_keeps_preamble_and_outline()
+    test_gateway_sections_mode_sends_only_relevant_knowledge()
+    test_retrieval_query_uses_text_parts_of_list_content()
+    print("\n🎉 All section index tests passed!")
@@ -0,0 +1,133 @@
+"""
+Tests for server-side conversation sessions (gateway/SessionStore.py)
+
+Run with:
+    python -m pytest tests/test_session_store.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import time
+
+from tests.test_gateway_server import _restores_env
+
+
+def test_ttl_and_session_cap():
+    """Test 1: idle sessions expire and the least recently used go past the cap"""
+    from gateway.SessionStore import SessionStore
+
+    store = SessionStore(ttl=0.05)
+    session = store.create("llama3.1:8b", None)
+    assert store.get(session.id) is session
+    time.sleep(0.06)
+    assert store.get(session.id) is None and len(store) == 0 and store.expired == 1
+
+    store = SessionStore(max_sessions=2)
+    a, b = store.create("m", None), store.create("m", None)
+    store.get(a.id)  # a is now the most recent
+    c = store.create("m", None)
+    assert store.get(b.id) is None
+    assert store.get(a.id) is a and store.get(c.id) is c
+    print("✅ Test 1 passed: TTL and session cap")
+
+
+def test_history_is_trimmed_to_whole_turns():
+    """Test 2: old messages are dropped and history never starts on a reply"""
+    from gateway.SessionStore import SessionStore
+    from providers.models import Conversation
+
+    store = SessionStore(max_messages=5)
+    session = store.create("m", None)
+    for i in range(4):
+        store.record_turn(session, [Conversation(role="user", content=f"q{i}")], f"a{i}")
+    assert [m.content for m in session.history] == ["q2", "a2", "q3", "a3"]
+    print("✅ Test 2 passed: history trimming")
+
+
+@_restores_env
+def test_gateway_keeps_history_server_side():
+    """Test 3: follow-ups send one message and the upstream still gets the whole conversation"""
+    from bench.mock_upstream import DEFAULT_REPLY, MockUpstream
+    from gateway.GatewayServer import GatewayServer
+    from gateway.SessionStore import SessionStore
+    from tests.test_gateway_server import _post
+
+    async def run():
+        upstream = MockUpstream(latency_ms=0)
+        upstream_server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{upstream_server.sockets[0].getsockname()[1]}/v1"
+        gateway = GatewayServer("llama3.1:8b", sessions=SessionStore())
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        path = "/v1/chat/completions"
+        try:
+            first = await _post(port, path, {"session": True, "messages": [
+                {"role": "system", "content": "Be brief."},
+                {"role": "user", "content": "Hi"},
+            ]})
+            session_id = json.loads(first[2])["session_id"]
+            second = await _post(port, path, {"session_id": session_id, "messages": [
+                {"role": "user", "content": "Open today?"},
+            ]})
+            third = await _post(port, path, {"stream": True, "messages": [{"role": "user", "content": "Vegan?"}]},
+                                {"X-Session-Id": session_id})
+            sent = upstream.last_request
+            missing = await _post(port, path, {"session_id": "nope", "messages": [{"role": "user", "content": "Hi"}]})
+            return first, second, third, sent, missing, gateway.sessions.get(session_id)
+        finally:
+            server.close()
+            upstream_server.close()
+            await gateway.close()
+
+    first, second, third, sent, missing, session = asyncio.run(run())
+    assert first[0] == 200 and first[1]["x-session-id"] == json.loads(first[2])["session_id"]
+    assert second[0] == 200 and second[1]["x-session-id"] == session.id
+    assert third[0] == 200 and b"data: [DONE]" in third[2]
+    assert sent["instructions"] == "Be brief.", "The session keeps the client's system prompt"
+    assert [item["content"] for item in sent["input"]] == ["Hi", DEFAULT_REPLY, "Open today?", DEFAULT_REPLY, "Vegan?"]
+    assert [m.content for m in session.history][-2:] == ["Vegan?", DEFAULT_REPLY]
+    assert missing[0] == 404
+    print("✅ Test 3 passed: gateway sessions")
+
+
+@_restores_env
+def test_sweep_drops_idle_sessions_and_is_reported():
+    """Test 4: the gateway's sweep purges idle sessions and /metrics counts expiries and evictions"""
+    from gateway.GatewayServer import GatewayServer
+    from gateway.SessionStore import SessionStore
+    from tests.test_metrics import _get
+
+    async def run():
+        os.environ.setdefault("OLLAMA_BASE_URL", "http://127.0.0.1:9/v1")
+        sessions = SessionStore(ttl=0.05, max_sessions=2, sweep_interval=0.02)
+        gateway = GatewayServer("llama3.1:8b", sessions=sessions)
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            for _ in range(3):
+                sessions.create("m", None)
+            held = len(sessions)
+            await asyncio.sleep(0.2)
+            return held, len(sessions), (await _get(port, "/metrics"))[2]
+        finally:
+            server.close()
+            await gateway.close()
+
+    held, left, metrics = asyncio.run(run())
+    assert held == 2 and left == 0, "Idle sessions are swept without being looked up"
+    assert "gateway_sessions_created_total 3" in metrics
+    assert 'gateway_sessions_closed_total{reason="evicted"} 1' in metrics
+    assert 'gateway_sessions_closed_total{reason="expired"} 2' in metrics
+    print("✅ Test 4 passed: session sweep and metrics")
+
+
+if __name__ == "__main__":
+    print("Running session store tests...\n")
+    test_ttl_and_session_cap()
+    test_history_is_trimmed_to_whole_turns()
+    test_gateway_keeps_history_server_side()
+    test_sweep_drops_idle_sessions_and_is_reported()
+    print("\n🎉 All session store tests passed!")
@@ -0,0 +1,112 @@
+"""
+Tests for typed streaming events (AsyncBaseLLMClient.events) and their terminal renderer
+
+Run with:
+    python -m pytest tests/test_stream_events.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import io
+import json
+
+from pydantic import BaseModel
+
+from tests.test_gateway_server import _restores_env
+
+
+class _Params(BaseModel):
+    query: str
+
+
+@_restores_env
+def test_events_from_mock_upstream():
+    """Test 1: a reply streams as TextDeltas, then its usage, then Done; stream_response yields just the text"""
+    from bench.mock_upstream import MockUpstream
+    from providers.OllamaClient import AsyncOllamaClient
+    from providers.events import Done, TextDelta, UsageEvent
+    from tools.tools import ToolRegistry
+
+    async def run():
+        upstream = MockUpstream(latency_ms=0)
+        server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        client = AsyncOllamaClient(model="m", instructions="", tool_registry=ToolRegistry())
+        try:
+            events = [event async for event in client.events("hello")]
+            deltas = [delta async for delta in client.stream_response("again")]
+            return upstream, client, events, deltas
+        finally:
+            server.close()
+            await client.client.close()
+
+    upstream, client, events, deltas = asyncio.run(run())
+    texts = [e.text for e in events if isinstance(e, TextDelta)]
+    assert texts == upstream.tokens()
+    assert isinstance(events[-2], UsageEvent) and events[-2].usage.input_tokens == 50
+    assert events[-1] == Done(upstream.reply)
+    assert deltas == upstream.tokens()
+    assert client.conversation_history[-1].content == upstream.reply
+    print("✅ Test 1 passed: text, usage and done events")
+
+
+def test_tool_round_events_and_printer():
+    """Test 2: a tool round yields ToolCallStart/ToolCallEnd, and TerminalPrinter renders them on their own lines"""
+    from openai.types.responses import ResponseFunctionToolCall
+    from providers.OllamaClient import AsyncOllamaClient
+    from providers.events import Done, TerminalPrinter, TextDelta, ToolCallEnd, ToolCallStart
+    from tools.tools import ToolRegistry
+
+    registry = ToolRegistry()
+    registry.register("echo", "Echo the query", _Params)(lambda query: f"echo {query}")
+    client = AsyncOllamaClient(model="m", instructions="", tool_registry=registry, client=object())
+    rounds = [
+        (["Looking"], [ResponseFunctionToolCall(type="function_call", call_id="c1", name="echo", arguments=json.dumps({"query": "a"}))]),
+        (["Found ", "it"], []),
+    ]
+
+    class _Response:
+        usage = None
+
+        def __init__(self, calls):
+            self.output = calls
+
+    async def fake_stream(context, **kwargs):
+        texts, calls = rounds.pop(0)
+        for text in texts:
+            yield text
+        context.last_stream_response = _Response(calls)
+
+    client._call_api_streaming = fake_stream
+
+    async def run():
+        return [event async for event in client.events("find")]
+
+    events = asyncio.run(run())
+    assert events == [
+        TextDelta("Looking"),
+        ToolCallStart("echo", '{"query": "a"}'),
+        ToolCallEnd("echo", "echo a"),
+        TextDelta("Found "),
+        TextDelta("it"),
+        Done("Found it"),
+    ]
+    assert [m.content for m in client.conversation_history][-3:] == [
+        '[Tool call: echo({"query": "a"})]', "[Tool result: echo a]", "Found it",
+    ]
+
+    out = io.StringIO()
+    printer = TerminalPrinter(out, flush_interval=60)
+    for event in events:
+        printer.render(event)
+    assert out.getvalue() == 'Looking\n[Tool call: echo({"query": "a"})]\n[Tool result: echo a]\nFound it\n'
+    print("✅ Test 2 passed: tool round events and terminal rendering")
+
+
+if __name__ == "__main__":
+    print("Running stream event tests...\n")
+    test_events_from_mock_upstream()
+    test_tool_round_events_and_printer()
+    print("\n🎉 All stream event tests passed!")
@@ -0,0 +1,103 @@
+"""
+Tests for the pre-fork worker supervisor (gateway/Supervisor.py, server.py --workers)
+
+Starts the real server.py with --workers 2 against the mock upstream.
+
+Run with:
+    python -m pytest tests/test_supervisor.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http.client
+import json
+import signal
+import socket
+import subprocess
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return sorted(int(p) for p in f.read().split())
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def _chat(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("POST", "/v1/chat/completions", json.dumps({"messages": [{"role": "user", "content": "Hi"}]}))
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def _port_open(port):
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+def test_workers_share_a_port_restart_and_stop():
+    """Test 1: N workers serve one port, crashed workers come back, SIGTERM stops all"""
+    upstream_port, port = _free_port(), _free_port()
+    env = {**os.environ, "OLLAMA_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1", "PYTHONUNBUFFERED": "1"}
+    upstream = subprocess.Popen(
+        [sys.executable, "-m", "bench.mock_upstream", "--port", str(upstream_port), "--latency-ms", "10"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    server = subprocess.Popen(
+        [sys.executable, "server.py", "--port", str(port), "--host", "127.0.0.1", "--workers", "2"],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        assert _wait_for(lambda: _port_open(port) and _port_open(upstream_port))
+        assert _wait_for(lambda: len(_children(server.pid)) == 2)
+        workers = _children(server.pid)
+
+        assert all(_chat(port)[0] == 200 for _ in range(6))
+
+        os.kill(workers[0], signal.SIGKILL)
+        assert _wait_for(lambda: len(_children(server.pid)) == 2 and workers[0] not in _children(server.pid))
+        assert _chat(port)[0] == 200
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=15) == 0
+        assert not _port_open(port), "Workers should have released the port"
+        for pid in workers[1:]:
+            assert not os.path.exists(f"/proc/{pid}") or "zombie" in open(f"/proc/{pid}/status").read()
+        output = server.stdout.read()
+        assert "chat-client-toy gateway on" in output
+        assert "exited with signal SIGKILL" in output
+    finally:
+        if server.poll() is None:
+            server.kill()
+        upstream.kill()
+        upstream.wait()
+    print("✅ Test 1 passed: supervised workers")
+
+
+if __name__ == "__main__":
+    print("Running supervisor tests...\n")
+    test_workers_share_a_port_restart_and_stop()
+    print("\n🎉 All supervisor tests passed!")
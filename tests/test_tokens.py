@@ -0,0 +1,166 @@
+"""
+Tests for token counting and the token-budgeted conversation window (providers/tokens.py)
+
+Run with:
+    python -m pytest tests/test_tokens.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+from tests.test_gateway_server import _restores_env
+
+
+def _turns(n, words=50):
+    from providers.models import Conversation
+    history = []
+    for i in range(n):
+        history.append(Conversation(role="user", content=f"question {i} " + "word " * words))
+        history.append(Conversation(role="assistant", content=f"answer {i} " + "word " * words))
+    return history
+
+
+def test_estimate_tokens():
+    """Test 1: ~4 ASCII characters per token, one per non-ASCII character"""
+    from providers.tokens import estimate_tokens, token_counter
+
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("नमस्ते") == 6
+    assert token_counter("llama3.1:8b")("abcd" * 10) == 10, "Models tiktoken doesn't know use the estimate"
+    print("✅ Test 1 passed: token estimate")
+
+
+def test_trim_drops_oldest_whole_turns():
+    """Test 2: the oldest turns go first, the window starts on a user turn and the latest turn stays"""
+    from providers.tokens import estimate_tokens, message_tokens, trim_history
+
+    history = _turns(10)
+    per_turn = sum(message_tokens(m, estimate_tokens) for m in history[:2])
+    dropped = trim_history(history, budget=per_turn * 3, count=estimate_tokens)
+    assert dropped == 14 and len(history) == 6
+    assert history[0].role == "user" and history[0].content.startswith("question 7")
+
+    assert trim_history(history, budget=per_turn * 3, count=estimate_tokens) == 0, "Already within budget"
+
+    history = _turns(3)
+    trim_history(history, budget=1, count=estimate_tokens)
+    assert [m.content.split()[0:2] for m in history] == [["question", "2"], ["answer", "2"]]
+    print("✅ Test 2 passed: turn trimming")
+
+
+def test_trim_keeps_tool_calls_with_their_results():
+    """Test 3: tool_use/tool_result pairs (Anthropic blocks and text markers) are never split"""
+    from providers.models import Conversation
+    from providers.tokens import estimate_tokens, trim_history
+
+    history = [
+        Conversation(role="user", content="Are you open?"),
+        Conversation(role="assistant", content=[{"type": "tool_use", "id": "t1", "name": "hours", "input": {}}]),
+        Conversation(role="user", content=[{"type": "tool_result", "tool_use_id": "t1", "content": "x" * 400}]),
+        Conversation(role="assistant", content="Yes, until 10pm."),
+        Conversation(role="user", content="Vegan options?"),
+        Conversation(role="assistant", content="[Tool call: menu({})]"),
+        Conversation(role="user", content="[Tool result: " + "y" * 400 + "]"),
+        Conversation(role="assistant", content="Dal and chana."),
+        Conversation(role="user", content="Thanks"),
+    ]
+    trim_history(history, budget=150, count=estimate_tokens)
+    assert history[0].content == "Vegan options?", "The whole first turn goes, tool result included"
+    trim_history(history, budget=50, count=estimate_tokens)
+    assert [m.content for m in history] == ["Thanks"]
+    print("✅ Test 3 passed: tool pairs kept together")
+
+
+@_restores_env
+def test_client_sends_trimmed_history():
+    """Test 4: a client with a history_token_budget trims before every API call"""
+    from bench.mock_upstream import MockUpstream
+    from providers.OllamaClient import AsyncOllamaClient
+    from tools.tools import ToolRegistry
+
+    async def run():
+        upstream = MockUpstream(latency_ms=0)
+        server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        client = AsyncOllamaClient(model="llama3.1:8b", instructions="", tool_registry=ToolRegistry(), history_token_budget=200)
+        unbounded = AsyncOllamaClient(model="llama3.1:8b", instructions="", tool_registry=ToolRegistry())
+        try:
+            client.conversation_history.extend(_turns(10))
+            unbounded.conversation_history.extend(_turns(10))
+            await client.generate_response("Latest question")
+            sent = len(upstream.last_request["input"])
+            await unbounded.generate_response("Latest question")
+            return sent, len(upstream.last_request["input"]), client.conversation_history
+        finally:
+            server.close()
+            await client.client.close()
+            await unbounded.client.close()
+
+    sent, sent_unbounded, history = asyncio.run(run())
+    assert sent < 10 and sent_unbounded == 21
+    assert history[-2].content == "Latest question" and history[0].role == "user"
+    print("✅ Test 4 passed: client trims before calling the API")
+
+
+@_restores_env
+def test_encoding_loads_off_the_event_loop():
+    """Test 5: a slow first encoding lookup runs in a thread, and only once per model"""
+    import time
+    from bench.mock_upstream import MockUpstream
+    from providers import tokens
+    from providers.OllamaClient import AsyncOllamaClient
+    from tools.tools import ToolRegistry
+
+    loads = []
+
+    def slow_counter(model):
+        loads.append(model)
+        time.sleep(0.3)  # like downloading a BPE file
+        return tokens.estimate_tokens
+
+    async def run():
+        upstream = MockUpstream(latency_ms=0)
+        server = await upstream.start()
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        client = AsyncOllamaClient(model="slow-encoding", instructions="", tool_registry=ToolRegistry(), history_token_budget=200)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        try:
+            await asyncio.gather(*(client.generate_response("Hi", client.new_context()) for _ in range(3)))
+            await client.generate_response("Hi again", client.new_context())
+            return ticks
+        finally:
+            ticking.cancel()
+            server.close()
+            await client.client.close()
+
+    original = tokens.token_counter
+    tokens.token_counter = slow_counter
+    try:
+        ticks = asyncio.run(run())
+    finally:
+        tokens.token_counter = original
+    assert ticks > 15, f"The event loop stalled while the encoding loaded ({ticks} ticks)"
+    assert 1 <= len(loads) <= 3 and set(loads) == {"slow-encoding"}
+    assert "slow-encoding" in tokens._loaded_counters
+    print("✅ Test 5 passed: encoding loads in a thread")
+
+
+if __name__ == "__main__":
+    print("Running token budget tests...\n")
+    test_estimate_tokens()
+    test_trim_drops_oldest_whole_turns()
+    test_trim_keeps_tool_calls_with_their_results()
+    test_client_sends_trimmed_history()
+    test_encoding_loads_off_the_event_loop()
+    print("\n🎉 All token budget tests passed!")
@@ -0,0 +1,165 @@
+"""
+Tests for ToolRegistry versioning and the per-version formatted tool payloads
+
+Run with:
+    python -m pytest tests/test_tool_registry.py -v
+"""
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel
+
+
+class _Params(BaseModel):
+    query: str
+
+
+def _registry(*names):
+    from tools.tools import ToolRegistry
+    registry = ToolRegistry()
+    for name in names:
+        registry.register(name, f"{name} tool", _Params)(lambda query: query)
+    return registry
+
+
+def test_version_changes_with_the_tool_set():
+    """Test 1: register, filter and reassignment all bump the version"""
+    registry = _registry()
+    assert registry.version == 0
+    registry.register("a", "a tool", _Params)(lambda query: query)
+    registry.register("b", "b tool", _Params)(lambda query: query)
+    assert registry.version == 2
+
+    unknown = registry.filter({"a", "missing"})
+    assert unknown == {"missing"} and list(registry.tool_spec) == ["a"] and list(registry.tool_function) == ["a"]
+    assert registry.version == 3
+
+    registry.tool_spec = {}
+    assert registry.version == 4
+    print("✅ Test 1 passed: registry version")
+
+
+def test_clients_reuse_formatted_tools_until_the_registry_changes():
+    """Test 2: tool schemas are built once per registry version, for every client sharing the registry"""
+    from providers.AnthropicClient import AsyncAnthropicClient
+    from providers.OllamaClient import AsyncOllamaClient
+
+    built = []
+
+    class CountingOllama(AsyncOllamaClient):
+        def _get_tools(self, tool_registry):
+            built.append("openai")
+            return super()._get_tools(tool_registry)
+
+    class CountingAnthropic(AsyncAnthropicClient):
+        def _get_tools(self, tool_registry):
+            built.append("anthropic")
+            return super()._get_tools(tool_registry)
+
+    registry = _registry("a", "b")
+    ollama = [CountingOllama(model="m", instructions="", tool_registry=registry, client=object()) for _ in range(2)]
+    anthropic = CountingAnthropic(model="m", instructions="", tool_registry=registry, client=object())
+    for _ in range(3):
+        for client in (*ollama, anthropic):
+            client._build_request_kwargs(client.context)
+    assert sorted(built) == ["anthropic", "openai"]
+    assert [t["name"] for t in ollama[0]._build_request_kwargs(ollama[0].context)["tools"]] == ["a", "b"]
+    assert [t["name"] for t in anthropic._build_request_kwargs(anthropic.context)["tools"]] == ["a", "b"]
+
+    registry.filter({"b"})
+    assert [t["name"] for t in ollama[1]._build_request_kwargs(ollama[1].context)["tools"]] == ["b"]
+    assert [t["name"] for t in anthropic._build_request_kwargs(anthropic.context)["tools"]] == ["b"]
+    assert len(built) == 4
+
+    registry.filter(set())
+    assert "tools" not in ollama[0]._build_request_kwargs(ollama[0].context)
+    assert "tools" not in anthropic._build_request_kwargs(anthropic.context)
+    print("✅ Test 2 passed: formatted tools cached per version")
+
+
+def test_aexecute_keeps_the_event_loop_running():
+    """Test 3: plain tools run in threads and async tools on the loop, neither blocks other tasks"""
+    import asyncio
+    import json
+    import time
+
+    registry = _registry()
+    cancelled = []
+
+    @registry.register("blocking", "Sleeps in a thread", _Params)
+    def blocking(query: str) -> str:
+        time.sleep(float(query))
+        return "blocking done"
+
+    @registry.register("native", "Sleeps on the loop", _Params)
+    async def native(query: str) -> str:
+        try:
+            await asyncio.sleep(float(query))
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+        return "native done"
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        results = await asyncio.gather(
+            registry.aexecute("blocking", json.dumps({"query": "0.3"})),
+            registry.aexecute("native", json.dumps({"query": "0.3"})),
+            registry.aexecute("native", json.dumps({"query": "5"}), timeout=0.1),
+        )
+        ticking.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(run())
+    assert results[:2] == ["blocking done", "native done"]
+    assert results[2] == "Error: Tool 'native' timed out after 0.1 seconds" and cancelled == ["5"]
+    assert ticks > 15, f"The event loop stalled while tools ran ({ticks} ticks)"
+
+    assert registry.execute("native", json.dumps({"query": "0"})) == "native done", "Sync callers can run async tools"
+    print("✅ Test 3 passed: awaitable tool execution")
+
+
+
+def test_bad_arguments_come_back_as_errors():
+    """Test 4: wrong or malformed arguments to a tool return an error string instead of raising"""
+    import asyncio
+    import json
+
+    registry = _registry("plain")
+
+    @registry.register("native", "Async tool", _Params)
+    async def native(query: str) -> str:
+        return query
+
+    async def run():
+        return await asyncio.gather(
+            registry.aexecute("native", json.dumps({"cmd": "ls"})),
+            registry.aexecute("native", "{not json"),
+            registry.aexecute("plain", json.dumps({"cmd": "ls"})),
+        )
+
+    results = asyncio.run(run())
+    assert results[0].startswith("Error executing tool 'native': TypeError")
+    assert results[1].startswith("Error executing tool 'native': JSONDecodeError")
+    assert results[2].startswith("Error executing tool 'plain': TypeError")
+    assert registry.execute("native", json.dumps({"cmd": "ls"})).startswith("Error executing tool 'native': TypeError")
+    assert registry.execute("plain", "{not json").startswith("Error executing tool 'plain': JSONDecodeError")
+    print("✅ Test 4 passed: bad tool arguments")
+
+
+if __name__ == "__main__":
+    print("Running tool registry tests...\n")
+    test_version_changes_with_the_tool_set()
+    test_clients_reuse_formatted_tools_until_the_registry_changes()
+    test_aexecute_keeps_the_event_loop_running()
+    test_bad_arguments_come_back_as_errors()
+    print("\n🎉 All tool registry tests passed!")
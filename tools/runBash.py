@@ -1,4 +1,6 @@
-import subprocess
+import asyncio
+import os
+import signal
 from pydantic import BaseModel, Field
 from tools.tools import tool
 
@@ -12,21 +14,28 @@ class RunBashParams(BaseModel):
 
 
 @tool("run_bash", "Execute a bash command and return the output", RunBashParams)
-def run_bash(command: str) -> str:
+async def run_bash(command: str) -> str:
     """Execute a bash command and return the output."""
     try:
-        result: subprocess.CompletedProcess[str] = subprocess.run(
-            command, shell=True, capture_output=True, text=True, timeout=BASH_TIMEOUT
+        process: asyncio.subprocess.Process = await asyncio.create_subprocess_shell(
+            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True
         )
-        output: str = result.stdout
-        if result.stderr:
-            output += result.stderr
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=BASH_TIMEOUT)
+        except asyncio.TimeoutError:
+            return f"Error: Command timed out after {BASH_TIMEOUT} seconds"
+        finally:
+            # Timed out, or the caller gave up on the tool: kill the command's whole process group
+            if process.returncode is None:
+                os.killpg(process.pid, signal.SIGKILL)
+                await process.wait()
+        output: str = stdout.decode(errors="replace")
+        if stderr:
+            output += stderr.decode(errors="replace")
         if not output:
             return "(no output)"
         if len(output) > MAX_OUTPUT_LENGTH:
             output = output[:MAX_OUTPUT_LENGTH] + f"\n... [truncated — {len(output)} chars total, showing first {MAX_OUTPUT_LENGTH}]"
         return output
-    except subprocess.TimeoutExpired:
-        return f"Error: Command timed out after {BASH_TIMEOUT} seconds"
     except Exception as e:
         return f"Error: {str(e)}"
@@ -1,60 +1,145 @@
+import asyncio
 import importlib
+import inspect
 import json
 from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FuturesTimeoutError
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# A tool is a plain function (run in _tool_executor) or an async one (run on the event loop)
+ToolFunction = Callable[..., str | Awaitable[str]]
 
 DEFAULT_TOOL_TIMEOUT: int = 300
 
 MAX_TOOL_RESULT_LENGTH: int = 40_000
 
-_tool_executor = ThreadPoolExecutor(max_workers=2)
+# Tools that can run at once, e.g. the several calls of one model turn
+MAX_CONCURRENT_TOOLS: int = 8
+
+_tool_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TOOLS)
 
 
 class ToolRegistry:
-    def __init__(self) -> None:
-        self.tool_spec: dict[str, dict[str, Any]] = {}
-        self.tool_function: dict[str, Callable[..., str]] = {}
+    """Tools by name, with a version that changes whenever the set of tools does.
+
+    Provider clients format the tool specs into their API's schema once per
+    version (see `formatted`) instead of on every call.
+    """
 
-    def register(self, name: str, description: str, param_model: type) -> Callable[[Callable[..., str]], Callable[..., str]]:
+    def __init__(self) -> None:
+        self._tool_spec: dict[str, dict[str, Any]] = {}
+        self._tool_function: dict[str, ToolFunction] = {}
+        self.version: int = 0
+        self._formatted: dict[str, tuple[int, Any]] = {}
+
+    @property
+    def tool_spec(self) -> dict[str, dict[str, Any]]:
+        return self._tool_spec
+
+    @tool_spec.setter
+    def tool_spec(self, value: dict[str, dict[str, Any]]) -> None:
+        self._tool_spec = value
+        self.version += 1
+
+    @property
+    def tool_function(self) -> dict[str, ToolFunction]:
+        return self._tool_function
+
+    @tool_function.setter
+    def tool_function(self, value: dict[str, ToolFunction]) -> None:
+        self._tool_function = value
+        self.version += 1
+
+    def register(self, name: str, description: str, param_model: type) -> Callable[[ToolFunction], ToolFunction]:
         """Decorator that registers a function as a tool."""
-        def decorator(func: Callable[..., str]) -> Callable[..., str]:
-            self.tool_spec[name] = {
+        def decorator(func: ToolFunction) -> ToolFunction:
+            self._tool_spec[name] = {
                 "type": "function",
                 "name": name,
                 "description": description,
                 "parameters": param_model.model_json_schema()
             }
-            self.tool_function[name] = func
+            self._tool_function[name] = func
+            self.version += 1
             return func
         return decorator
 
+    def filter(self, names: set[str]) -> set[str]:
+        """Keep only the tools in `names`. Returns the names that aren't registered."""
+        self._tool_spec = {k: v for k, v in self._tool_spec.items() if k in names}
+        self._tool_function = {k: v for k, v in self._tool_function.items() if k in names}
+        self.version += 1
+        return names - self._tool_spec.keys()
+
+    def formatted(self, key: str, build: Callable[[], T]) -> T:
+        """`build()`, cached under `key` until the tools change.
+
+        `build` must depend only on tool_spec; callers must not mutate the result.
+        """
+        cached: tuple[int, Any] | None = self._formatted.get(key)
+        if cached is None or cached[0] != self.version:
+            cached = self._formatted[key] = (self.version, build())
+        return cached[1]
+
     def execute(self, name: str, arguments: str, timeout: int = DEFAULT_TOOL_TIMEOUT) -> str:
-        """Execute a registered tool by name with JSON arguments.
+        """Execute a registered tool by name with JSON arguments, blocking until it's done.
 
         The tool is run in a separate thread with a timeout.  If the tool does
         not complete within *timeout* seconds the call is abandoned and an error
         string is returned.  Results longer than MAX_TOOL_RESULT_LENGTH are
-        truncated.
+        truncated.  From async code, use `aexecute`.
         """
         if name not in self.tool_function:
             return f"Unknown tool: {name}"
 
-        args: dict[str, Any] = json.loads(arguments)
-        future: Future[str] = _tool_executor.submit(self.tool_function[name], **args)
+        func: ToolFunction = self.tool_function[name]
         try:
+            # Bad JSON or arguments come back as an error string like any other tool failure
+            args: dict[str, Any] = json.loads(arguments)
+            if inspect.iscoroutinefunction(func):
+                future: Future[str] = _tool_executor.submit(asyncio.run, func(**args))
+            else:
+                future = _tool_executor.submit(func, **args)
             result: str = future.result(timeout=timeout)
         except FuturesTimeoutError:
             future.cancel()
             return f"Error: Tool '{name}' timed out after {timeout} seconds"
         except Exception as e:
             return f"Error executing tool '{name}': {type(e).__name__}: {e}"
+        return _truncate(result)
+
+    async def aexecute(self, name: str, arguments: str, timeout: int = DEFAULT_TOOL_TIMEOUT) -> str:
+        """Like `execute`, but awaits the tool instead of blocking the event loop.
+
+        Async tools run on the calling loop and are cancelled on timeout; plain
+        ones run in the tool thread pool, where a timed-out call is abandoned.
+        """
+        if name not in self.tool_function:
+            return f"Unknown tool: {name}"
+
+        func: ToolFunction = self.tool_function[name]
+        try:
+            # Bad JSON or arguments come back as an error string like any other tool failure
+            args: dict[str, Any] = json.loads(arguments)
+            if inspect.iscoroutinefunction(func):
+                pending: Awaitable[str] = func(**args)
+            else:
+                pending = asyncio.wrap_future(_tool_executor.submit(func, **args))
+            result: str = await asyncio.wait_for(pending, timeout=timeout)
+        except asyncio.TimeoutError:
+            return f"Error: Tool '{name}' timed out after {timeout} seconds"
+        except Exception as e:
+            return f"Error executing tool '{name}': {type(e).__name__}: {e}"
+        return _truncate(result)
 
-        # Truncate overly-large results to avoid blowing the context window.
-        if len(result) > MAX_TOOL_RESULT_LENGTH:
-            result = result[:MAX_TOOL_RESULT_LENGTH] + f"\n... [truncated — {len(result)} chars total, showing first {MAX_TOOL_RESULT_LENGTH}]"
 
-        return result
+def _truncate(result: str) -> str:
+    """Truncate overly-large results to avoid blowing the context window."""
+    if len(result) > MAX_TOOL_RESULT_LENGTH:
+        result = result[:MAX_TOOL_RESULT_LENGTH] + f"\n... [truncated — {len(result)} chars total, showing first {MAX_TOOL_RESULT_LENGTH}]"
+    return result
 
 
 # Global registry — tools register themselves when imported